@@ -1,21 +1,52 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import os
-from app.api.routes import quantities
-from app.config.settings import Settings
-from app.core.database import Base, engine
-
-def create_app() -> FastAPI:
-    # Carrega configurações
-    settings = Settings()
+# app/__init__.py
+"""
+Fábrica da aplicação FastAPI.
+
+A aplicação não é criada na importação do pacote: `app` é construída no
+primeiro acesso (ex: `uvicorn app:app`), para que scripts e workers que só
+importam módulos de `app` não paguem o arranque da API. Os subsistemas
+opcionais (métricas, perfil de consultas, índice em memória) só são
+importados quando ativos na configuração.
+"""
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from app.config.settings import get_settings
+
+# Diretório com index.html e static/, independente do diretório de trabalho
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+@asynccontextmanager
+async def lifespan(app):
+    settings = get_settings()
+    # Em produção as migrações correm à parte (scripts/migrate.py)
+    if settings.create_schema_on_startup:
+        from app.core.schema import migrate
+        migrate()
+    # Constrói o índice de consulta em memória antes do primeiro pedido
+    if settings.lookup_index_enabled:
+        from app.repositories.quantity_index import refresh_quantity_index
+        refresh_quantity_index()
+    yield
+
+
+def create_app():
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import FileResponse
+    from fastapi.staticfiles import StaticFiles
+    from app.api.routes import quantities, reports
+
+    # Carrega configurações (instância partilhada em cache)
+    settings = get_settings()
     
     # Cria a aplicação
     app = FastAPI(
         title="Print Shop Waste Calculator",
         description="API para cálculo de desperdício em gráficas",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan
     )
     
     # Configuração de CORS
@@ -27,20 +58,40 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Métricas de latência por rota e por etapa (expostas em /metrics)
+    if settings.metrics_enabled:
+        from app.api.routes import metrics
+        from app.core.exceptions import NotFoundException
+        from app.core.metrics import MetricsMiddleware, not_found_handler
+        app.add_middleware(MetricsMiddleware)
+        app.add_exception_handler(NotFoundException, not_found_handler)
+        app.include_router(metrics.router)
+    
+    # Consultas SQL e tempo de base de dados por pedido nos headers (só em debug)
+    if settings.debug and settings.query_profiler_enabled:
+        from app.core.profiling import QueryStatsMiddleware
+        app.add_middleware(QueryStatsMiddleware)
+    
     # Registra rotas
     app.include_router(quantities.router, prefix="/api", tags=["quantities"])
+    app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
     
     # Configurar pasta de arquivos estáticos
-    app.mount("/static", StaticFiles(directory="static"), name="static")
-    
-    # Cria as tabelas no banco de dados
-    Base.metadata.create_all(bind=engine)
+    app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
     
     # Servir o arquivo index.html na rota raiz
+    index_path = BASE_DIR / "index.html"
+
     @app.get("/")
     async def serve_index():
-        return FileResponse("index.html")
+        return FileResponse(index_path)
     
     return app
 
-app = create_app()
\ No newline at end of file
+
+def __getattr__(name):
+    # `app` é criada no primeiro acesso e guardada no módulo
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
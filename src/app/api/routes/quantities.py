@@ -1,33 +1,237 @@
 # app/api/routes/quantities.py
-from fastapi import APIRouter, Depends, Query
-from typing import List
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
 
-from app.schemas.quantity import WasteCalculationRequest, WasteCalculationResponse
-from app.services.waste_calculation import WasteCalculationService, get_waste_calculation_service
+from app.config.settings import get_settings
+from app.core.exceptions import ValidationException
+from app.core.http_cache import cache_headers, not_modified, with_headers
+from app.core.metrics import TimedRoute
+from app.core.responses import FastJSONResponse
+from app.schemas.quantity import (
+    WasteCalculationRequest, WasteCalculationResponse, WasteCalculationBatchItem, QuantityTableResponse,
+    WasteOptimizationResponse, WasteMatrixResponse, WasteLookupResponse, WastePercentileResponse
+)
+from app.services.interpolation import CalculationMode
+from app.services.waste_calculation import WasteCalculationService, get_waste_calculation_service, waste_percentile
+
+router = APIRouter(route_class=TimedRoute)
+
+MODE_DESCRIPTION = "Cálculo entre linhas da tabela: step (linha seguinte), linear ou monotone"
+
+
+async def _waste_response(service: WasteCalculationService, request: WasteCalculationRequest, mode: CalculationMode):
+    """
+    Com o cache de respostas ativo devolve o JSON já serializado numa
+    Response, o que dispensa também a validação pelo response_model.
+    No caminho rápido um pedido em cache é respondido diretamente no event
+    loop, sem threadpool nem sessão de base de dados.
+    O cache de respostas só se aplica ao modo step.
+    """
+    if mode != "step":
+        return await service.calculate_waste(request, mode)
+    settings = get_settings()
+    if settings.lean_responses_enabled:
+        content = service.cached_waste_json(request)
+        if content is None:
+            content = await service.calculate_waste_json(request)
+        return FastJSONResponse(content)
+    if settings.response_cache_enabled:
+        content = await service.calculate_waste_json(request)
+        return Response(content=content, media_type="application/json")
+    return await service.calculate_waste(request)
+
+
+def _split(values: str) -> List[str]:
+    return [value.strip() for value in values.split(",") if value.strip()]
+
+
+def _matrix_grid(runs: Optional[str], start: Optional[int], stop: Optional[int], step: Optional[int]) -> List[int]:
+    """Tiragens da grelha: lista explícita (runs) ou intervalo start..stop (inclusive) com passo step."""
+    if runs is not None:
+        try:
+            grid = [int(value) for value in _split(runs)]
+        except ValueError:
+            raise ValidationException(detail="runs deve ser uma lista de inteiros separados por vírgulas")
+    elif None not in (start, stop, step):
+        if start > stop:
+            raise ValidationException(detail="start não pode ser maior do que stop")
+        grid = range(start, stop + 1, step)
+    else:
+        raise ValidationException(detail="Indique runs ou start, stop e step")
+
+    # len() de um range é O(1): o tamanho é validado antes de criar a lista
+    max_runs = get_settings().waste_matrix_max_runs
+    if not grid or len(grid) > max_runs:
+        raise ValidationException(detail=f"A grelha deve ter entre 1 e {max_runs} tiragens")
+    # Importado só quando usado (o módulo da matriz depende do numpy)
+    from app.services.waste_matrix import MAX_MATRIX_RUN
+    grid = list(grid)
+    if min(grid) <= 0 or max(grid) > MAX_MATRIX_RUN:
+        raise ValidationException(detail=f"As tiragens devem estar entre 1 e {MAX_MATRIX_RUN}")
+    return grid
+
+
+async def _print_types_response(service: WasteCalculationService):
+    if get_settings().lean_responses_enabled:
+        content = service.cached_print_types_json()
+        if content is None:
+            content = await service.get_print_types_json()
+        return FastJSONResponse(content)
+    return await service.get_print_types()
 
-router = APIRouter()
 
 @router.get("/print-types", response_model=List[str])
 async def get_print_types(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     service: WasteCalculationService = Depends(get_waste_calculation_service)
 ):
     """Retorna todos os tipos de impressão disponíveis"""
-    return service.get_print_types()
+    headers = cache_headers(service.dataset_version())
+    cached = not_modified(if_none_match, headers)
+    if cached is not None:
+        return cached
+    return with_headers(await _print_types_response(service), response, headers)
 
 @router.post("/waste-calculation", response_model=WasteCalculationResponse)
 async def calculate_waste(
     request: WasteCalculationRequest,
+    mode: CalculationMode = Query("step", description=MODE_DESCRIPTION),
     service: WasteCalculationService = Depends(get_waste_calculation_service)
 ):
     """Calcula o desperdício com base no tipo de impressão e quantidade"""
-    return service.calculate_waste(request)
+    return await _waste_response(service, request, mode)
+
+@router.post("/waste-calculation/batch", response_model=List[WasteCalculationBatchItem])
+async def calculate_waste_batch(
+    requests: List[WasteCalculationRequest],
+    mode: CalculationMode = Query("step", description=MODE_DESCRIPTION),
+    service: WasteCalculationService = Depends(get_waste_calculation_service)
+):
+    """Calcula o desperdício para uma lista de pedidos, devolvendo os resultados pela mesma ordem"""
+    return await service.calculate_waste_batch(requests, mode)
 
 @router.get("/waste-calculation", response_model=WasteCalculationResponse)
 async def calculate_waste_get(
+    response: Response,
+    print_type: str = Query(..., description="Tipo de impressão (ex: 4/0, 4/4)"),
+    print_run: int = Query(..., gt=0, description="Quantidade a ser impressa"),
+    mode: CalculationMode = Query("step", description=MODE_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None),
+    service: WasteCalculationService = Depends(get_waste_calculation_service)
+):
+    """
+    Calcula o desperdício com base no tipo de impressão e quantidade (via query params).
+    Responde 304 se o cliente já tem o resultado da versão atual dos dados (ETag).
+    """
+    headers = cache_headers(service.dataset_version())
+    cached = not_modified(if_none_match, headers)
+    if cached is not None:
+        return cached
+    request = WasteCalculationRequest(print_type=print_type, print_run=print_run)
+    return with_headers(await _waste_response(service, request, mode), response, headers)
+
+@router.get("/quantities/table", response_model=QuantityTableResponse)
+async def get_quantity_table(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    service: WasteCalculationService = Depends(get_waste_calculation_service)
+):
+    """
+    Retorna a tabela de quantidades completa em formato colunar, para que o
+    cliente a guarde (validada pelo ETag) e calcule o desperdício localmente
+    """
+    headers = cache_headers(service.dataset_version())
+    cached = not_modified(if_none_match, headers)
+    if cached is not None:
+        return cached
+    content = service.cached_table_json()
+    if content is None:
+        content = await service.get_quantity_table_json()
+    return with_headers(FastJSONResponse(content), response, headers)
+
+@router.get("/waste-optimization", response_model=WasteOptimizationResponse)
+async def optimize_print_run(
+    response: Response,
+    print_type: str = Query(..., description="Tipo de impressão (ex: 4/0, 4/4)"),
+    min_run: int = Query(..., gt=0, description="Menor tiragem a considerar"),
+    max_run: int = Query(..., gt=0, description="Maior tiragem a considerar"),
+    limit: int = Query(5, ge=1, le=50, description="Número de melhores tiragens a devolver"),
+    max_breakpoints: int = Query(100, ge=0, le=2000, description="Número máximo de degraus a devolver"),
+    if_none_match: Optional[str] = Header(None),
+    service: WasteCalculationService = Depends(get_waste_calculation_service)
+):
+    """
+    Retorna as tiragens do intervalo com menor desperdício por folha útil e
+    os degraus da tabela (tiragens onde o desperdício muda) nesse intervalo
+    """
+    headers = cache_headers(service.dataset_version())
+    cached = not_modified(if_none_match, headers)
+    if cached is not None:
+        return cached
+    result = await service.optimize_print_run(print_type, min_run, max_run, limit, max_breakpoints)
+    return with_headers(result, response, headers)
+
+@router.get("/waste-matrix", response_model=WasteMatrixResponse)
+async def get_waste_matrix(
+    response: Response,
+    runs: Optional[str] = Query(None, description="Tiragens separadas por vírgulas (ex: 500,1000,2000)"),
+    start: Optional[int] = Query(None, gt=0, description="Primeira tiragem da grelha (com stop e step)"),
+    stop: Optional[int] = Query(None, gt=0, description="Última tiragem da grelha (inclusive)"),
+    step: Optional[int] = Query(None, gt=0, description="Passo da grelha"),
+    print_types: Optional[str] = Query(None, description="Tipos de impressão separados por vírgulas (por omissão todos)"),
+    rank: bool = Query(False, description="Ordena os tipos pelo desperdício médio por tiragem"),
+    if_none_match: Optional[str] = Header(None),
+    service: WasteCalculationService = Depends(get_waste_calculation_service)
+):
+    """
+    Retorna o desperdício de cada tipo de impressão em cada tiragem da grelha,
+    como uma matriz densa (linhas = tipos, colunas = tiragens)
+    """
+    grid = _matrix_grid(runs, start, stop, step)
+    types = _split(print_types) if print_types is not None else None
+    headers = cache_headers(service.dataset_version())
+    cached = not_modified(if_none_match, headers)
+    if cached is not None:
+        return cached
+    content = await service.waste_matrix_json(grid, types, rank)
+    return with_headers(FastJSONResponse(content), response, headers)
+
+@router.get("/waste-lookup", response_model=WasteLookupResponse)
+async def lookup_waste(
     print_type: str = Query(..., description="Tipo de impressão (ex: 4/0, 4/4)"),
     print_run: int = Query(..., gt=0, description="Quantidade a ser impressa"),
+    machine: Optional[str] = Query(None, description="Máquina (ex: Heidelberg SM52)"),
+    paper_gsm: Optional[int] = Query(None, gt=0, description="Gramagem do papel"),
+    paper_format: Optional[str] = Query(None, description="Formato do papel (ex: 70x100)"),
     service: WasteCalculationService = Depends(get_waste_calculation_service)
 ):
-    """Calcula o desperdício com base no tipo de impressão e quantidade (via query params)"""
+    """
+    Calcula o desperdício a partir do histórico de trabalhos semelhantes
+    (máquina, gramagem e formato), recorrendo a níveis menos específicos e,
+    por fim, à tabela de quantidades
+    """
+    # Importado só quando usado (o índice do histórico depende do numpy/pandas)
+    from app.repositories.job_history import get_job_history, job_history_needs_check
+    history = await run_in_threadpool(get_job_history) if job_history_needs_check() else get_job_history()
+    request = WasteCalculationRequest(print_type=print_type, print_run=print_run)
+    filters = {"machine": machine, "paper_gsm": paper_gsm, "paper_format": paper_format}
+    return await service.lookup_waste(request, filters, history)
+
+
+@router.get("/waste-calculation/percentile", response_model=WastePercentileResponse)
+async def calculate_waste_percentile(
+    print_type: str = Query(..., description="Tipo de impressão (ex: 4/0, 4/4)"),
+    print_run: int = Query(..., gt=0, description="Quantidade a ser impressa"),
+    percentile: float = Query(90, gt=0, le=100, description="Percentil do desperdício histórico (ex: 50, 90, 95)"),
+):
+    """
+    Desperdício num percentil do histórico de trabalhos do mesmo tipo e
+    faixa de tiragem, a partir dos sketches de quantis em memória
+    """
+    # Importado só quando usado (lê os sketches do histórico de trabalhos)
+    from app.repositories.waste_sketches import get_waste_sketches, waste_sketches_need_check
+    sketches = await run_in_threadpool(get_waste_sketches) if waste_sketches_need_check() else get_waste_sketches()
     request = WasteCalculationRequest(print_type=print_type, print_run=print_run)
-    return service.calculate_waste(request) 
\ No newline at end of file
+    return waste_percentile(sketches, request, percentile)
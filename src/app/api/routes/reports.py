@@ -0,0 +1,58 @@
+# app/api/routes/reports.py
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from app.core.metrics import TimedRoute
+from app.core.responses import FastJSONResponse
+from app.schemas.report import WasteAnomaliesResponse, WasteReportResponse
+from app.services.reports import WasteReportService, get_waste_report_service
+from app.services.waste_calculation import run_service
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/waste", response_model=WasteReportResponse)
+async def waste_report(
+    period: str = Query("month", description="Agregação temporal: day, month ou total"),
+    group_by: str = Query(
+        "print_type", description="Dimensões separadas por vírgulas: client_code, machine, print_type (vazio = só o período)"
+    ),
+    start: Optional[date] = Query(None, description="Primeiro dia incluído (YYYY-MM-DD)"),
+    end: Optional[date] = Query(None, description="Último dia incluído (YYYY-MM-DD)"),
+    client_code: Optional[str] = Query(None, description="Filtrar por cliente"),
+    machine: Optional[str] = Query(None, description="Filtrar por máquina"),
+    print_type: Optional[str] = Query(None, description="Filtrar por tipo de impressão"),
+    limit: int = Query(1000, gt=0, le=100_000, description="Número máximo de linhas"),
+    service: WasteReportService = Depends(get_waste_report_service)
+):
+    """
+    Desperdício agregado (trabalhos, folhas, tiragem, casos especiais e
+    razões) por dia/mês × cliente × máquina × tipo de impressão, lido das
+    tabelas de agregados do histórico
+    """
+    dimensions = [value.strip() for value in group_by.split(",") if value.strip()]
+    filters = {"client_code": client_code, "machine": machine, "print_type": print_type}
+    report = await run_service(service.waste_report, period, dimensions, start, end, filters, limit)
+    return FastJSONResponse(report)
+
+
+@router.get("/anomalies", response_model=WasteAnomaliesResponse)
+async def waste_anomalies(
+    start: Optional[date] = Query(None, description="Primeiro dia incluído (YYYY-MM-DD)"),
+    end: Optional[date] = Query(None, description="Último dia incluído (YYYY-MM-DD)"),
+    client_code: Optional[str] = Query(None, description="Filtrar por cliente"),
+    machine: Optional[str] = Query(None, description="Filtrar por máquina"),
+    print_type: Optional[str] = Query(None, description="Filtrar por tipo de impressão"),
+    min_score: Optional[float] = Query(None, gt=0, description="Só anomalias com |score| pelo menos igual"),
+    limit: int = Query(100, gt=0, le=10_000, description="Número máximo de anomalias"),
+    service: WasteReportService = Depends(get_waste_report_service)
+):
+    """
+    Trabalhos com desperdício fora do normal para o tipo de impressão, faixa
+    de tiragem e máquina, assinalados durante a importação do histórico
+    """
+    filters = {"client_code": client_code, "machine": machine, "print_type": print_type}
+    result = await run_service(service.anomalies, start, end, filters, min_score, limit)
+    return FastJSONResponse(result)
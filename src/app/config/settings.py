@@ -1,11 +1,73 @@
 # app/config/settings.py
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
     app_name: str = "Print Shop Waste Calculator"
     database_url: str = "sqlite:///./waste_calculation.db"
+
+    # Cria as tabelas em falta no arranque (desenvolvimento). Em produção usar
+    # False e correr scripts/migrate.py antes de arrancar os workers.
+    create_schema_on_startup: bool = True
+
+    # Perfil do engine SQLite, aplicado com PRAGMAs em cada nova ligação
+    sqlite_profile_enabled: bool = True
+    sqlite_journal_mode: Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"] = "WAL"
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024  # bytes mapeados em memória
+    sqlite_cache_size: int = -64 * 1024        # negativo = KiB (64 MiB)
+    sqlite_busy_timeout: int = 5000            # ms de espera por um lock antes de falhar
+    sqlite_foreign_keys: bool = True           # verifica as chaves estrangeiras (PRAGMA foreign_keys)
+    # Leituras da API num pool próprio de ligações só de leitura (mode=ro)
+    sqlite_read_only_readers: bool = True
+    sqlite_reader_pool_size: int = 8
+
+    # Caminho assíncrono para a base de dados (requer aiosqlite)
+    async_database_enabled: bool = False
+    async_database_url: Optional[str] = None  # por omissão derivado de database_url
+
+    # Índice de consulta em memória (substitui a consulta SQL por pedido)
+    lookup_index_enabled: bool = True
+    lookup_index_check_interval: float = 1.0  # segundos entre verificações de alterações
+
+    # Cache das respostas de /api/waste-calculation já serializadas, por
+    # tipo de impressão e intervalo de tiragens; descartado a cada nova versão
+    response_cache_enabled: bool = True
+    # Caminho rápido (opt-in): respostas em cache servidas no event loop numa
+    # única serialização (orjson se instalado) e sessão aberta só em falhas
+    # do cache. Usa o cache de respostas mesmo com response_cache_enabled=False.
+    lean_responses_enabled: bool = False
+
+    # Cache HTTP de GET /api/print-types e GET /api/waste-calculation: ETag
+    # derivado da versão dos dados (304 com If-None-Match) e Cache-Control
+    http_cache_enabled: bool = True
+    http_cache_max_age: int = 60  # segundos; 0 = "no-cache" (revalida sempre com o ETag)
+
+    # Histórico detalhado de trabalhos (base completa de create_database_from_excel.py)
+    # usado por /api/waste-lookup; sem o ficheiro a procura usa só a tabela
+    history_database_url: str = "sqlite:///./waste_calculation_complete.db"
+    history_run_tolerance: float = 0.1  # janela de tiragens semelhantes (±10%)
+    history_min_samples: int = 3        # trabalhos mínimos na janela para usar um nível
+    # Deteção de anomalias na importação do histórico (app/ingestion/anomalies.py):
+    # trabalho assinalado quando |desperdício - média| > z * desvio padrão do grupo
+    anomaly_z_threshold: float = 3.0
+    anomaly_min_samples: int = 10       # trabalhos do grupo antes de começar a assinalar
+
+    # Número máximo de itens aceites por /api/waste-calculation/batch
+    batch_max_items: int = 1000
+    # Número máximo de tiragens na grelha de /api/waste-matrix
+    waste_matrix_max_runs: int = 1000
+
+    # Métricas de latência por rota/etapa expostas em /metrics (formato Prometheus)
+    metrics_enabled: bool = True
+
+    # Perfil das consultas SQL: registo de consultas lentas (com parâmetros e
+    # EXPLAIN QUERY PLAN) e, em modo debug, contagem/tempo por pedido nos headers
+    debug: bool = False
+    query_profiler_enabled: bool = True
+    slow_query_threshold_ms: float = 100.0
     
     class Config:
         env_file = ".env"
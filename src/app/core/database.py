@@ -1,20 +1,274 @@
 # app/core/database.py
-from sqlalchemy import create_engine
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from fastapi import Depends
 from app.config.settings import get_settings
+from app.core.metrics import observe_session
 
 settings = get_settings()
-engine = create_engine(settings.database_url)
+
+logger = logging.getLogger(__name__)
+
+
+def _sqlite_path(database_url: str):
+    """Caminho absoluto do ficheiro SQLite, ou None se o URL não for um ficheiro SQLite."""
+    url = make_url(database_url)
+    if not url.drivername.startswith("sqlite") or url.database in (None, "", ":memory:"):
+        return None
+    if url.database.startswith("file:"):
+        return None  # URI já configurado explicitamente
+    return os.path.abspath(url.database)
+
+
+def _read_only_url(database_url: str, path: str) -> str:
+    """URL SQLite que abre o ficheiro em modo só de leitura (mode=ro)."""
+    url = make_url(database_url)
+    return f"{url.drivername}:///file:{path}?mode=ro&uri=true"
+
+
+def apply_sqlite_profile(engine, read_only: bool = False):
+    """
+    Regista os PRAGMAs do perfil configurado em cada nova ligação do engine.
+    O journal_mode e o synchronous só podem ser alterados pelo escritor.
+    """
+    pragmas = []
+    if not read_only:
+        pragmas += [
+            f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+            f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        ]
+    pragmas += [
+        f"PRAGMA foreign_keys={'ON' if settings.sqlite_foreign_keys else 'OFF'}",
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}",
+        f"PRAGMA cache_size={int(settings.sqlite_cache_size)}",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+class QueryStats:
+    """Número de consultas e tempo total na base de dados de um pedido."""
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Estatísticas do pedido atual (definidas por QueryStatsMiddleware)
+_request_queries: ContextVar[Optional[QueryStats]] = ContextVar("request_queries", default=None)
+
+
+def start_query_stats() -> QueryStats:
+    """Começa a contar as consultas do contexto atual (pedido ou tarefa)."""
+    stats = QueryStats()
+    _request_queries.set(stats)
+    return stats
+
+
+def _explain(connection, statement: str, parameters) -> Optional[str]:
+    """Plano de execução de um SELECT em SQLite, numa linha por nó."""
+    if connection.dialect.name != "sqlite" or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "; ".join(str(row[-1]) for row in cursor.fetchall())
+    except Exception as e:  # o plano é apenas informativo
+        return f"indisponível ({e})"
+    finally:
+        cursor.close()
+
+
+def profile_queries(engine):
+    """
+    Regista listeners que medem cada instrução executada no engine: o tempo é
+    somado ao pedido atual e instruções acima de slow_query_threshold_ms são
+    registadas no log com os parâmetros e o EXPLAIN QUERY PLAN.
+    """
+    threshold = settings.slow_query_threshold_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _request_queries.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+        if elapsed >= threshold:
+            plan = None if executemany else _explain(conn, statement, parameters)
+            logger.warning(
+                "Consulta lenta (%.1f ms): %s | parâmetros: %r | plano: %s",
+                elapsed * 1000, statement, parameters, plan,
+            )
+
+
+sqlite_path = _sqlite_path(settings.database_url) if settings.sqlite_profile_enabled else None
+
+if sqlite_path:
+    # Escritor único (importações); os leitores usam um pool próprio
+    engine = create_engine(settings.database_url, poolclass=QueuePool, pool_size=1, max_overflow=0)
+    apply_sqlite_profile(engine)
+
+    if settings.sqlite_read_only_readers:
+        reader_engine = create_engine(
+            _read_only_url(settings.database_url, sqlite_path),
+            poolclass=QueuePool,
+            pool_size=settings.sqlite_reader_pool_size,
+            max_overflow=0,
+        )
+        apply_sqlite_profile(reader_engine, read_only=True)
+    else:
+        reader_engine = engine
+else:
+    engine = create_engine(settings.database_url)
+    reader_engine = engine
+
+if settings.query_profiler_enabled:
+    profile_queries(engine)
+    if reader_engine is not engine:
+        profile_queries(reader_engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=reader_engine)
 
 Base = declarative_base()
 
+@contextmanager
+def write_transaction(relaxed: bool = False):
+    """
+    Transação explícita (BEGIN IMMEDIATE) numa ligação do escritor.
+    O driver sqlite3 não abre transação antes de instruções DDL, por isso
+    a troca das tabelas tem de ser delimitada à mão para ser atómica.
+    Com relaxed=True a carga corre com synchronous=OFF (só para dados que
+    ainda não estão publicados, como as tabelas-sombra).
+    As chaves estrangeiras só são verificadas no COMMIT (defer_foreign_keys),
+    para que as tabelas possam ser recriadas e carregadas em qualquer ordem.
+    """
+    connection = engine.raw_connection()
+    dbapi_connection = connection.driver_connection
+    previous_isolation = dbapi_connection.isolation_level
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    if relaxed:
+        previous_synchronous = cursor.execute("PRAGMA synchronous").fetchone()[0]
+        cursor.execute("PRAGMA synchronous=OFF")
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("PRAGMA defer_foreign_keys=ON")
+        try:
+            yield cursor
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        cursor.execute("COMMIT")
+    finally:
+        if relaxed:
+            cursor.execute(f"PRAGMA synchronous={int(previous_synchronous)}")
+        cursor.close()
+        dbapi_connection.isolation_level = previous_isolation
+        connection.close()
+
+
 # Dependency para obter uma sessão do banco de dados
 def get_db():
+    started = time.perf_counter()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+        observe_session("write", started)
+
+
+# Dependency para obter uma sessão só de leitura (consultas da API)
+def get_read_db():
+    started = time.perf_counter()
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        observe_session("read", started)
+
+
+class LazySession:
+    """
+    Sessão aberta apenas no primeiro acesso a um dos seus atributos.
+    Permite injetar uma sessão em pedidos que podem ser servidos sem a base
+    de dados (ex: a partir do cache) sem pagar a sua criação e fecho.
+    Funciona com sessões síncronas e assíncronas (conforme a `factory`).
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self.session = None
+
+    def __getattr__(self, name):
+        if self.session is None:
+            self.session = self._factory()
+        return getattr(self.session, name)
+
+
+# Caminho assíncrono (opcional, requer o driver aiosqlite)
+# O engine é criado apenas no primeiro uso para não exigir o driver
+# quando a aplicação corre só com o caminho síncrono.
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_database_url() -> str:
+    """Devolve o URL assíncrono configurado ou deriva-o do URL síncrono."""
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = make_url(settings.database_url)
+    if url.drivername == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+        if sqlite_path and settings.sqlite_read_only_readers:
+            return _read_only_url(url.render_as_string(hide_password=False), sqlite_path)
+    return url.render_as_string(hide_password=False)
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    global _async_engine, _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        _async_engine = create_async_engine(get_async_database_url())
+        if sqlite_path and not settings.async_database_url:
+            apply_sqlite_profile(_async_engine.sync_engine, read_only=settings.sqlite_read_only_readers)
+        if settings.query_profiler_enabled:
+            profile_queries(_async_engine.sync_engine)
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _AsyncSessionLocal
+
+
+# Dependency para obter uma sessão assíncrona do banco de dados
+async def get_async_db():
+    started = time.perf_counter()
+    try:
+        async with get_async_sessionmaker()() as db:
+            yield db
+    finally:
+        observe_session("async", started)
@@ -0,0 +1,361 @@
+# app/core/dataset.py
+import hashlib
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config.settings import get_settings
+from app.core.database import ReadSessionLocal, write_transaction
+from app.core.schema import migrate
+from app.models.dataset import DatasetChange, DatasetVersion
+from app.models.quantities import Quantity, PrintType
+
+# Sufixo das tabelas-sombra onde a nova versão dos dados é construída
+SHADOW_SUFFIX = "_shadow"
+
+# Tabelas trocadas em bloco a cada importação
+DATASET_TABLES = (Quantity.__tablename__, PrintType.__tablename__)
+
+QUANTITY_COLUMNS = ("print_type", "run_length", "waste_sheets", "adjustment", "is_special_case")
+
+
+def get_dataset_version(db: Session) -> int:
+    """Devolve a versão atual do conjunto de dados (0 se nunca foi importado)."""
+    return db.execute(select(func.max(DatasetVersion.id))).scalar() or 0
+
+
+def read_dataset_version() -> int:
+    """Lê a versão atual numa sessão de leitura própria (consulta por chave primária)."""
+    db = ReadSessionLocal()
+    try:
+        return get_dataset_version(db)
+    finally:
+        db.close()
+
+
+# Última versão lida por current_dataset_version() e instante da leitura
+_known_version: Optional[int] = None
+_version_checked = 0.0
+_version_lock = threading.Lock()
+
+
+def dataset_version_needs_check() -> bool:
+    """Indica se current_dataset_version() vai ler a base de dados nesta chamada."""
+    return _known_version is None or time.monotonic() - _version_checked >= get_settings().lookup_index_check_interval
+
+
+def current_dataset_version() -> int:
+    """
+    Versão atual do conjunto de dados, relida no máximo uma vez por
+    `lookup_index_check_interval` segundos. Para caches que não podem
+    consultar a base de dados em cada pedido. Pode bloquear na leitura: a
+    partir do event loop usar dataset_version_needs_check() para decidir se
+    deve correr no threadpool.
+    """
+    global _known_version, _version_checked
+    if not dataset_version_needs_check():
+        return _known_version
+
+    with _version_lock:
+        if dataset_version_needs_check():
+            _known_version = read_dataset_version()
+            _version_checked = time.monotonic()
+        return _known_version
+
+
+def get_changed_print_types(db: Session, since_version: int, version: int) -> Optional[Set[str]]:
+    """
+    Tipos de impressão alterados pelas versões em (since_version, version].
+    Devolve None se alguma dessas versões foi uma importação completa (sem
+    registo de alterações), caso em que tudo deve ser considerado alterado.
+    """
+    if version <= since_version:
+        return set()
+    rows = db.execute(
+        select(DatasetChange.version, DatasetChange.print_type)
+        .where(DatasetChange.version > since_version, DatasetChange.version <= version)
+    ).all()
+    if len({v for v, _ in rows}) != version - since_version:
+        return None
+    return {print_type for _, print_type in rows}
+
+
+def bump_dataset_version(db: Session, source: Optional[str] = None, row_count: int = 0) -> int:
+    """
+    Regista uma nova versão do conjunto de dados na sessão fornecida.
+    Deve ser chamado na mesma transação que altera os dados.
+    """
+    version = DatasetVersion(source=source, row_count=row_count, created_at=datetime.utcnow())
+    db.add(version)
+    db.flush()
+    return version.id
+
+
+def _object_sql(cursor, object_type: str, table: str):
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = ? AND tbl_name = ? AND sql IS NOT NULL",
+        (object_type, table),
+    )
+    return cursor.fetchall()
+
+
+def _create_shadow_table(cursor, table: str):
+    """
+    Cria a tabela-sombra com a mesma definição da tabela ativa (sem índices).
+    Chaves estrangeiras para outras tabelas do conjunto de dados passam a
+    apontar para as respetivas sombras; ao renomear as sombras no fim da
+    troca o SQLite volta a escrever as referências com os nomes finais.
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS {table}{SHADOW_SUFFIX}")
+    (_, table_sql), = _object_sql(cursor, "table", table)
+    shadow_sql = re.sub(
+        rf'^CREATE TABLE\s+["`\[]?{table}["`\]]?',
+        f"CREATE TABLE {table}{SHADOW_SUFFIX}",
+        table_sql,
+        count=1,
+    )
+    for parent in DATASET_TABLES:
+        shadow_sql = re.sub(
+            rf'REFERENCES\s+["`\[]?{parent}["`\]]?(?=\s*\()',
+            f"REFERENCES {parent}{SHADOW_SUFFIX} ",
+            shadow_sql,
+        )
+    cursor.execute(shadow_sql)
+
+
+def _insert_dataset(cursor, suffix: str, quantities: Iterable[Tuple], print_types: Optional[Sequence[str]]) -> int:
+    """
+    Insere os registros em bloco (executemany) nas tabelas `<tabela><suffix>`.
+    Sem lista de tipos de impressão, estes são derivados dos próprios registros
+    pela ordem em que aparecem. Devolve o número de registros de quantidades.
+    """
+    quantities_table = f"{Quantity.__tablename__}{suffix}"
+    print_types_table = f"{PrintType.__tablename__}{suffix}"
+    placeholders = ", ".join("?" for _ in QUANTITY_COLUMNS)
+
+    cursor.executemany(
+        f"INSERT INTO {quantities_table} ({', '.join(QUANTITY_COLUMNS)}) VALUES ({placeholders})",
+        quantities,
+    )
+    if print_types is None:
+        cursor.execute(
+            f"INSERT INTO {print_types_table} (name) "
+            f"SELECT print_type FROM {quantities_table} GROUP BY print_type ORDER BY MIN(id)"
+        )
+    else:
+        cursor.executemany(
+            f"INSERT INTO {print_types_table} (name) VALUES (?)",
+            [(name,) for name in print_types],
+        )
+    return cursor.execute(f"SELECT COUNT(*) FROM {quantities_table}").fetchone()[0]
+
+
+def _record_version(cursor, source: Optional[str], row_count: int) -> int:
+    cursor.execute(
+        f"INSERT INTO {DatasetVersion.__tablename__} (source, row_count, created_at) VALUES (?, ?, ?)",
+        (source, row_count, datetime.utcnow().isoformat(sep=" ")),
+    )
+    return cursor.lastrowid
+
+
+def swap_in_dataset(
+    quantities: Iterable[Tuple],
+    print_types: Optional[Sequence[str]] = None,
+    source: Optional[str] = None,
+) -> int:
+    """
+    Publica um novo conjunto de dados sem que a API veja uma tabela vazia.
+
+    Os registros são carregados em tabelas-sombra numa primeira transação;
+    numa segunda, curta, as tabelas ativas são substituídas pelas sombras,
+    os índices são recriados e é registada uma nova versão. Em modo WAL os
+    leitores continuam a ler o snapshot anterior até ao COMMIT e passam
+    diretamente para os novos dados.
+
+    `quantities` são tuplos pela ordem de QUANTITY_COLUMNS (pode ser um
+    gerador, consumido uma única vez). Devolve o número da nova versão.
+    """
+    # Garante que o esquema (tabelas ativas, versões, índices) está atualizado
+    migrate()
+
+    with write_transaction(relaxed=True) as cursor:
+        for table in DATASET_TABLES:
+            _create_shadow_table(cursor, table)
+        row_count = _insert_dataset(cursor, SHADOW_SUFFIX, quantities, print_types)
+
+    with write_transaction() as cursor:
+        for table in DATASET_TABLES:
+            index_sql = [sql for _, sql in _object_sql(cursor, "index", table)]
+            cursor.execute(f"DROP TABLE {table}")
+            cursor.execute(f"ALTER TABLE {table}{SHADOW_SUFFIX} RENAME TO {table}")
+            for sql in index_sql:
+                cursor.execute(sql)
+        version = _record_version(cursor, source, row_count)
+
+    return version
+
+
+def replace_dataset_in_place(
+    quantities: Iterable[Tuple],
+    print_types: Optional[Sequence[str]] = None,
+    source: Optional[str] = None,
+) -> int:
+    """
+    Apaga e reinsere os registros diretamente nas tabelas ativas, numa única
+    transação. Os leitores ficam bloqueados (ou veem o snapshot anterior em
+    WAL) durante toda a carga. Devolve o número da nova versão.
+    """
+    migrate()
+
+    with write_transaction() as cursor:
+        for table in DATASET_TABLES:
+            cursor.execute(f"DELETE FROM {table}")
+        row_count = _insert_dataset(cursor, "", quantities, print_types)
+        version = _record_version(cursor, source, row_count)
+
+    return version
+
+
+class DatasetDelta:
+    """Resumo de uma importação incremental."""
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.deleted = 0
+        self.unchanged = 0
+        self.duplicates = 0
+        self.changed_print_types: Set[str] = set()
+        self.version: Optional[int] = None
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated + self.deleted
+
+    def __str__(self):
+        text = (f"{self.inserted:,} inseridos, {self.updated:,} atualizados, "
+                f"{self.deleted:,} removidos, {self.unchanged:,} inalterados")
+        if self.duplicates:
+            text += f", {self.duplicates:,} repetidos ignorados"
+        if self.changed_print_types:
+            text += f"; tipos alterados: {', '.join(sorted(self.changed_print_types))}"
+        return text
+
+
+def row_hash(waste_sheets, adjustment, is_special_case) -> bytes:
+    """
+    Hash do conteúdo de uma linha (tudo exceto a chave print_type/run_length).
+    Os valores são normalizados para que a mesma linha lida do Excel ou da
+    base de dados (onde booleanos são 0/1) produza o mesmo hash.
+    """
+    content = f"{int(waste_sheets)}\x1f{'' if adjustment is None else adjustment}\x1f{int(bool(is_special_case))}"
+    return hashlib.blake2b(content.encode(), digest_size=8).digest()
+
+
+def _existing_hashes(cursor) -> Tuple[Dict[Tuple[str, int], Tuple[int, bytes]], List[Tuple[int, str]]]:
+    """
+    Chave (tipo, tiragem) -> (id, hash) das linhas ativas, mais (id, tipo) das
+    linhas com chave repetida (de importações completas antigas), que a
+    importação incremental remove: em cada chave vale a primeira linha.
+    """
+    cursor.execute(
+        f"SELECT id, {', '.join(QUANTITY_COLUMNS)} FROM {Quantity.__tablename__} ORDER BY id"
+    )
+    existing = {}
+    repeated = []
+    for row_id, print_type, run_length, waste_sheets, adjustment, special in cursor:
+        key = (print_type, run_length)
+        if key in existing:
+            repeated.append((row_id, print_type))
+        else:
+            existing[key] = (row_id, row_hash(waste_sheets, adjustment, special))
+    return existing, repeated
+
+
+def apply_dataset_delta(quantities: Iterable[Tuple], source: Optional[str] = None) -> DatasetDelta:
+    """
+    Importação incremental: compara os registros recebidos com os ativos pela
+    chave (print_type, run_length) e pelo hash do conteúdo, e insere, atualiza
+    ou remove apenas o que mudou, numa única transação.
+
+    `quantities` são tuplos pela ordem de QUANTITY_COLUMNS; chaves repetidas
+    ficam só com a primeira ocorrência. Só é registada uma nova versão (com
+    a lista de tipos alterados, para invalidar apenas esses nas caches) se
+    houver alterações. A escrita é proporcional ao tamanho da alteração.
+    """
+    migrate()
+    delta = DatasetDelta()
+    quantities_table = Quantity.__tablename__
+    print_types_table = PrintType.__tablename__
+
+    with write_transaction() as cursor:
+        existing, repeated = _existing_hashes(cursor)
+        seen: Set[Tuple[str, int]] = set()
+        inserts: List[Tuple] = []
+        updates: List[Tuple] = []
+        new_print_types: List[str] = []
+
+        for row in quantities:
+            print_type, run_length, waste_sheets, adjustment, special = row
+            key = (print_type, run_length)
+            if key in seen:
+                delta.duplicates += 1
+                continue
+            seen.add(key)
+
+            current = existing.get(key)
+            if current is None:
+                inserts.append(row)
+                if print_type not in delta.changed_print_types:
+                    new_print_types.append(print_type)
+                delta.changed_print_types.add(print_type)
+            elif current[1] != row_hash(waste_sheets, adjustment, special):
+                updates.append((waste_sheets, adjustment, special, current[0]))
+                delta.changed_print_types.add(print_type)
+            else:
+                delta.unchanged += 1
+
+        removed = [key for key in existing if key not in seen]
+        deletes = [(existing[key][0],) for key in removed] + [(row_id,) for row_id, _ in repeated]
+        delta.changed_print_types.update(print_type for print_type, _ in removed)
+        delta.changed_print_types.update(print_type for _, print_type in repeated)
+        delta.inserted, delta.updated, delta.deleted = len(inserts), len(updates), len(deletes)
+        if not delta.changed:
+            return delta
+
+        # Tipos novos vão para o fim da lista; tipos que ficaram sem linhas saem
+        cursor.executemany(
+            f"INSERT OR IGNORE INTO {print_types_table} (name) VALUES (?)",
+            [(name,) for name in new_print_types],
+        )
+
+        placeholders = ", ".join("?" for _ in QUANTITY_COLUMNS)
+        cursor.executemany(
+            f"INSERT INTO {quantities_table} ({', '.join(QUANTITY_COLUMNS)}) VALUES ({placeholders})",
+            inserts,
+        )
+        cursor.executemany(
+            f"UPDATE {quantities_table} SET waste_sheets = ?, adjustment = ?, is_special_case = ? WHERE id = ?",
+            updates,
+        )
+        cursor.executemany(f"DELETE FROM {quantities_table} WHERE id = ?", deletes)
+
+        changed = sorted(delta.changed_print_types)
+        cursor.execute(
+            f"DELETE FROM {print_types_table} WHERE name IN ({', '.join('?' for _ in changed)}) "
+            f"AND NOT EXISTS (SELECT 1 FROM {quantities_table} WHERE print_type = name)",
+            changed,
+        )
+
+        row_count = len(existing) + len(inserts) - len(removed)
+        delta.version = _record_version(cursor, source, row_count)
+        cursor.executemany(
+            f"INSERT INTO {DatasetChange.__tablename__} (version, print_type) VALUES (?, ?)",
+            [(delta.version, name) for name in changed],
+        )
+
+    return delta
@@ -0,0 +1,60 @@
+# app/core/http_cache.py
+"""
+Cache HTTP das rotas de leitura, ligado à versão do conjunto de dados.
+
+As respostas de GET /api/print-types e GET /api/waste-calculation dependem
+apenas dos dados importados, por isso o ETag (forte) é derivado da versão do
+conjunto de dados: muda a cada importação e é igual entre workers. Um pedido
+com If-None-Match igual ao ETag atual recebe 304 sem consultar o repository.
+O Cache-Control (max-age configurável) permite a browsers e proxies servirem
+as respostas sem sequer revalidar durante esse intervalo.
+"""
+from typing import Dict, Optional
+
+from fastapi import Response
+
+from app.config.settings import get_settings
+
+
+def dataset_etag(version: int) -> str:
+    return f'"dataset-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Compara o header If-None-Match com o ETag atual (comparação fraca,
+    como pede a RFC 9110 para If-None-Match). Aceita listas e "*".
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+def cache_headers(version: int) -> Dict[str, str]:
+    """Headers ETag e Cache-Control da versão indicada ({} se o cache HTTP estiver desligado)."""
+    settings = get_settings()
+    if not settings.http_cache_enabled:
+        return {}
+    max_age = settings.http_cache_max_age
+    cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+    return {"ETag": dataset_etag(version), "Cache-Control": cache_control}
+
+
+def not_modified(if_none_match: Optional[str], headers: Dict[str, str]) -> Optional[Response]:
+    """Resposta 304 se o cliente já tem a versão atual, caso contrário None."""
+    if headers and etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+def with_headers(result, response: Response, headers: Dict[str, str]):
+    """Acrescenta os headers ao resultado do endpoint (Response própria ou a injetada pelo FastAPI)."""
+    target = result if isinstance(result, Response) else response
+    target.headers.update(headers)
+    return result
@@ -0,0 +1,289 @@
+# app/core/metrics.py
+"""
+Métricas do processo em formato de texto Prometheus (exposto em /metrics).
+
+Cada pedido HTTP é medido por MetricsMiddleware: latência total por rota e,
+dentro do pedido, o tempo de cada etapa:
+  - dependency:    criação das dependências (sessão, serviço, índice);
+  - query:         chamadas ao repository;
+  - serialization: desde o fim do endpoint até ao início da resposta
+                   (validação do response_model, codificação e render).
+As etapas são acumuladas num objeto por pedido guardado numa ContextVar,
+que é visível também nas funções executadas no threadpool.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi.exception_handlers import http_exception_handler
+from fastapi.routing import APIRoute
+
+# Limites (segundos) dos histogramas de latência
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rótulo de rota para pedidos que não correspondem a nenhuma rota da API
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # por conjunto de rótulos: [contagens por intervalo (+Inf no fim), soma]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Latência dos pedidos HTTP por rota.", ("method", "route")))
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "http_requests_total", "Pedidos HTTP por rota e código de resposta.", ("method", "route", "status")))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "http_request_stage_duration_seconds", "Tempo de cada etapa do pedido (dependency, query, serialization).",
+    ("route", "stage")))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Pedidos HTTP em curso."))
+NOT_FOUND_TOTAL = REGISTRY.register(Counter(
+    "http_not_found_total", "Respostas 404 originadas por NotFoundException.", ("route",)))
+DB_SESSION_SECONDS = REGISTRY.register(Histogram(
+    "db_session_duration_seconds", "Tempo de vida das sessões de base de dados.", ("kind",)))
+
+
+class RequestTimings:
+    """Tempos acumulados de um pedido, partilhados através de uma ContextVar."""
+    __slots__ = ("stages", "endpoint_done", "response_started")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.endpoint_done: Optional[float] = None
+        self.response_started: Optional[float] = None
+
+    def add(self, stage_name: str, seconds: float):
+        self.stages[stage_name] = self.stages.get(stage_name, 0.0) + seconds
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Soma o tempo do bloco à etapa `name` do pedido atual (se houver um)."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def observe_session(kind: str, started: float):
+    """Regista o tempo de vida de uma sessão criada em `started` (perf_counter)."""
+    DB_SESSION_SECONDS.observe(time.perf_counter() - started, kind=kind)
+
+
+def route_label(scope) -> str:
+    """Caminho da rota (ex: /api/waste-calculation), nunca o URL concreto."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede cada pedido HTTP e as suas etapas."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                timings.response_started = time.perf_counter()
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            _current_timings.reset(token)
+
+            route = route_label(scope)
+            REQUEST_SECONDS.observe(elapsed, method=scope["method"], route=route)
+            REQUESTS_TOTAL.inc(method=scope["method"], route=route, status=str(status_code))
+            for name, seconds in timings.stages.items():
+                STAGE_SECONDS.observe(seconds, route=route, stage=name)
+            if timings.endpoint_done is not None and timings.response_started is not None:
+                STAGE_SECONDS.observe(
+                    timings.response_started - timings.endpoint_done, route=route, stage="serialization"
+                )
+
+
+def _timed_endpoint(endpoint):
+    """
+    Marca o fim da execução do endpoint, início da etapa de serialização.
+    Pedidos que terminam com exceção não têm etapa de serialização.
+    """
+    def mark_done():
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.endpoint_done = time.perf_counter()
+
+    if asyncio.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            mark_done()
+            return result
+    else:
+        @wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            result = endpoint(*args, **kwargs)
+            mark_done()
+            return result
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute cujo endpoint regista o momento em que termina (ver MetricsMiddleware)."""
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+
+async def not_found_handler(request, exc):
+    """Conta as respostas 404 de NotFoundException por rota e responde como o FastAPI."""
+    NOT_FOUND_TOTAL.inc(route=route_label(request.scope))
+    return await http_exception_handler(request, exc)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
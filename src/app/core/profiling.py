@@ -0,0 +1,36 @@
+# app/core/profiling.py
+"""
+Contagem de consultas SQL por pedido (ver profile_queries em app/core/database.py).
+
+Em modo debug, QueryStatsMiddleware acrescenta a cada resposta o número de
+consultas e o tempo total passado na base de dados, o que torna visíveis
+padrões N+1 ou consultas que deixaram de usar um índice logo no primeiro
+pedido a um endpoint novo.
+"""
+from app.core.database import start_query_stats
+
+QUERY_COUNT_HEADER = b"x-db-query-count"
+QUERY_TIME_HEADER = b"x-db-time-ms"
+
+
+class QueryStatsMiddleware:
+    """Middleware ASGI que expõe as consultas do pedido nos headers da resposta."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = start_query_stats()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_COUNT_HEADER, str(stats.count).encode()))
+                headers.append((QUERY_TIME_HEADER, f"{stats.seconds * 1000:.3f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,35 @@
+# app/core/responses.py
+"""
+Serialização JSON do caminho rápido (lean_responses_enabled).
+
+Usa o orjson quando está instalado e, na sua falta, o módulo json com a
+mesma codificação compacta do JSONResponse do FastAPI. As respostas são
+serializadas uma única vez: o conteúdo é devolvido numa FastJSONResponse
+em vez de passar pela validação do response_model e pelo jsonable_encoder.
+"""
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # dependência opcional
+    orjson = None
+
+
+def dump_json(content) -> bytes:
+    """Serializa tipos JSON simples (dict, list, str, int, float, bool, None)."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse serializada com dump_json. Conteúdo em bytes é tratado
+    como JSON já serializado (ex: respostas do cache) e enviado tal como está.
+    """
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dump_json(content)
@@ -0,0 +1,150 @@
+# app/core/schema.py
+"""
+Migrações versionadas do esquema da base de dados.
+
+Cada migração tem um número, uma descrição e uma função que recebe um
+cursor sqlite3 numa transação de escrita. A tabela `schema_version` guarda
+as migrações já aplicadas; `migrate()` aplica as pendentes por ordem, cada
+uma na sua transação, e é idempotente. Em produção corre uma vez antes de
+arrancar a aplicação (scripts/migrate.py); em desenvolvimento corre no
+arranque (create_schema_on_startup).
+
+As migrações verificam o estado atual antes de alterar o esquema, porque
+uma base criada de raiz já tem as tabelas na definição mais recente dos
+modelos (migração 1).
+"""
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.core.database import Base, engine, write_transaction
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+# Índice de cobertura da procura (print_type, run_length >= x)
+LOOKUP_INDEX = "ix_quantities_lookup"
+LOOKUP_INDEX_COLUMNS = ("print_type", "run_length", "waste_sheets", "adjustment", "is_special_case")
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable
+
+
+def _create_tables(cursor):
+    """Tabelas em falta (com os seus índices), na definição atual dos modelos."""
+    # Os modelos têm de estar importados para constarem do metadata
+    import app.models.dataset  # noqa: F401
+    import app.models.quantities  # noqa: F401
+
+    existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()}
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing:
+            continue
+        cursor.execute(str(CreateTable(table).compile(dialect=engine.dialect)))
+        for index in table.indexes:
+            cursor.execute(str(CreateIndex(index).compile(dialect=engine.dialect)))
+
+
+def _add_lookup_index(cursor):
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {LOOKUP_INDEX} ON quantities ({', '.join(LOOKUP_INDEX_COLUMNS)})"
+    )
+
+
+def _add_print_type_foreign_key(cursor):
+    """
+    Chave estrangeira quantities.print_type -> print_types.name.
+    O SQLite não acrescenta restrições com ALTER TABLE, por isso a tabela é
+    recriada (nova definição, cópia, troca de nomes e índices). Tipos que só
+    existam em quantities são antes acrescentados a print_types.
+    """
+    foreign_keys = cursor.execute("PRAGMA foreign_key_list(quantities)").fetchall()
+    if any(fk[2] == "print_types" and fk[3] == "print_type" for fk in foreign_keys):
+        return
+
+    cursor.execute(
+        "INSERT OR IGNORE INTO print_types (name) "
+        "SELECT print_type FROM quantities GROUP BY print_type ORDER BY MIN(id)"
+    )
+    table_sql = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'quantities'"
+    ).fetchone()[0]
+    index_sql = [row[0] for row in cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'quantities' AND sql IS NOT NULL"
+    ).fetchall()]
+
+    body = table_sql[table_sql.index("(") + 1:table_sql.rindex(")")].rstrip()
+    cursor.execute(
+        f"CREATE TABLE quantities_migration ({body}, "
+        f"FOREIGN KEY(print_type) REFERENCES print_types (name))"
+    )
+    cursor.execute("INSERT INTO quantities_migration SELECT * FROM quantities")
+    cursor.execute("DROP TABLE quantities")
+    cursor.execute("ALTER TABLE quantities_migration RENAME TO quantities")
+    for sql in index_sql:
+        cursor.execute(sql)
+
+
+# Lista ordenada de migrações; novas migrações entram sempre no fim
+MIGRATIONS: List[Migration] = [
+    Migration(1, "tabelas base", _create_tables),
+    Migration(2, "índice de cobertura (print_type, run_length, waste_sheets, adjustment, is_special_case)", _add_lookup_index),
+    Migration(3, "chave estrangeira quantities.print_type -> print_types.name", _add_print_type_foreign_key),
+]
+
+
+def _ensure_version_table(cursor):
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, description VARCHAR(255) NOT NULL, applied_at DATETIME NOT NULL)"
+    )
+
+
+def _current_version(cursor) -> int:
+    _ensure_version_table(cursor)
+    return cursor.execute(f"SELECT COALESCE(MAX(version), 0) FROM {SCHEMA_VERSION_TABLE}").fetchone()[0]
+
+
+def get_schema_version() -> int:
+    """
+    Última migração aplicada (0 numa base sem migrações). Lida com um SELECT
+    simples, sem criar a tabela de versões nem tomar o lock de escrita (a
+    base pode ainda não existir, por isso não se usam os leitores só de
+    leitura).
+    """
+    with engine.connect() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": SCHEMA_VERSION_TABLE},
+        ).first()
+        if exists is None:
+            return 0
+        return connection.execute(text(f"SELECT COALESCE(MAX(version), 0) FROM {SCHEMA_VERSION_TABLE}")).scalar_one()
+
+
+def migrate() -> List[Migration]:
+    """
+    Aplica as migrações pendentes por ordem. Devolve as que foram aplicadas.
+    Sem migrações pendentes não toma o lock de escrita. A versão é
+    verificada de novo dentro da transação de cada migração, pelo que vários
+    processos a migrar ao mesmo tempo não aplicam nada duas vezes.
+    """
+    if get_schema_version() >= MIGRATIONS[-1].version:
+        return []
+
+    applied = []
+    for migration in MIGRATIONS:
+        with write_transaction() as cursor:
+            if _current_version(cursor) >= migration.version:
+                continue
+            migration.apply(cursor)
+            cursor.execute(
+                f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.description, datetime.utcnow().isoformat(sep=" ")),
+            )
+        applied.append(migration)
+    return applied
@@ -0,0 +1,2 @@
+# app/ingestion/__init__.py
+# Inicialização do pacote de ingestão de dados
\ No newline at end of file
@@ -0,0 +1,139 @@
+# app/ingestion/anomalies.py
+"""
+Deteção de anomalias no desperdício dos trabalhos importados para o
+histórico, numa única passagem.
+
+Cada grupo (print_type, faixa de tiragem, machine) mantém a contagem, a
+média e a soma dos quadrados dos desvios (algoritmo de Welford), atualizadas
+em O(1) por trabalho. Cada trabalho é comparado com as estatísticas do seu
+grupo *antes* de entrar nelas: com pelo menos `anomaly_min_samples`
+trabalhos no grupo, um desperdício a mais de `anomaly_z_threshold` desvios
+padrão da média é registado na tabela waste_anomalies.
+
+As estatísticas ficam guardadas em waste_group_stats, pelo que uma
+importação seguinte continua de onde a anterior ficou. Os grupos usam as
+faixas de tiragem dos sketches (SKETCH_RUN_BANDS).
+"""
+import math
+from typing import Dict, List, Sequence, Tuple
+
+from app.config.settings import get_settings
+from app.ingestion.sketches import run_band
+
+ANOMALY_TABLE = "waste_anomalies"
+GROUP_STATS_TABLE = "waste_group_stats"
+
+# Colunas do trabalho copiadas para a tabela de anomalias
+ANOMALY_JOB_COLUMNS = ("job_number", "date", "client_code", "machine", "print_type", "run_length", "waste_sheets")
+
+GroupKey = Tuple[str, int, str]
+
+
+class RunningStats:
+    """Média e variância incrementais (Welford)."""
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+def create_anomaly_tables(cursor):
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {GROUP_STATS_TABLE} ("
+        "print_type VARCHAR(10) NOT NULL, band_low INTEGER NOT NULL, machine VARCHAR(30) NOT NULL, "
+        "count INTEGER NOT NULL, mean REAL NOT NULL, m2 REAL NOT NULL, "
+        "PRIMARY KEY (print_type, band_low, machine)) WITHOUT ROWID"
+    )
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {ANOMALY_TABLE} ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "job_number VARCHAR(20), date DATE, client_code VARCHAR(10), machine VARCHAR(30), "
+        "print_type VARCHAR(10) NOT NULL, run_length INTEGER NOT NULL, waste_sheets INTEGER NOT NULL, "
+        "expected_waste REAL NOT NULL, std REAL NOT NULL, score REAL NOT NULL, samples INTEGER NOT NULL)"
+    )
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS ix_{ANOMALY_TABLE}_date ON {ANOMALY_TABLE} (date)")
+
+
+def _load_stats(cursor, keys) -> Dict[GroupKey, RunningStats]:
+    # Importado só quando usado (o módulo do histórico depende do numpy)
+    from app.ingestion.history_schema import select_by_keys
+
+    stats = {key: RunningStats() for key in keys}
+    for print_type, band_low, machine, *values in select_by_keys(
+        cursor, GROUP_STATS_TABLE, ("print_type", "band_low", "machine"), ("count", "mean", "m2"), stats
+    ):
+        stats[(print_type, band_low, machine)] = RunningStats(*values)
+    return stats
+
+
+def detect_anomalies(cursor, rows: Sequence[Tuple]) -> int:
+    """
+    Passa um bloco de trabalhos (tuplos pela ordem de JOB_COLUMNS, pela ordem
+    de importação) pelas estatísticas dos grupos, regista as anomalias e
+    grava as estatísticas atualizadas. Devolve o número de anomalias.
+    """
+    from app.ingestion.pipeline import JOB_COLUMNS
+
+    if not rows:
+        return 0
+    settings = get_settings()
+    threshold, min_samples = settings.anomaly_z_threshold, settings.anomaly_min_samples
+    position = {column: JOB_COLUMNS.index(column) for column in ANOMALY_JOB_COLUMNS}
+    i_type, i_run, i_waste, i_machine = (position[c] for c in ("print_type", "run_length", "waste_sheets", "machine"))
+
+    keys = [(str(row[i_type]), run_band(row[i_run])[0], str(row[i_machine] or "")) for row in rows]
+    stats = _load_stats(cursor, set(keys))
+
+    flagged: List[Tuple] = []
+    for row, key in zip(rows, keys):
+        group = stats[key]
+        waste = row[i_waste]
+        if group.count >= min_samples:
+            std = group.std
+            deviation = waste - group.mean
+            if std > 0 and abs(deviation) > threshold * std:
+                flagged.append((*(row[position[c]] for c in ANOMALY_JOB_COLUMNS),
+                                group.mean, std, deviation / std, group.count))
+        group.update(waste)
+
+    cursor.executemany(
+        f"INSERT OR REPLACE INTO {GROUP_STATS_TABLE} (print_type, band_low, machine, count, mean, m2) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(*key, group.count, group.mean, group.m2) for key, group in stats.items()],
+    )
+    if flagged:
+        cursor.executemany(
+            f"INSERT INTO {ANOMALY_TABLE} ({', '.join(ANOMALY_JOB_COLUMNS)}, expected_waste, std, score, samples) "
+            f"VALUES ({', '.join('?' for _ in range(len(ANOMALY_JOB_COLUMNS) + 4))})",
+            flagged,
+        )
+    return len(flagged)
+
+
+def rebuild_anomalies(cursor, chunk_size: int = 100_000) -> int:
+    """Refaz estatísticas e anomalias percorrendo o histórico uma vez, pela ordem de importação."""
+    from app.ingestion.pipeline import JOB_COLUMNS
+
+    create_anomaly_tables(cursor)
+    cursor.execute(f"DELETE FROM {GROUP_STATS_TABLE}")
+    cursor.execute(f"DELETE FROM {ANOMALY_TABLE}")
+    source = cursor.connection.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM quantities ORDER BY id")
+    total = 0
+    while True:
+        rows = source.fetchmany(chunk_size)
+        if not rows:
+            break
+        total += detect_anomalies(cursor, rows)
+    return total
@@ -0,0 +1,189 @@
+# app/ingestion/eigal_sheet.py
+"""
+Leitor nativo da folha QUANTIDADES exportada do Excel da Eigal
+(ver docs/quantidades.csv).
+
+A folha é larga, separada por ';', com várias sub-tabelas lado a lado.
+As três primeiras linhas formam o cabeçalho:
+  1. títulos gerais ("Nº de Cadernos", notas);
+  2. nome de cada secção ("Miolo", "Capa / Diversos", ...);
+  3. nomes das colunas: cada bloco começa numa coluna "Tiragem", seguida
+     de colunas "Estrago <tipo>" (ex: "Estrago 4/4").
+Cada tipo de impressão ocupa uma ou mais colunas "Estrago"; a última é a
+quantidade total de folhas (tiragem + estrago), a partir da qual se obtém
+o desperdício. Os blocos sem coluna "Tiragem" (ex: "Nº de Cadernos") não
+têm chave de tiragem e são ignorados.
+
+Os números usam espaço como separador de milhares ("15 235") e vírgula
+decimal ("1 480,0") e são convertidos pelo próprio parser C do pandas.
+Os dados são lidos em blocos e transformados de forma vetorizada, pelo que
+o custo cresce linearmente com o tamanho do ficheiro.
+"""
+import csv
+import re
+from typing import Dict, Iterator, List, NamedTuple
+
+import pandas as pd
+
+from app.ingestion.pipeline import DEFAULT_CHUNK_SIZE
+
+HEADER_ROWS = 3
+ENCODING = "latin-1"
+SEPARATOR = ";"
+
+_PRINT_TYPE_RE = re.compile(r"(\d+\s*/\s*\d+)")
+
+
+class SheetBlock(NamedTuple):
+    """Sub-tabela da folha: coluna da tiragem e coluna de total por tipo de impressão."""
+    section: str
+    run_column: int
+    total_columns: Dict[str, int]
+
+
+def _read_header(path: str) -> List[List[str]]:
+    with open(path, newline="", encoding=ENCODING) as f:
+        reader = csv.reader(f, delimiter=SEPARATOR)
+        return [[cell.strip() for cell in row] for _, row in zip(range(HEADER_ROWS), reader)]
+
+
+def is_eigal_sheet(path: str) -> bool:
+    """Indica se o ficheiro tem o layout bruto da folha QUANTIDADES."""
+    if not path.lower().endswith(".csv"):
+        return False
+    try:
+        header = _read_header(path)
+    except (OSError, UnicodeError):
+        return False
+    if len(header) < HEADER_ROWS:
+        return False
+    labels = header[HEADER_ROWS - 1]
+    return "Tiragem" in labels and any(label.startswith("Estrago") for label in labels)
+
+
+def detect_blocks(header: List[List[str]]) -> List[SheetBlock]:
+    """
+    Identifica as sub-tabelas a partir das linhas de cabeçalho.
+    Um bloco vai de uma coluna "Tiragem" até à seguinte (ou ao fim da linha);
+    a secção é o último rótulo da segunda linha dentro do bloco, excluindo o
+    que está por cima da própria coluna da tiragem.
+    """
+    labels = header[HEADER_ROWS - 1]
+    sections = header[1] if len(header) > 1 else []
+    starts = [i for i, label in enumerate(labels) if label == "Tiragem"]
+
+    blocks = []
+    for n, start in enumerate(starts):
+        end = starts[n + 1] if n + 1 < len(starts) else len(labels)
+
+        section = f"Bloco {n + 1}"
+        for col in range(start + 1, min(end, len(sections))):
+            if sections[col]:
+                section = sections[col]
+
+        total_columns: Dict[str, int] = {}
+        for col in range(start + 1, end):
+            match = _PRINT_TYPE_RE.search(labels[col]) if labels[col].startswith("Estrago") else None
+            if match:
+                # a última coluna de cada tipo é o total (tiragem + estrago)
+                total_columns[match.group(1).replace(" ", "")] = col
+
+        if total_columns:
+            blocks.append(SheetBlock(section, start, total_columns))
+    return blocks
+
+
+def section_key(section: str) -> str:
+    """Nome curto da secção (ex: "Capa / Diversos" -> "Capa")."""
+    return re.split(r"[\s/]+", section.strip())[0] or section
+
+
+def qualified_print_types(blocks: List[SheetBlock]) -> Dict[tuple, str]:
+    """
+    Nome final de cada (secção, tipo). Tipos que aparecem em mais de uma
+    secção (ex: 4/4 no Miolo e na Capa) são prefixados com a secção
+    ("Miolo 4/4", "Capa 4/4"); os restantes mantêm o nome simples.
+    """
+    counts: Dict[str, int] = {}
+    for block in blocks:
+        for print_type in block.total_columns:
+            counts[print_type] = counts.get(print_type, 0) + 1
+
+    names = {}
+    for block in blocks:
+        for print_type in block.total_columns:
+            if counts[print_type] > 1:
+                names[(block.section, print_type)] = f"{section_key(block.section)} {print_type}"
+            else:
+                names[(block.section, print_type)] = print_type
+    return names
+
+
+def parse_numbers(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Garante colunas numéricas. O read_csv já converte o formato português
+    ("1 480,0") com thousands/decimal; colunas que ficaram como texto (ex:
+    separador de milhares não separável) são limpas de forma vetorizada.
+    """
+    text_columns = [col for col in frame.columns if frame[col].dtype == object]
+    if not text_columns:
+        return frame
+    frame = frame.copy()
+    for col in text_columns:
+        frame[col] = pd.to_numeric(
+            frame[col].str.replace(r"\s", "", regex=True).str.replace(",", ".", regex=False),
+            errors="coerce",
+        )
+    return frame
+
+
+def iter_eigal_frames(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Lê a folha em blocos e devolve DataFrames no formato longo normalizado:
+    section, print_type, run_length, waste_sheets.
+    Linhas sem tiragem ou sem total num bloco são ignoradas nesse bloco, e
+    repetições de (tipo, tiragem) ficam só com a primeira ocorrência.
+    """
+    blocks = detect_blocks(_read_header(path))
+    names = qualified_print_types(blocks)
+    used_columns = sorted({b.run_column for b in blocks} | {c for b in blocks for c in b.total_columns.values()})
+    seen = set()
+
+    reader = pd.read_csv(
+        path, sep=SEPARATOR, header=None, skiprows=HEADER_ROWS, usecols=used_columns,
+        thousands=" ", decimal=",", encoding=ENCODING, chunksize=chunk_size,
+    )
+    for chunk in reader:
+        numbers = parse_numbers(chunk)
+        parts = []
+        for block in blocks:
+            run_length = numbers[block.run_column]
+            for print_type, column in block.total_columns.items():
+                total = numbers[column]
+                valid = run_length.notna() & total.notna() & (run_length > 0) & (total >= run_length)
+                if not valid.any():
+                    continue
+                parts.append(pd.DataFrame({
+                    "section": block.section,
+                    "print_type": names[(block.section, print_type)],
+                    "run_length": run_length[valid].round().astype("int64"),
+                    "waste_sheets": (total[valid] - run_length[valid]).round().astype("int64"),
+                }))
+        if not parts:
+            continue
+
+        frame = pd.concat(parts, ignore_index=True).drop_duplicates(["print_type", "run_length"])
+        keys = list(zip(frame["print_type"], frame["run_length"]))
+        keep = [key not in seen for key in keys]
+        seen.update(keys)
+        frame = frame[keep]
+        if len(frame):
+            yield frame.reset_index(drop=True)
+
+
+def read_eigal_sheet(path: str) -> pd.DataFrame:
+    """Lê a folha completa para um único DataFrame no formato longo."""
+    frames = list(iter_eigal_frames(path))
+    if not frames:
+        return pd.DataFrame(columns=["section", "print_type", "run_length", "waste_sheets"])
+    return pd.concat(frames, ignore_index=True)
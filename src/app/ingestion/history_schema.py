@@ -0,0 +1,168 @@
+# app/ingestion/history_schema.py
+"""
+Esquema do histórico detalhado de trabalhos com codificação por dicionário.
+
+Os trabalhos ficam na tabela `jobs` com chaves inteiras para as dimensões
+repetidas em cada linha (print_types, clients, machines, paper_formats), em
+vez das strings. A vista `quantities` junta tudo de novo com as colunas de
+JOB_COLUMNS, pelo que os leitores do layout antigo (scripts de
+comparação, índice do histórico, reconstrução de rollups e sketches)
+continuam a funcionar sem alterações, tanto nesta base como nas antigas.
+
+O job_number fica na própria linha: é praticamente único por trabalho e um
+dicionário só acrescentaria uma tabela e um índice do mesmo tamanho.
+
+A codificação é feita por blocos (HistoryEncoder.encode): os valores
+distintos de cada dimensão no bloco são inseridos de uma vez com INSERT OR
+IGNORE e os seus ids lidos em lotes; os dicionários ficam em memória
+durante a importação, pelo que cada valor só vai à base de dados na
+primeira vez que aparece.
+"""
+from operator import itemgetter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+JOBS_TABLE = "jobs"
+
+# Valores por consulta IN (...): abaixo do SQLITE_MAX_VARIABLE_NUMBER mais
+# baixo (999, em versões do SQLite anteriores à 3.32)
+MAX_BOUND_VARIABLES = 500
+
+# Dimensões codificadas: coluna do trabalho -> (tabela do dicionário, coluna do valor, chave em jobs)
+HISTORY_DIMENSIONS: Dict[str, Tuple[str, str, str]] = {
+    "print_type": ("print_types", "name", "print_type_id"),
+    "client_code": ("clients", "code", "client_id"),
+    "machine": ("machines", "name", "machine_id"),
+    "paper_format": ("paper_formats", "name", "paper_format_id"),
+}
+
+# Colunas de `jobs`, pela ordem dos tuplos produzidos por HistoryEncoder.encode
+JOBS_COLUMNS = (
+    "print_type_id", "run_length", "waste_sheets", "date", "client_id", "job_number",
+    "paper_format_id", "paper_gsm", "machine_id", "adjustment", "is_special_case",
+)
+
+
+def create_history_schema(cursor):
+    """Tabelas de dicionário, tabela jobs, índices e a vista quantities (layout antigo)."""
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS print_types ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR(10) NOT NULL UNIQUE, "
+        "description VARCHAR(100), front_colors INTEGER, back_colors INTEGER)"
+    )
+    cursor.execute("CREATE TABLE IF NOT EXISTS clients (id INTEGER PRIMARY KEY, code VARCHAR(10) NOT NULL UNIQUE)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS machines (id INTEGER PRIMARY KEY, name VARCHAR(30) NOT NULL UNIQUE)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS paper_formats (id INTEGER PRIMARY KEY, name VARCHAR(10) NOT NULL UNIQUE)")
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {JOBS_TABLE} ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "print_type_id INTEGER NOT NULL REFERENCES print_types (id), "
+        "run_length INTEGER NOT NULL, waste_sheets INTEGER NOT NULL, date DATE, "
+        "client_id INTEGER REFERENCES clients (id), job_number VARCHAR(20), "
+        "paper_format_id INTEGER REFERENCES paper_formats (id), paper_gsm INTEGER, "
+        "machine_id INTEGER REFERENCES machines (id), adjustment VARCHAR(20), is_special_case BOOLEAN DEFAULT 0)"
+    )
+    cursor.execute(
+        "CREATE VIEW IF NOT EXISTS quantities AS "
+        "SELECT j.id AS id, t.name AS print_type, j.run_length AS run_length, j.waste_sheets AS waste_sheets, "
+        "j.date AS date, c.code AS client_code, j.job_number AS job_number, f.name AS paper_format, "
+        "j.paper_gsm AS paper_gsm, m.name AS machine, j.adjustment AS adjustment, "
+        "j.is_special_case AS is_special_case "
+        f"FROM {JOBS_TABLE} j JOIN print_types t ON t.id = j.print_type_id "
+        "LEFT JOIN clients c ON c.id = j.client_id "
+        "LEFT JOIN paper_formats f ON f.id = j.paper_format_id "
+        "LEFT JOIN machines m ON m.id = j.machine_id"
+    )
+
+
+def create_history_indexes(cursor):
+    """Índices de jobs; criados depois da carga, como no layout antigo."""
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_jobs_print_type_run ON {JOBS_TABLE} (print_type_id, run_length)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_jobs_date ON {JOBS_TABLE} (date)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_jobs_client ON {JOBS_TABLE} (client_id)")
+
+
+def has_encoded_history(cursor) -> bool:
+    return cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (JOBS_TABLE,)
+    ).fetchone() is not None
+
+
+def select_by_keys(cursor, table: str, key_columns: Sequence[str], columns: Sequence[str], keys) -> List[Tuple]:
+    """
+    Linhas (key_columns + columns) da tabela cujas chaves compostas estão em
+    `keys`. As chaves vão numa lista VALUES juntada à tabela pela chave
+    primária, em lotes abaixo do limite de variáveis por instrução, em vez
+    de uma consulta por chave.
+    """
+    keys = list(keys)
+    per_batch = max(MAX_BOUND_VARIABLES // len(key_columns), 1)
+    row_placeholder = f"({', '.join('?' for _ in key_columns)})"
+    selected = ", ".join(f"t.{column}" for column in (*key_columns, *columns))
+    on = " AND ".join(f"t.{column} = k.column{i}" for i, column in enumerate(key_columns, 1))
+    rows: List[Tuple] = []
+    for start in range(0, len(keys), per_batch):
+        batch = keys[start:start + per_batch]
+        rows.extend(cursor.execute(
+            f"SELECT {selected} FROM (VALUES {', '.join(row_placeholder for _ in batch)}) AS k "
+            f"JOIN {table} AS t ON {on}",
+            [value for key in batch for value in key],
+        ).fetchall())
+    return rows
+
+
+class HistoryEncoder:
+    """Dicionários valor -> id de cada dimensão, partilhados pelos blocos de uma importação."""
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.codes: Dict[str, Dict[str, int]] = {}
+        for column, (table, value_column, _) in HISTORY_DIMENSIONS.items():
+            self.codes[column] = dict(cursor.execute(f"SELECT {value_column}, id FROM {table}").fetchall())
+
+    def _add_values(self, column: str, values):
+        """Acrescenta ao dicionário (e à tabela) os valores ainda sem id."""
+        codes = self.codes[column]
+        new = sorted({str(value) for value in values} - codes.keys())
+        if not new:
+            return
+        table, value_column, _ = HISTORY_DIMENSIONS[column]
+        self.cursor.executemany(f"INSERT OR IGNORE INTO {table} ({value_column}) VALUES (?)", [(v,) for v in new])
+        # Ids lidos em lotes abaixo do limite de variáveis por instrução do SQLite
+        for start in range(0, len(new), MAX_BOUND_VARIABLES):
+            batch = new[start:start + MAX_BOUND_VARIABLES]
+            placeholders = ", ".join("?" for _ in batch)
+            codes.update(self.cursor.execute(
+                f"SELECT {value_column}, id FROM {table} WHERE {value_column} IN ({placeholders})", batch
+            ).fetchall())
+
+    def encode(self, rows: Sequence[Tuple]) -> List[Tuple]:
+        """
+        Tuplos pela ordem de JOB_COLUMNS -> tuplos pela ordem de JOBS_COLUMNS.
+        Cada coluna de dimensão é fatorizada (pd.factorize): só os valores
+        distintos do bloco passam pelo dicionário e os ids são espalhados
+        pelas linhas com uma indexação do numpy.
+        """
+        from app.ingestion.pipeline import JOB_COLUMNS
+
+        if not rows:
+            return []
+        columns = [list(map(itemgetter(i), rows)) for i in range(len(JOB_COLUMNS))]
+        for column in HISTORY_DIMENSIONS:
+            position = JOB_COLUMNS.index(column)
+            positions, uniques = pd.factorize(pd.Series(columns[position], dtype=object))
+            self._add_values(column, uniques)
+            codes = self.codes[column]
+            # O último elemento (None) é o id das posições -1 (valores em falta)
+            ids = np.array([codes[str(value)] for value in uniques] + [None], dtype=object)
+            columns[position] = ids[positions].tolist()
+        return list(zip(*columns))
+
+
+def insert_encoded_jobs(encoder: HistoryEncoder, rows: Sequence[Tuple]):
+    """Codifica um bloco de trabalhos e insere-o em jobs."""
+    encoder.cursor.executemany(
+        f"INSERT INTO {JOBS_TABLE} ({', '.join(JOBS_COLUMNS)}) VALUES ({', '.join('?' for _ in JOBS_COLUMNS)})",
+        encoder.encode(rows),
+    )
@@ -0,0 +1,159 @@
+# app/ingestion/rollups.py
+"""
+Tabelas de agregados (rollups) do histórico detalhado de trabalhos, para os
+relatórios de desperdício (/api/reports/...).
+
+Para cada período (dia e mês) e cada subconjunto das dimensões
+(client_code, machine, print_type) há uma tabela com uma linha por período
+e valores dessas dimensões, com os totais de trabalhos, folhas de
+desperdício, tiragem e casos especiais. Um relatório lê só a tabela do seu
+agrupamento (dimensões agrupadas e filtradas), que é tanto mais pequena
+quanto menos dimensões tiver: o total mensal por máquina são algumas
+dezenas de linhas, mesmo com milhões de trabalhos.
+
+As tabelas são mantidas de forma incremental: cada bloco importado é
+agregado com o pandas ao nível mais detalhado, daí para cada agrupamento, e
+somado às linhas existentes com um upsert, na mesma transação que insere os
+trabalhos (insert_jobs).
+
+Valores em falta (data, cliente, máquina) ficam como '' nas chaves, para o
+upsert funcionar (NULL nunca colide numa chave primária).
+
+O pandas (e o pipeline) só é importado nas funções de importação: as rotas
+de relatórios usam apenas as constantes e rollup_table().
+"""
+from itertools import combinations
+from typing import Iterable, Sequence, Tuple
+
+ROLLUP_PERIODS = ("day", "month")
+
+ROLLUP_DIMENSIONS = ("client_code", "machine", "print_type")
+
+ROLLUP_MEASURES = ("jobs", "waste_sheets", "run_length", "special_cases")
+
+# Todos os subconjuntos das dimensões, pela ordem de ROLLUP_DIMENSIONS
+ROLLUP_GROUPINGS: Tuple[Tuple[str, ...], ...] = tuple(
+    grouping for size in range(len(ROLLUP_DIMENSIONS) + 1) for grouping in combinations(ROLLUP_DIMENSIONS, size)
+)
+
+# Caracteres da data (YYYY-MM-DD) que formam a chave de cada período
+_PERIOD_LENGTH = {"day": 10, "month": 7}
+
+_COLUMN_TYPES = {"period": "VARCHAR(10)", "client_code": "VARCHAR(10)", "machine": "VARCHAR(30)", "print_type": "VARCHAR(10)"}
+
+
+def rollup_table(period: str, dimensions: Iterable[str]) -> str:
+    """Tabela de agregados do período com as dimensões indicadas (ex: waste_rollup_month_machine)."""
+    dimensions = set(dimensions)
+    return "_".join(["waste_rollup", period, *(d for d in ROLLUP_DIMENSIONS if d in dimensions)])
+
+
+def _rollups():
+    for period in ROLLUP_PERIODS:
+        for grouping in ROLLUP_GROUPINGS:
+            yield period, grouping, rollup_table(period, grouping)
+
+
+def create_rollup_tables(cursor):
+    """Cria as tabelas de agregados em falta."""
+    for _, grouping, table in _rollups():
+        keys = ("period", *grouping)
+        columns = [f"{key} {_COLUMN_TYPES[key]} NOT NULL" for key in keys]
+        columns += [f"{measure} INTEGER NOT NULL" for measure in ROLLUP_MEASURES]
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)}, "
+            f"PRIMARY KEY ({', '.join(keys)})) WITHOUT ROWID"
+        )
+
+
+def _upsert_sql(table: str, grouping: Sequence[str]) -> str:
+    keys = ("period", *grouping)
+    columns = (*keys, *ROLLUP_MEASURES)
+    updates = ", ".join(f"{measure} = {measure} + excluded.{measure}" for measure in ROLLUP_MEASURES)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}"
+    )
+
+
+def aggregate_jobs(rows: Sequence[Tuple]):
+    """Agrega trabalhos (tuplos pela ordem de JOB_COLUMNS) por dia e todas as dimensões num DataFrame."""
+    import pandas as pd
+    from app.ingestion.pipeline import JOB_COLUMNS
+
+    frame = pd.DataFrame.from_records(rows, columns=JOB_COLUMNS)
+    keys = pd.DataFrame({
+        "period": frame["date"].fillna("").astype(str).str[:_PERIOD_LENGTH["day"]],
+        **{dimension: frame[dimension].fillna("").astype(str) for dimension in ROLLUP_DIMENSIONS},
+        "jobs": 1,
+        "waste_sheets": frame["waste_sheets"].astype("int64"),
+        "run_length": frame["run_length"].astype("int64"),
+        "special_cases": frame["is_special_case"].fillna(False).astype(bool).astype("int64"),
+    })
+    return keys.groupby(["period", *ROLLUP_DIMENSIONS]).sum().reset_index()
+
+
+def update_rollups(cursor, rows: Sequence[Tuple]):
+    """Soma um bloco de trabalhos acabados de inserir às tabelas de agregados."""
+    from app.ingestion.pipeline import frame_to_rows
+
+    if not rows:
+        return
+    daily = aggregate_jobs(rows)
+    for period, grouping, table in _rollups():
+        frame = daily
+        if period != "day":
+            frame = frame.assign(period=frame["period"].str[:_PERIOD_LENGTH[period]])
+        if period != "day" or len(grouping) < len(ROLLUP_DIMENSIONS):
+            frame = frame.groupby(["period", *grouping])[list(ROLLUP_MEASURES)].sum().reset_index()
+        cursor.executemany(_upsert_sql(table, grouping), frame_to_rows(frame, ("period", *grouping, *ROLLUP_MEASURES)))
+
+
+def insert_jobs(cursor, rows: Sequence[Tuple], encoder) -> int:
+    """
+    Insere um bloco de trabalhos no histórico e atualiza os agregados, os
+    sketches de percentis (app/ingestion/sketches.py) e as estatísticas de
+    anomalias (app/ingestion/anomalies.py). Os trabalhos vão codificados
+    pelo HistoryEncoder para a tabela jobs (ver
+    app/ingestion/history_schema.py). Devolve o número de trabalhos
+    assinalados como anomalias.
+    """
+    from app.ingestion.anomalies import detect_anomalies
+    from app.ingestion.history_schema import insert_encoded_jobs
+    from app.ingestion.sketches import update_sketches
+
+    insert_encoded_jobs(encoder, rows)
+    update_rollups(cursor, rows)
+    update_sketches(cursor, rows)
+    return detect_anomalies(cursor, rows)
+
+
+def rebuild_rollups(cursor):
+    """
+    Recalcula os agregados a partir de todo o histórico (bases criadas antes
+    dos rollups). Só a tabela diária completa lê o histórico; as restantes
+    são agregadas a partir dela.
+    """
+    create_rollup_tables(cursor)
+    detailed = rollup_table("day", ROLLUP_DIMENSIONS)
+    for _, _, table in _rollups():
+        cursor.execute(f"DELETE FROM {table}")
+
+    cursor.execute(
+        f"INSERT INTO {detailed} (period, {', '.join(ROLLUP_DIMENSIONS)}, {', '.join(ROLLUP_MEASURES)}) "
+        "SELECT substr(COALESCE(date, ''), 1, 10) AS p, "
+        "COALESCE(CAST(client_code AS TEXT), '') AS c, COALESCE(CAST(machine AS TEXT), '') AS m, "
+        "CAST(print_type AS TEXT) AS t, "
+        "COUNT(*), SUM(waste_sheets), SUM(run_length), SUM(COALESCE(is_special_case, 0) != 0) "
+        "FROM quantities GROUP BY p, c, m, t"
+    )
+    sums = ", ".join(f"SUM({measure})" for measure in ROLLUP_MEASURES)
+    for period, grouping, table in _rollups():
+        if table == detailed:
+            continue
+        keys = ("p", *grouping)
+        cursor.execute(
+            f"INSERT INTO {table} (period, {', '.join((*grouping, *ROLLUP_MEASURES))}) "
+            f"SELECT {', '.join((f'substr(period, 1, {_PERIOD_LENGTH[period]}) AS p', *grouping))}, {sums} "
+            f"FROM {detailed} GROUP BY {', '.join(keys)}"
+        )
@@ -0,0 +1,99 @@
+# app/ingestion/sketches.py
+"""
+Sketches de quantis do desperdício (TDigest, ver app/services/quantiles.py)
+por tipo de impressão e faixa de tiragem, guardados no histórico de
+trabalhos ao lado da tabela quantities.
+
+Como os rollups (app/ingestion/rollups.py), são atualizados em cada bloco
+importado: os trabalhos do bloco formam um digest por grupo, que é junto
+(merge) ao digest guardado e escrito de volta na mesma transação.
+"""
+import json
+from bisect import bisect_right
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from app.services.quantiles import TDigest
+
+SKETCH_TABLE = "waste_sketches"
+
+# Limites inferiores das faixas de tiragem; a última faixa não tem limite superior
+SKETCH_RUN_BANDS = (0, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+SketchKey = Tuple[str, int]
+
+
+def run_band(print_run: int) -> Tuple[int, Optional[int]]:
+    """Faixa [início, fim) de uma tiragem (fim None na última faixa)."""
+    pos = bisect_right(SKETCH_RUN_BANDS, print_run) - 1
+    high = SKETCH_RUN_BANDS[pos + 1] if pos + 1 < len(SKETCH_RUN_BANDS) else None
+    return SKETCH_RUN_BANDS[max(pos, 0)], high
+
+
+def create_sketch_tables(cursor):
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {SKETCH_TABLE} ("
+        "print_type VARCHAR(10) NOT NULL, band_low INTEGER NOT NULL, band_high INTEGER, "
+        "count INTEGER NOT NULL, min_waste REAL NOT NULL, max_waste REAL NOT NULL, "
+        "centroids TEXT NOT NULL, "  # JSON [[média, peso], ...]
+        "PRIMARY KEY (print_type, band_low)) WITHOUT ROWID"
+    )
+
+
+def sketch_from_row(centroids: str, min_waste: float, max_waste: float) -> TDigest:
+    return TDigest.from_centroids(json.loads(centroids), min_waste, max_waste)
+
+
+def build_digests(jobs: Iterable[Tuple[str, int, int]]) -> Dict[SketchKey, TDigest]:
+    """Digests por (print_type, início da faixa) a partir de (print_type, run_length, waste_sheets)."""
+    digests: Dict[SketchKey, TDigest] = {}
+    for print_type, run_length, waste_sheets in jobs:
+        key = (str(print_type), run_band(run_length)[0])
+        digest = digests.get(key)
+        if digest is None:
+            digest = digests[key] = TDigest()
+        digest.add(waste_sheets)
+    return digests
+
+
+def store_digests(cursor, digests: Dict[SketchKey, TDigest]):
+    """Junta os digests aos guardados na base de dados e grava o resultado."""
+    # Importado só quando usado (o módulo do histórico depende do numpy)
+    from app.ingestion.history_schema import select_by_keys
+
+    stored = {
+        (print_type, band_low): row
+        for print_type, band_low, *row in select_by_keys(
+            cursor, SKETCH_TABLE, ("print_type", "band_low"), ("centroids", "min_waste", "max_waste"), digests
+        )
+    }
+    for (print_type, band_low), digest in digests.items():
+        row = stored.get((print_type, band_low))
+        if row is not None:
+            digest = sketch_from_row(*row).merge(digest)
+        digest.compress()
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {SKETCH_TABLE} "
+            "(print_type, band_low, band_high, count, min_waste, max_waste, centroids) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (print_type, band_low, run_band(band_low)[1], digest.count, digest.min, digest.max,
+             json.dumps(digest.centroids(), separators=(",", ":"))),
+        )
+
+
+def update_sketches(cursor, rows: Sequence[Tuple]):
+    """Junta um bloco de trabalhos (tuplos pela ordem de JOB_COLUMNS) aos sketches."""
+    from app.ingestion.pipeline import JOB_COLUMNS
+
+    positions = [JOB_COLUMNS.index(column) for column in ("print_type", "run_length", "waste_sheets")]
+    store_digests(cursor, build_digests(tuple(row[i] for i in positions) for row in rows))
+
+
+def rebuild_sketches(cursor, chunk_size: int = 100_000):
+    """Recalcula os sketches a partir de todo o histórico, lido em blocos."""
+    create_sketch_tables(cursor)
+    cursor.execute(f"DELETE FROM {SKETCH_TABLE}")
+    source = cursor.connection.execute("SELECT print_type, run_length, waste_sheets FROM quantities")
+    while True:
+        jobs = source.fetchmany(chunk_size)
+        if not jobs:
+            break
+        store_digests(cursor, build_digests(jobs))
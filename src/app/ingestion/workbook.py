@@ -0,0 +1,105 @@
+# app/ingestion/workbook.py
+"""
+Leitor de livros Excel em streaming, partilhado pelos scripts.
+
+Usa o modo read_only do openpyxl: o ficheiro é aberto uma única vez e as
+linhas de cada folha são lidas em sequência diretamente do XML, pelo que a
+memória usada depende do tamanho do bloco e não do tamanho da folha.
+"""
+from typing import Iterator, List, Optional, Sequence
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from app.ingestion.pipeline import DEFAULT_CHUNK_SIZE
+
+
+class WorkbookReader:
+    """
+    Abre um livro Excel em modo só de leitura e devolve as folhas em blocos.
+
+    A primeira linha de cada folha é usada como cabeçalho. Deve ser fechado
+    no fim (ou usado como context manager) para libertar o ficheiro.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.workbook = load_workbook(path, read_only=True, data_only=True)
+
+    def __enter__(self) -> "WorkbookReader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.workbook.close()
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self.workbook.sheetnames)
+
+    def _worksheet(self, sheet_name=0):
+        if isinstance(sheet_name, int):
+            return self.workbook.worksheets[sheet_name]
+        return self.workbook[sheet_name]
+
+    def columns(self, sheet_name=0) -> List[str]:
+        """Cabeçalho da folha (primeira linha), sem ler o resto dos dados."""
+        rows = self._worksheet(sheet_name).iter_rows(max_row=1, values_only=True)
+        header = next(rows, ())
+        return [_column_name(value, i) for i, value in enumerate(header)]
+
+    def iter_chunks(
+        self,
+        sheet_name=0,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        usecols: Optional[Sequence[str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Devolve a folha em DataFrames de até `chunk_size` linhas.
+        Com `usecols` só essas colunas são mantidas em cada bloco.
+        Linhas totalmente vazias são ignoradas.
+        """
+        rows = self._worksheet(sheet_name).iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        names = [_column_name(value, i) for i, value in enumerate(header)]
+        width = len(names)
+
+        positions = None
+        if usecols is not None:
+            positions = [names.index(col) for col in usecols if col in names]
+            names = [names[i] for i in positions]
+
+        buffer = []
+        start = 0
+        for row in rows:
+            if row is None or all(value is None for value in row):
+                continue
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            buffer.append(row[:width] if positions is None else tuple(row[i] for i in positions))
+            if len(buffer) >= chunk_size:
+                yield _frame(buffer, names, start)
+                start += len(buffer)
+                buffer = []
+        if buffer:
+            yield _frame(buffer, names, start)
+
+    def read_sheet(self, sheet_name=0, usecols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Lê a folha completa (apenas para folhas pequenas ou poucas colunas)."""
+        chunks = list(self.iter_chunks(sheet_name, usecols=usecols))
+        if not chunks:
+            return pd.DataFrame(columns=usecols if usecols is not None else self.columns(sheet_name))
+        return pd.concat(chunks, ignore_index=True)
+
+
+def _column_name(value, position: int) -> str:
+    return str(value) if value is not None else f"Unnamed: {position}"
+
+
+def _frame(rows: list, names: List[str], start: int) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(rows, columns=names)
+    frame.index = pd.RangeIndex(start, start + len(rows))
+    return frame
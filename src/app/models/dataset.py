@@ -0,0 +1,34 @@
+# app/models/dataset.py
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from app.core.database import Base
+
+
+class DatasetVersion(Base):
+    __tablename__ = 'dataset_versions'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)  # número da versão (crescente)
+    source = Column(String(255), nullable=True)                  # origem dos dados (ex: ficheiro Excel)
+    row_count = Column(Integer, nullable=False, default=0)      # registros de quantidades nesta versão
+    created_at = Column(DateTime, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'version': self.id,
+            'source': self.source,
+            'row_count': self.row_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class DatasetChange(Base):
+    __tablename__ = 'dataset_changes'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    version = Column(Integer, ForeignKey('dataset_versions.id'), nullable=False, index=True)  # versão incremental
+    print_type = Column(String(10), nullable=False)  # tipo de impressão alterado nessa versão
+    
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'print_type': self.print_type
+        }
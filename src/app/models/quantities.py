@@ -1,13 +1,18 @@
 # app/models/quantities.py
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index
 from app.core.database import Base
 
 
 class Quantity(Base):
     __tablename__ = 'quantities'
+    __table_args__ = (
+        # Índice de cobertura da consulta de desperdício: a procura por
+        # (print_type, run_length >= x) é respondida só a partir do índice
+        Index('ix_quantities_lookup', 'print_type', 'run_length', 'waste_sheets', 'adjustment', 'is_special_case'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    print_type = Column(String(10), nullable=False)  # ex: "4/0", "4/4", "2/2"
+    print_type = Column(String(10), ForeignKey('print_types.name'), nullable=False)  # ex: "4/0", "4/4", "2/2"
     run_length = Column(Integer, nullable=False)     # quantidade a ser impressa (renomeado para corresponder ao Excel)
     waste_sheets = Column(Integer, nullable=False)   # desperdício esperado em folhas (renomeado para corresponder ao Excel)
     adjustment = Column(String(20), nullable=True)   # ajustes necessários
@@ -0,0 +1,51 @@
+# app/repositories/file_reload.py
+"""
+Objeto lido de um ficheiro e partilhado pelo processo, relido quando o
+ficheiro muda (usado pelo histórico de trabalhos e pelos sketches de
+percentis).
+"""
+import os
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+from app.config.settings import get_settings
+
+T = TypeVar("T")
+
+
+class FileReloader(Generic[T]):
+    """
+    Mantém o resultado de `load(path)` e relê-o quando o mtime do ficheiro
+    devolvido por `path()` muda, verificando no máximo uma vez por
+    `lookup_index_check_interval` segundos. O objeto carregado deve ter o
+    atributo `mtime` (lido antes do ficheiro). `path()` devolve None quando
+    o ficheiro não está configurado ou não existe.
+    """
+
+    def __init__(self, path: Callable[[], Optional[str]], load: Callable[[str], T]):
+        self._path = path
+        self._load = load
+        self._value: Optional[T] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def needs_check(self) -> bool:
+        """Indica se get() vai verificar o ficheiro (e talvez lê-lo) nesta chamada."""
+        return self._last_check == 0.0 or time.monotonic() - self._last_check >= get_settings().lookup_index_check_interval
+
+    def get(self) -> Optional[T]:
+        """Devolve o objeto atual. Pode bloquear na leitura do ficheiro."""
+        if not self.needs_check():
+            return self._value
+
+        with self._lock:
+            if not self.needs_check():
+                return self._value
+            path = self._path()
+            if path is None:
+                self._value = None
+            elif self._value is None or os.path.getmtime(path) != self._value.mtime:
+                self._value = self._load(path)
+            self._last_check = time.monotonic()
+            return self._value
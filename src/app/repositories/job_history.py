@@ -0,0 +1,172 @@
+# app/repositories/job_history.py
+"""
+Índice em memória do histórico detalhado de trabalhos, para a procura do
+desperdício por (print_type, run_length, machine, paper_gsm, paper_format).
+
+O histórico é a base de dados completa criada por
+scripts/create_database_from_excel.py (um registo por trabalho). Para cada
+nível da hierarquia de procura (HISTORY_LEVELS) os trabalhos são agrupados
+pelas dimensões do nível e, dentro de cada grupo, ordenados por tiragem,
+com a soma acumulada do desperdício ao lado. Uma procura é um acesso a um
+dicionário, duas buscas binárias e uma subtração: o desperdício estimado é
+a média dos trabalhos do grupo com tiragem a menos de
+`history_run_tolerance` da tiragem pedida.
+
+Quando um nível não tem pelo menos `history_min_samples` trabalhos nessa
+janela passa-se ao nível seguinte, menos específico; no fim da hierarquia
+fica a tabela de quantidades normal (ver WasteCalculationService).
+"""
+import math
+import os
+import sqlite3
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.engine import make_url
+
+from app.config.settings import get_settings
+from app.ingestion.history_schema import HISTORY_DIMENSIONS as ENCODED_DIMENSIONS, JOBS_TABLE, has_encoded_history
+from app.repositories.file_reload import FileReloader
+
+# Dimensões de cada nível (além do print_type), do mais específico ao menos
+HISTORY_LEVELS: Tuple[Tuple[str, ...], ...] = (
+    ("machine", "paper_gsm", "paper_format"),
+    ("machine", "paper_gsm"),
+    ("machine",),
+    ("paper_gsm", "paper_format"),
+    ("paper_gsm",),
+    (),
+)
+
+HISTORY_DIMENSIONS = ("machine", "paper_gsm", "paper_format")
+
+
+class HistoryMatch(NamedTuple):
+    waste_amount: int
+    level: Tuple[str, ...]
+    samples: int
+
+
+class _Level:
+    """Trabalhos agrupados pelas dimensões de um nível e ordenados por tiragem em cada grupo."""
+    __slots__ = ("dimensions", "groups", "runs", "cumulative")
+
+    def __init__(self, frame: pd.DataFrame, dimensions: Tuple[str, ...]):
+        self.dimensions = dimensions
+        keys = ["print_type", *dimensions]
+        frame = frame.dropna(subset=keys).sort_values(keys + ["run_length"], kind="stable")
+
+        self.runs = frame["run_length"].to_numpy(dtype=np.int64)
+        self.cumulative = np.concatenate(([0], np.cumsum(frame["waste_sheets"].to_numpy(dtype=np.int64))))
+
+        # Grupos pela ordem em que aparecem (já ordenados): chave -> (início, fim)
+        sizes = frame.groupby(keys, sort=False).size()
+        ends = np.cumsum(sizes.to_numpy())
+        self.groups: Dict[Tuple, Tuple[int, int]] = {}
+        for key, end, size in zip(sizes.index, ends.tolist(), sizes.tolist()):
+            key = key if isinstance(key, tuple) else (key,)
+            self.groups[key] = (end - size, end)
+
+    def window(self, key: Tuple, low: int, high: int) -> Tuple[int, int]:
+        """Número de trabalhos do grupo com tiragem em [low, high] e soma do seu desperdício."""
+        bounds = self.groups.get(key)
+        if bounds is None:
+            return 0, 0
+        start, end = bounds
+        runs = self.runs[start:end]
+        first = start + int(np.searchsorted(runs, low, side="left"))
+        last = start + int(np.searchsorted(runs, high, side="right"))
+        return last - first, int(self.cumulative[last] - self.cumulative[first])
+
+
+class JobHistoryIndex:
+    def __init__(self, frame: pd.DataFrame, mtime: float = 0.0):
+        frame = frame.copy()
+        frame["print_type"] = frame["print_type"].astype(str)
+        frame["paper_gsm"] = pd.to_numeric(frame["paper_gsm"], errors="coerce").astype("Int64")
+        self.levels = [_Level(frame, dimensions) for dimensions in HISTORY_LEVELS]
+        self.size = len(frame)
+        self.mtime = mtime
+
+    @classmethod
+    def from_file(cls, path: str) -> "JobHistoryIndex":
+        """
+        Lê o histórico da base de dados completa (só as colunas usadas na
+        procura). No layout codificado lê os ids da tabela jobs e traduz-os
+        com os dicionários em memória, em vez de juntar as tabelas na vista.
+        """
+        mtime = os.path.getmtime(path)
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            if has_encoded_history(connection.cursor()):
+                frame = pd.read_sql_query(
+                    "SELECT print_type_id AS print_type, run_length, waste_sheets, machine_id AS machine, "
+                    f"paper_gsm, paper_format_id AS paper_format FROM {JOBS_TABLE}",
+                    connection,
+                )
+                for column in ("print_type", "machine", "paper_format"):
+                    table, value_column, _ = ENCODED_DIMENSIONS[column]
+                    names = dict(connection.execute(f"SELECT id, {value_column} FROM {table}").fetchall())
+                    frame[column] = frame[column].map(names)
+            else:
+                frame = pd.read_sql_query(
+                    "SELECT print_type, run_length, waste_sheets, machine, paper_gsm, paper_format FROM quantities",
+                    connection,
+                )
+        finally:
+            connection.close()
+        return cls(frame, mtime)
+
+    def lookup(
+        self,
+        print_type: str,
+        print_run: int,
+        filters: Dict[str, object],
+        tolerance: float,
+        min_samples: int,
+    ) -> Optional[HistoryMatch]:
+        """
+        Desperdício médio dos trabalhos semelhantes no nível mais específico
+        com amostras suficientes. Só são usados níveis cujas dimensões foram
+        todas indicadas em `filters`. None se nenhum nível servir.
+        """
+        low = math.ceil(print_run * (1 - tolerance))
+        high = math.floor(print_run * (1 + tolerance))
+        for level in self.levels:
+            if any(filters.get(dimension) is None for dimension in level.dimensions):
+                continue
+            key = (print_type, *(filters[dimension] for dimension in level.dimensions))
+            count, total = level.window(key, low, high)
+            if count >= min_samples:
+                return HistoryMatch(math.ceil(total / count), level.dimensions, count)
+        return None
+
+
+def history_path() -> Optional[str]:
+    """Ficheiro SQLite do histórico configurado (history_database_url), se existir."""
+    url = make_url(get_settings().history_database_url)
+    if not url.database:
+        return None
+    path = os.path.abspath(url.database)
+    return path if os.path.exists(path) else None
+
+
+# Índice partilhado pelo processo
+_history: FileReloader[JobHistoryIndex] = FileReloader(history_path, JobHistoryIndex.from_file)
+
+
+def job_history_needs_check() -> bool:
+    """Indica se get_job_history() vai verificar o ficheiro (e talvez lê-lo) nesta chamada."""
+    return _history.needs_check()
+
+
+def get_job_history() -> Optional[JobHistoryIndex]:
+    """
+    Devolve o índice do histórico, relendo-o quando o ficheiro muda (verificado
+    no máximo uma vez por `lookup_index_check_interval` segundos). None se o
+    histórico não estiver configurado ou não existir. Pode bloquear na leitura:
+    a partir do event loop usar job_history_needs_check() para decidir se
+    deve correr no threadpool.
+    """
+    return _history.get()
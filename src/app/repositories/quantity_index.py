@@ -0,0 +1,264 @@
+# app/repositories/quantity_index.py
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config.settings import get_settings
+from app.core.database import ReadSessionLocal
+from app.core.dataset import get_changed_print_types, get_dataset_version, read_dataset_version
+from app.models.quantities import Quantity, PrintType
+from app.services.interpolation import WasteCurve
+
+
+class QuantityEntry(NamedTuple):
+    """Linha da tabela de quantidades mantida em memória (imutável)"""
+    print_type: str
+    run_length: int
+    waste_sheets: int
+    adjustment: Optional[str]
+    is_special_case: bool
+
+
+class QuantityIndex:
+    """
+    Índice em memória da tabela de quantidades.
+    Para cada tipo de impressão guarda as tiragens ordenadas e procura-as por
+    busca binária, sem qualquer ida à base de dados.
+    """
+    def __init__(self, entries: List[QuantityEntry], print_types: List[str], version: int = 0):
+        grouped: Dict[str, List[QuantityEntry]] = {}
+        for entry in entries:
+            grouped.setdefault(entry.print_type, []).append(entry)
+
+        self._entries: Dict[str, List[QuantityEntry]] = {}
+        self._run_lengths: Dict[str, List[int]] = {}
+        self._run_arrays: Dict[str, np.ndarray] = {}
+        self._curves: Dict[str, WasteCurve] = {}
+        for print_type, rows in grouped.items():
+            self._set_group(print_type, rows)
+
+        self._print_types = list(print_types) if print_types else list(grouped)
+        self.size = len(entries)
+        self.version = version
+
+    def _set_group(self, print_type: str, rows: List[QuantityEntry]):
+        # sort estável: em tiragens repetidas mantém-se a ordem de inserção,
+        # tal como o ORDER BY run_length da consulta SQL
+        rows.sort(key=lambda e: e.run_length)
+        self._entries[print_type] = rows
+        self._run_lengths[print_type] = [e.run_length for e in rows]
+        self._run_arrays[print_type] = np.fromiter(
+            self._run_lengths[print_type], dtype=np.int64, count=len(rows)
+        )
+        # Declives e tangentes dos modos interpolados, calculados no carregamento
+        self._curves[print_type] = WasteCurve(rows)
+
+    @classmethod
+    def from_session(cls, db_session: Session, version: int = 0) -> "QuantityIndex":
+        """Constrói o índice a partir do conteúdo atual da base de dados."""
+        rows = db_session.query(
+            Quantity.print_type,
+            Quantity.run_length,
+            Quantity.waste_sheets,
+            Quantity.adjustment,
+            Quantity.is_special_case,
+        ).order_by(Quantity.id).all()
+
+        entries = [
+            QuantityEntry(pt, rl, ws, adj, bool(special))
+            for pt, rl, ws, adj, special in rows
+        ]
+        print_types = [r[0] for r in db_session.query(PrintType.name).order_by(PrintType.id).all()]
+        return cls(entries, print_types, version)
+
+    def updated(self, db_session: Session, changed: Set[str], version: int) -> "QuantityIndex":
+        """
+        Novo índice onde só os tipos de impressão em `changed` são relidos da
+        base de dados; os restantes são partilhados com este índice (que não
+        é alterado, pelo que pode continuar a ser usado por outros pedidos).
+        """
+        rows = db_session.query(
+            Quantity.print_type,
+            Quantity.run_length,
+            Quantity.waste_sheets,
+            Quantity.adjustment,
+            Quantity.is_special_case,
+        ).filter(Quantity.print_type.in_(changed)).order_by(Quantity.id).all()
+
+        grouped: Dict[str, List[QuantityEntry]] = {}
+        for pt, rl, ws, adj, special in rows:
+            grouped.setdefault(pt, []).append(QuantityEntry(pt, rl, ws, adj, bool(special)))
+
+        index = QuantityIndex([], [], version)
+        for print_type in self._entries:
+            if print_type not in changed:
+                index._entries[print_type] = self._entries[print_type]
+                index._run_lengths[print_type] = self._run_lengths[print_type]
+                index._run_arrays[print_type] = self._run_arrays[print_type]
+                index._curves[print_type] = self._curves[print_type]
+        for print_type, group in grouped.items():
+            index._set_group(print_type, group)
+
+        index._print_types = [r[0] for r in db_session.query(PrintType.name).order_by(PrintType.id).all()]
+        index.size = sum(len(group) for group in index._entries.values())
+        return index
+
+    def find(self, print_type: str, print_run: int) -> Optional[QuantityEntry]:
+        """
+        Devolve a linha com menor tiragem maior ou igual à tiragem pedida,
+        ou None se o tipo não existir ou a tiragem exceder a tabela.
+        """
+        run_lengths = self._run_lengths.get(print_type)
+        if run_lengths is None:
+            return None
+        pos = bisect_left(run_lengths, print_run)
+        if pos == len(run_lengths):
+            return None
+        return self._entries[print_type][pos]
+
+    def find_many(self, print_type: str, print_runs: Sequence[int]) -> List[Optional[QuantityEntry]]:
+        """
+        Versão vetorizada de find() para várias tiragens do mesmo tipo:
+        resolve todas as posições numa única chamada a np.searchsorted.
+        """
+        run_array = self._run_arrays.get(print_type)
+        if run_array is None:
+            return [None] * len(print_runs)
+        positions = np.searchsorted(run_array, np.asarray(print_runs, dtype=np.int64), side="left")
+        entries = self._entries[print_type]
+        size = len(entries)
+        return [entries[pos] if pos < size else None for pos in positions.tolist()]
+
+    def curve(self, print_type: str) -> WasteCurve:
+        """Curva do tipo de impressão para os modos interpolados (vazia se o tipo não existir)."""
+        curve = self._curves.get(print_type)
+        return curve if curve is not None else WasteCurve([])
+
+    def entries(self) -> List[QuantityEntry]:
+        """Todas as linhas, agrupadas por tipo de impressão e por ordem de tiragem."""
+        return [entry for rows in self._entries.values() for entry in rows]
+
+    def run_lengths(self, print_type: str) -> List[int]:
+        """Tiragens ordenadas do tipo de impressão (lista partilhada, não alterar)."""
+        return self._run_lengths.get(print_type, [])
+
+    def print_types(self) -> List[str]:
+        return list(self._print_types)
+
+
+class IndexedQuantityRepository:
+    """
+    Repository com a mesma interface do QuantityRepository, servido a partir
+    do índice em memória.
+    """
+    # Consultas em memória: podem correr diretamente no event loop
+    blocking = False
+
+    def __init__(self, index: QuantityIndex):
+        self.index = index
+
+    def find_by_print_type_and_run(self, print_type: str, print_run: int) -> Optional[QuantityEntry]:
+        return self.index.find(print_type, print_run)
+
+    def find_many_by_print_type_and_runs(self, print_type: str, print_runs: Sequence[int]) -> List[Optional[QuantityEntry]]:
+        return self.index.find_many(print_type, print_runs)
+
+    def find_run_lengths(self, print_type: str) -> List[int]:
+        return self.index.run_lengths(print_type)
+
+    def find_all_print_types(self) -> List[str]:
+        return self.index.print_types()
+
+    def find_all_quantities(self) -> List[QuantityEntry]:
+        return self.index.entries()
+
+    def find_curve(self, print_type: str) -> WasteCurve:
+        return self.index.curve(print_type)
+
+    def dataset_version(self) -> int:
+        return self.index.version
+
+
+# Estado do índice partilhado pelo processo
+_index: Optional[QuantityIndex] = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def _load_quantity_index() -> QuantityIndex:
+    """Lê a versão e os dados alterados; chamado com _lock adquirido."""
+    global _index, _last_check
+    db = ReadSessionLocal()
+    try:
+        # A versão é lida antes dos dados: se uma troca acontecer entre as
+        # duas leituras, o índice fica com uma versão antiga e é refeito
+        # na verificação seguinte, nunca o contrário.
+        version = get_dataset_version(db)
+        current = _index
+        changed = None
+        if current is not None and version > current.version:
+            changed = get_changed_print_types(db, current.version, version)
+        if changed is None:
+            index = QuantityIndex.from_session(db, version)
+        else:
+            index = current.updated(db, changed, version)
+    finally:
+        db.close()
+    _index = index
+    _last_check = time.monotonic()
+    return index
+
+
+def refresh_quantity_index() -> QuantityIndex:
+    """
+    Atualiza o índice a partir da base de dados. Se desde a versão atual só
+    houve importações incrementais, apenas os tipos de impressão alterados
+    são relidos; caso contrário o índice é reconstruído por inteiro.
+    """
+    with _lock:
+        return _load_quantity_index()
+
+
+def invalidate_quantity_index():
+    """Força a reconstrução do índice no próximo acesso."""
+    global _index
+    _index = None
+
+
+def quantity_index_needs_check() -> bool:
+    """Indica se get_quantity_index() vai consultar a base de dados nesta chamada."""
+    return _index is None or time.monotonic() - _last_check >= get_settings().lookup_index_check_interval
+
+
+def get_quantity_index() -> QuantityIndex:
+    """
+    Devolve o índice atual, reconstruindo-o quando a versão do conjunto de
+    dados muda. A verificação é feita no máximo uma vez por
+    `lookup_index_check_interval` segundos e pode bloquear: a partir do
+    event loop usar quantity_index_needs_check() para decidir se deve correr
+    no threadpool. Enquanto outra thread verifica ou reconstrói o índice,
+    os restantes pedidos são servidos com o índice atual.
+    """
+    global _last_check
+    if not quantity_index_needs_check():
+        return _index
+
+    if not _lock.acquire(blocking=False):
+        index = _index
+        if index is not None:
+            return index
+        _lock.acquire()
+    try:
+        index = _index
+        if not quantity_index_needs_check():
+            return index
+        if index is None or read_dataset_version() != index.version:
+            return _load_quantity_index()
+        _last_check = time.monotonic()
+        return index
+    finally:
+        _lock.release()
@@ -1,12 +1,36 @@
 # app/repositories/quantity_repository.py
+from bisect import bisect_left
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Sequence, Tuple
+from app.core.dataset import current_dataset_version
 from app.models.quantities import Quantity, PrintType
+from app.services.interpolation import WasteCurve
+
+
+def _all_quantities_query():
+    return select(
+        Quantity.print_type,
+        Quantity.run_length,
+        Quantity.waste_sheets,
+        Quantity.adjustment,
+        Quantity.is_special_case,
+    ).order_by(Quantity.print_type, Quantity.run_length)
+
+
+def _curve_query(print_type: str):
+    return _all_quantities_query().where(Quantity.print_type == print_type)
 
 
 class QuantityRepository:
-    def __init__(self, db_session: Session):
+    # As consultas bloqueiam a thread que as executa
+    blocking = True
+    
+    def __init__(self, db_session: Session, version: Optional[int] = None):
         self.db_session = db_session
+        # Versão lida pela dependência no threadpool (ver get_waste_calculation_service)
+        self.version = version
     
     def find_by_print_type_and_run(self, print_type: str, print_run: int) -> Optional[Quantity]:
         """
@@ -19,6 +43,38 @@ class QuantityRepository:
             .order_by(Quantity.run_length)\
             .first()
     
+    def find_many_by_print_type_and_runs(self, print_type: str, print_runs: Sequence[int]) -> List[Optional[Quantity]]:
+        """
+        Resolve várias tiragens do mesmo tipo de impressão com uma única consulta.
+        Devolve os registros pela mesma ordem das tiragens (None quando não há correspondência).
+        """
+        rows = self.db_session.query(Quantity)\
+            .filter(Quantity.print_type == print_type)\
+            .order_by(Quantity.run_length)\
+            .all()
+        run_lengths = [row.run_length for row in rows]
+        
+        result = []
+        for print_run in print_runs:
+            pos = bisect_left(run_lengths, print_run)
+            result.append(rows[pos] if pos < len(rows) else None)
+        return result
+    
+    def find_run_lengths(self, print_type: str) -> List[int]:
+        """Tiragens do tipo de impressão por ordem crescente (lidas só do índice de cobertura)."""
+        result = self.db_session.query(Quantity.run_length)\
+            .filter(Quantity.print_type == print_type)\
+            .order_by(Quantity.run_length)\
+            .all()
+        return [r[0] for r in result]
+    
+    def dataset_version(self) -> int:
+        """
+        Versão do conjunto de dados: a indicada na criação do repository ou,
+        sem ela, a relida no máximo uma vez por intervalo de verificação.
+        """
+        return self.version if self.version is not None else current_dataset_version()
+    
     def find_all_print_types(self) -> List[str]:
         """
         Retorna todos os tipos de impressão disponíveis.
@@ -36,4 +92,79 @@ class QuantityRepository:
             .distinct()\
             .all()
         
-        return [r[0] for r in result] 
\ No newline at end of file
+        return [r[0] for r in result] 
+    
+    def find_all_quantities(self) -> List[Tuple]:
+        """
+        Todas as linhas da tabela (print_type, run_length, waste_sheets,
+        adjustment, is_special_case) por ordem de tipo e de tiragem.
+        """
+        return [tuple(r) for r in self.db_session.execute(_all_quantities_query()).all()]
+    
+    def find_curve(self, print_type: str) -> WasteCurve:
+        """Curva do tipo de impressão para os modos interpolados (ver app/services/interpolation.py)."""
+        return WasteCurve([tuple(r) for r in self.db_session.execute(_curve_query(print_type)).all()])
+
+
+class AsyncQuantityRepository:
+    """Versão assíncrona do QuantityRepository, sobre uma AsyncSession."""
+    # Só dataset_version() é síncrono, e não faz I/O quando a versão é indicada
+    blocking = False
+    
+    def __init__(self, db_session: AsyncSession, version: Optional[int] = None):
+        self.db_session = db_session
+        self.version = version
+    
+    async def find_by_print_type_and_run(self, print_type: str, print_run: int) -> Optional[Quantity]:
+        result = await self.db_session.execute(
+            select(Quantity)
+            .where(Quantity.print_type == print_type)
+            .where(Quantity.run_length >= print_run)
+            .order_by(Quantity.run_length)
+            .limit(1)
+        )
+        return result.scalars().first()
+    
+    async def find_many_by_print_type_and_runs(self, print_type: str, print_runs: Sequence[int]) -> List[Optional[Quantity]]:
+        result = await self.db_session.execute(
+            select(Quantity)
+            .where(Quantity.print_type == print_type)
+            .order_by(Quantity.run_length)
+        )
+        rows = result.scalars().all()
+        run_lengths = [row.run_length for row in rows]
+        
+        matches = []
+        for print_run in print_runs:
+            pos = bisect_left(run_lengths, print_run)
+            matches.append(rows[pos] if pos < len(rows) else None)
+        return matches
+    
+    async def find_run_lengths(self, print_type: str) -> List[int]:
+        result = await self.db_session.execute(
+            select(Quantity.run_length)
+            .where(Quantity.print_type == print_type)
+            .order_by(Quantity.run_length)
+        )
+        return list(result.scalars().all())
+    
+    def dataset_version(self) -> int:
+        return self.version if self.version is not None else current_dataset_version()
+    
+    async def find_all_print_types(self) -> List[str]:
+        result = await self.db_session.execute(select(PrintType.name))
+        names = result.scalars().all()
+        
+        if names:
+            return list(names)
+        
+        result = await self.db_session.execute(select(Quantity.print_type).distinct())
+        return list(result.scalars().all())
+    
+    async def find_all_quantities(self) -> List[Tuple]:
+        result = await self.db_session.execute(_all_quantities_query())
+        return [tuple(r) for r in result.all()]
+    
+    async def find_curve(self, print_type: str) -> WasteCurve:
+        result = await self.db_session.execute(_curve_query(print_type))
+        return WasteCurve([tuple(r) for r in result.all()])
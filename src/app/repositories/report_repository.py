@@ -0,0 +1,111 @@
+# app/repositories/report_repository.py
+"""
+Consultas dos relatórios de desperdício sobre as tabelas de agregados do
+histórico (ver app/ingestion/rollups.py). Cada consulta lê a tabela do seu
+agrupamento (dimensões agrupadas mais as filtradas), cuja chave primária
+começa pelo período: um intervalo de datas é um troço contíguo do índice e
+o GROUP BY corre sobre os agregados, nunca sobre os trabalhos.
+"""
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.ingestion.anomalies import ANOMALY_JOB_COLUMNS, ANOMALY_TABLE
+from app.ingestion.rollups import ROLLUP_DIMENSIONS, ROLLUP_MEASURES, rollup_table
+
+ANOMALY_COLUMNS = ("id", *ANOMALY_JOB_COLUMNS, "expected_waste", "std", "score", "samples")
+
+
+class WasteReportRepository:
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def _has_table(self, table: str) -> bool:
+        return self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+
+    def has_rollups(self) -> bool:
+        return self._has_table(rollup_table("day", ROLLUP_DIMENSIONS))
+
+    def has_anomalies(self) -> bool:
+        return self._has_table(ANOMALY_TABLE)
+
+    def find_anomalies(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        filters: Optional[Dict[str, str]] = None,
+        min_score: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple]:
+        """Anomalias registadas (colunas de ANOMALY_COLUMNS), das mais recentes para as mais antigas."""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("date <= ?")
+            params.append(end)
+        for column, value in (filters or {}).items():
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if min_score is not None:
+            conditions.append("ABS(score) >= ?")
+            params.append(min_score)
+
+        sql = f"SELECT {', '.join(ANOMALY_COLUMNS)} FROM {ANOMALY_TABLE}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY date DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.connection.execute(sql, params).fetchall()
+
+    def find_waste_totals(
+        self,
+        period: str,
+        group_by: Sequence[str],
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        filters: Optional[Dict[str, str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple]:
+        """
+        Totais (period, *group_by, jobs, waste_sheets, run_length, special_cases)
+        por período ("day" ou "month"; "total" soma todos os meses, com period
+        vazio) e pelas dimensões de group_by. start/end são chaves de período
+        inclusivas (YYYY-MM-DD ou YYYY-MM).
+        """
+        filters = {dimension: value for dimension, value in (filters or {}).items() if value is not None}
+        keys = [dimension for dimension in ROLLUP_DIMENSIONS if dimension in group_by]
+        table = rollup_table("day" if period == "day" else "month", [*keys, *filters])
+        group = ([] if period == "total" else ["period"]) + keys
+        select_period = "period" if period != "total" else "''"
+
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("period >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("period <= ?")
+            params.append(end)
+        for dimension, value in filters.items():
+            conditions.append(f"{dimension} = ?")
+            params.append(value)
+
+        sql = (
+            f"SELECT {', '.join([select_period, *keys])}, "
+            f"{', '.join(f'SUM({measure})' for measure in ROLLUP_MEASURES)} FROM {table}"
+        )
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if group:
+            sql += f" GROUP BY {', '.join(group)} ORDER BY {', '.join(group)}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self.connection.execute(sql, params).fetchall()
+        # Sem grupos e sem linhas o SUM devolve uma linha de NULLs
+        return [row for row in rows if row[len(keys) + 1] is not None]
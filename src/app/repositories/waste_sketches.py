@@ -0,0 +1,108 @@
+# app/repositories/waste_sketches.py
+"""
+Sketches de percentis do desperdício em memória, lidos da tabela
+waste_sketches do histórico de trabalhos (ver app/ingestion/sketches.py).
+
+Por tipo de impressão ficam as faixas de tiragem ordenadas, o digest de
+cada faixa e o digest de todas as faixas juntas (merge), usado quando a
+faixa pedida tem poucos trabalhos. Um percentil é uma busca binária pela
+faixa e outra sobre os centróides do digest.
+"""
+import os
+import sqlite3
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional
+
+from app.config.settings import get_settings
+from app.ingestion.sketches import SKETCH_TABLE, sketch_from_row
+from app.repositories.file_reload import FileReloader
+from app.services.quantiles import TDigest
+
+
+class PercentileMatch(NamedTuple):
+    waste: float
+    samples: int
+    band_low: Optional[int]
+    band_high: Optional[int]
+
+
+class _PrintTypeSketches:
+    __slots__ = ("lows", "highs", "digests", "combined")
+
+    def __init__(self):
+        self.lows: List[int] = []
+        self.highs: List[Optional[int]] = []
+        self.digests: List[TDigest] = []
+        self.combined = TDigest()
+
+
+class WasteSketchIndex:
+    def __init__(self, rows, mtime: float = 0.0):
+        """rows: (print_type, band_low, band_high, centroids, min_waste, max_waste) por ordem de faixa."""
+        self.print_types: Dict[str, _PrintTypeSketches] = {}
+        for print_type, band_low, band_high, centroids, min_waste, max_waste in rows:
+            sketches = self.print_types.setdefault(print_type, _PrintTypeSketches())
+            digest = sketch_from_row(centroids, min_waste, max_waste)
+            sketches.lows.append(band_low)
+            sketches.highs.append(band_high)
+            sketches.digests.append(digest)
+            sketches.combined.merge(digest)
+        self.mtime = mtime
+
+    @classmethod
+    def from_file(cls, path: str) -> "WasteSketchIndex":
+        mtime = os.path.getmtime(path)
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            exists = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SKETCH_TABLE,)
+            ).fetchone()
+            rows = connection.execute(
+                f"SELECT print_type, band_low, band_high, centroids, min_waste, max_waste "
+                f"FROM {SKETCH_TABLE} ORDER BY print_type, band_low"
+            ).fetchall() if exists else []
+        finally:
+            connection.close()
+        return cls(rows, mtime)
+
+    def percentile(self, print_type: str, print_run: int, percentile: float, min_samples: int) -> Optional[PercentileMatch]:
+        """
+        Desperdício no percentil (0-100) da faixa de tiragem do pedido; com
+        menos de `min_samples` trabalhos na faixa usa todas as faixas do tipo.
+        None se o tipo não tiver sketches.
+        """
+        sketches = self.print_types.get(print_type)
+        if sketches is None:
+            return None
+        pos = bisect_right(sketches.lows, print_run) - 1
+        if pos >= 0 and (sketches.highs[pos] is None or print_run < sketches.highs[pos]):
+            digest = sketches.digests[pos]
+            if digest.count >= min_samples:
+                return PercentileMatch(digest.quantile(percentile / 100), digest.count, sketches.lows[pos], sketches.highs[pos])
+        digest = sketches.combined
+        return PercentileMatch(digest.quantile(percentile / 100), digest.count, None, None)
+
+
+def _history_path() -> Optional[str]:
+    # Importado só quando usado (o módulo do histórico depende do numpy/pandas)
+    from app.repositories.job_history import history_path
+
+    return history_path()
+
+
+# Índice partilhado pelo processo
+_sketches: FileReloader[WasteSketchIndex] = FileReloader(_history_path, WasteSketchIndex.from_file)
+
+
+def waste_sketches_need_check() -> bool:
+    """Indica se get_waste_sketches() vai verificar o ficheiro (e talvez lê-lo) nesta chamada."""
+    return _sketches.needs_check()
+
+
+def get_waste_sketches() -> Optional[WasteSketchIndex]:
+    """
+    Devolve os sketches do histórico, relidos quando o ficheiro muda (no
+    máximo uma verificação por `lookup_index_check_interval` segundos).
+    None se o histórico não estiver configurado ou não existir.
+    """
+    return _sketches.get()
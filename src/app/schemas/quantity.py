@@ -1,6 +1,6 @@
 # app/schemas/quantity.py
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 
 # Request DTO
@@ -19,4 +19,85 @@ class WasteCalculationResponse(BaseModel):
     
     class Config:
         orm_mode = True  # Compatibilidade com versões anteriores do Pydantic
-        from_attributes = True  # Nova forma recomendada para Pydantic v2 
\ No newline at end of file
+        from_attributes = True  # Nova forma recomendada para Pydantic v2 
+
+
+# Item de resposta do cálculo em lote: resultado ou erro, pela ordem do pedido
+class WasteCalculationBatchItem(BaseModel):
+    index: int
+    result: Optional[WasteCalculationResponse] = None
+    error: Optional[str] = None
+
+
+# Procura no histórico de trabalhos: source = "history" (média dos trabalhos
+# semelhantes no nível indicado em level) ou "table" (tabela de quantidades)
+class WasteLookupResponse(BaseModel):
+    print_type: str
+    print_run: int
+    waste_amount: int
+    source: str
+    level: List[str] = Field(default_factory=list, description="Dimensões usadas além do tipo de impressão")
+    samples: Optional[int] = Field(None, description="Número de trabalhos usados na média (só no histórico)")
+    adjustment: Optional[str] = None
+    is_special_case: bool = False
+
+
+# Desperdício num percentil do histórico (sketches por tipo e faixa de tiragem);
+# sem faixa (run_band_min/max a null) o percentil é de todas as tiragens do tipo
+class WastePercentileResponse(BaseModel):
+    print_type: str
+    print_run: int
+    percentile: float
+    waste_amount: int
+    samples: int = Field(..., description="Número de trabalhos do histórico no sketch usado")
+    run_band_min: Optional[int] = None
+    run_band_max: Optional[int] = None
+
+
+# Tabela de quantidades completa em formato colunar, para cálculo no cliente.
+# As listas de linha são paralelas; print_type e adjustment são códigos nos
+# respetivos dicionários (print_types, adjustments) e as linhas de cada tipo
+# estão seguidas e por ordem de tiragem.
+class QuantityTableResponse(BaseModel):
+    version: int = Field(..., description="Versão do conjunto de dados (igual ao ETag)")
+    print_types: List[str]
+    print_type: List[int]
+    run_length: List[int]
+    waste_sheets: List[int]
+    adjustments: List[str]
+    adjustment: List[Optional[int]]
+    is_special_case: List[int] = Field(..., description="1 se a linha é um caso especial, 0 caso contrário")
+
+
+# Otimização da tiragem: melhores tiragens de um intervalo por desperdício
+# por folha útil (waste_ratio = waste_amount / print_run) e degraus da tabela
+class WasteOptimizationCandidate(BaseModel):
+    print_run: int
+    waste_amount: int
+    waste_ratio: float
+
+
+class WasteBreakpoint(BaseModel):
+    run_length: int
+    waste_amount: int
+
+
+class WasteOptimizationResponse(BaseModel):
+    print_type: str
+    min_run: int
+    max_run: int
+    best: List[WasteOptimizationCandidate]
+    breakpoints: List[WasteBreakpoint]
+    breakpoints_total: int = Field(..., description="Número de degraus no intervalo (a lista pode estar truncada)")
+
+
+# Matriz de desperdício: linhas = tipos de impressão, colunas = tiragens;
+# null onde o tipo não existe ou a tiragem excede a tabela
+class WasteMatrixResponse(BaseModel):
+    version: int
+    print_types: List[str]
+    runs: List[int]
+    waste: List[List[Optional[int]]]
+    waste_ratio_mean: Optional[List[Optional[float]]] = Field(
+        None, description="Com rank=true: desperdício médio por tiragem de cada linha (ordem crescente)"
+    )
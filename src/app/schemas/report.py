@@ -0,0 +1,46 @@
+# app/schemas/report.py
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+# Linha de um relatório de desperdício: dimensões não agrupadas ficam a null
+class WasteReportRow(BaseModel):
+    period: Optional[str] = Field(None, description="Dia (YYYY-MM-DD) ou mês (YYYY-MM); null nos totais")
+    client_code: Optional[str] = None
+    machine: Optional[str] = None
+    print_type: Optional[str] = None
+    jobs: int
+    waste_sheets: int
+    run_length: int
+    special_cases: int
+    waste_ratio: Optional[float] = Field(None, description="Folhas de desperdício por folha de tiragem")
+    waste_per_job: float
+
+
+class WasteReportResponse(BaseModel):
+    period: str
+    group_by: List[str]
+    rows: List[WasteReportRow]
+    truncated: bool = Field(False, description="Há mais linhas do que o limite pedido")
+
+
+# Trabalho assinalado na importação: desperdício a |score| desvios padrão da
+# média do grupo (print_type, faixa de tiragem, machine) nesse momento
+class WasteAnomaly(BaseModel):
+    id: int
+    job_number: Optional[str] = None
+    date: Optional[str] = None
+    client_code: Optional[str] = None
+    machine: Optional[str] = None
+    print_type: str
+    run_length: int
+    waste_sheets: int
+    expected_waste: float = Field(..., description="Média do grupo antes deste trabalho")
+    std: float
+    score: float = Field(..., description="(waste_sheets - expected_waste) / std")
+    samples: int = Field(..., description="Trabalhos do grupo antes deste trabalho")
+
+
+class WasteAnomaliesResponse(BaseModel):
+    anomalies: List[WasteAnomaly]
+    truncated: bool = False
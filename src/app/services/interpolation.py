@@ -0,0 +1,96 @@
+# app/services/interpolation.py
+"""
+Modos de cálculo do desperdício para tiragens entre linhas da tabela.
+
+  - step:     arredonda para a linha seguinte (run_length >= tiragem), o
+              comportamento original;
+  - linear:   interpolação linear entre a linha anterior e a seguinte;
+  - monotone: interpolação cúbica de Hermite monótona (PCHIP, tangentes de
+              Fritsch-Carlson pela média harmónica ponderada de Brodlie),
+              suave e sem ultrapassar os valores vizinhos.
+
+Nos pontos da tabela os três modos dão o mesmo resultado. Abaixo da primeira
+tiragem vale a primeira linha e acima da última não há resultado, como no
+modo step. O valor interpolado é arredondado para cima (folhas inteiras) e
+o adjustment/is_special_case são os da linha seguinte (a do modo step).
+"""
+import math
+from bisect import bisect_left
+from typing import List, Literal, Optional, Sequence, Tuple
+
+CalculationMode = Literal["step", "linear", "monotone"]
+
+CALCULATION_MODES = ("step", "linear", "monotone")
+
+# Tolerância para não arredondar para cima erros de vírgula flutuante
+_EPSILON = 1e-9
+
+
+def _monotone_tangents(run_lengths: Sequence[int], slopes: Sequence[float]) -> List[float]:
+    """Tangentes PCHIP: média harmónica ponderada dos declives vizinhos, 0 nos extremos locais."""
+    n = len(run_lengths)
+    if n < 2:
+        return [0.0] * n
+    tangents = [float(slopes[0])]
+    for k in range(1, n - 1):
+        before, after = slopes[k - 1], slopes[k]
+        if before * after <= 0:
+            tangents.append(0.0)
+            continue
+        h_before = run_lengths[k] - run_lengths[k - 1]
+        h_after = run_lengths[k + 1] - run_lengths[k]
+        w1 = 2 * h_after + h_before
+        w2 = h_after + 2 * h_before
+        tangents.append((w1 + w2) / (w1 / before + w2 / after))
+    tangents.append(float(slopes[-1]))
+    return tangents
+
+
+class WasteCurve:
+    """
+    Curva de desperdício de um tipo de impressão, com os declives dos
+    segmentos e as tangentes calculados uma única vez; cada cálculo é uma
+    busca binária e uma avaliação O(1).
+
+    Recebe as linhas (print_type, run_length, waste_sheets, adjustment,
+    is_special_case) por ordem de tiragem; em tiragens repetidas vale a
+    primeira, tal como na consulta do modo step.
+    """
+    __slots__ = ("rows", "run_lengths", "wastes", "slopes", "tangents", "ratio_table")
+
+    def __init__(self, rows: Sequence[Tuple]):
+        self.rows: List[Tuple] = []
+        self.run_lengths: List[int] = []
+        self.wastes: List[int] = []
+        for row in rows:
+            if self.run_lengths and row[1] == self.run_lengths[-1]:
+                continue
+            self.rows.append(row)
+            self.run_lengths.append(row[1])
+            self.wastes.append(row[2])
+
+        xs, ys = self.run_lengths, self.wastes
+        self.slopes = [(ys[k + 1] - ys[k]) / (xs[k + 1] - xs[k]) for k in range(len(xs) - 1)]
+        self.tangents = _monotone_tangents(xs, self.slopes)
+        # Sparse table das razões desperdício/tiragem (ver app/services/optimization.py)
+        self.ratio_table = None
+
+    def evaluate(self, print_run: int, mode: CalculationMode = "step") -> Optional[Tuple[int, Tuple]]:
+        """Desperdício e linha de referência para a tiragem, ou None se exceder a tabela."""
+        xs, ys = self.run_lengths, self.wastes
+        pos = bisect_left(xs, print_run)
+        if pos == len(xs):
+            return None
+        if mode == "step" or pos == 0 or xs[pos] == print_run:
+            return ys[pos], self.rows[pos]
+
+        k = pos - 1
+        h = xs[pos] - xs[k]
+        if mode == "linear":
+            value = ys[k] + self.slopes[k] * (print_run - xs[k])
+        else:
+            t = (print_run - xs[k]) / h
+            t2, t3 = t * t, t * t * t
+            value = ((2 * t3 - 3 * t2 + 1) * ys[k] + (t3 - 2 * t2 + t) * h * self.tangents[k]
+                     + (-2 * t3 + 3 * t2) * ys[pos] + (t3 - t2) * h * self.tangents[pos])
+        return math.ceil(value - _EPSILON), self.rows[pos]
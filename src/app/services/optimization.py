@@ -0,0 +1,113 @@
+# app/services/optimization.py
+"""
+Otimização da tiragem (GET /api/waste-optimization).
+
+No modo step o desperdício é constante entre duas linhas da tabela, pelo
+que o desperdício por folha útil (waste / print_run) é mínimo no fim de cada
+degrau, ou seja, nos próprios run_length (breakpoints). Para cada tipo de
+impressão calcula-se uma vez a razão de cada breakpoint e uma sparse table
+de mínimos; os melhores candidatos de um intervalo de tiragens obtêm-se
+então sem percorrer as linhas: um mínimo em O(1) e os k melhores com um
+heap que vai partindo o intervalo à volta de cada mínimo encontrado.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Sequence
+
+from app.services.interpolation import WasteCurve
+
+
+class RangeMinimum:
+    """Sparse table: posição do menor valor de qualquer intervalo em O(1), construída em O(n log n)."""
+    __slots__ = ("values", "levels")
+
+    def __init__(self, values: Sequence[float]):
+        self.values = list(values)
+        self.levels: List[List[int]] = [list(range(len(self.values)))]
+        width = 2
+        while width <= len(self.values):
+            previous = self.levels[-1]
+            half = width // 2
+            self.levels.append([self._better(previous[i], previous[i + half])
+                                for i in range(len(self.values) - width + 1)])
+            width *= 2
+
+    def _better(self, a: int, b: int) -> int:
+        # Em empate fica a posição menor (a tiragem mais pequena)
+        return a if self.values[a] <= self.values[b] else b
+
+    def argmin(self, lo: int, hi: int) -> int:
+        """Posição do menor valor em [lo, hi] (inclusive)."""
+        level = (hi - lo + 1).bit_length() - 1
+        row = self.levels[level]
+        return self._better(row[lo], row[hi - (1 << level) + 1])
+
+    def smallest(self, lo: int, hi: int, count: int) -> List[int]:
+        """Posições dos `count` menores valores em [lo, hi], por ordem crescente."""
+        if lo > hi or count <= 0:
+            return []
+        first = self.argmin(lo, hi)
+        heap = [(self.values[first], first, lo, hi)]
+        result = []
+        while heap and len(result) < count:
+            _, pos, start, end = heapq.heappop(heap)
+            result.append(pos)
+            for a, b in ((start, pos - 1), (pos + 1, end)):
+                if a <= b:
+                    best = self.argmin(a, b)
+                    heapq.heappush(heap, (self.values[best], best, a, b))
+        return result
+
+
+def ratio_table(curve: WasteCurve) -> RangeMinimum:
+    """Sparse table das razões waste / run_length da curva, criada no primeiro uso."""
+    if curve.ratio_table is None:
+        curve.ratio_table = RangeMinimum([
+            waste / run if run > 0 else float("inf")
+            for run, waste in zip(curve.run_lengths, curve.wastes)
+        ])
+    return curve.ratio_table
+
+
+def _candidate(print_run: int, waste: int) -> dict:
+    return {"print_run": print_run, "waste_amount": waste, "waste_ratio": waste / print_run}
+
+
+def optimize(curve: WasteCurve, min_run: int, max_run: int, limit: int, max_breakpoints: int) -> Optional[dict]:
+    """
+    Melhores tiragens em [min_run, max_run] por desperdício por folha útil e
+    breakpoints do intervalo. None se nenhuma tiragem do intervalo estiver
+    coberta pela tabela.
+    """
+    xs, ys = curve.run_lengths, curve.wastes
+    first = bisect_left(xs, min_run)
+    last = bisect_right(xs, max_run) - 1
+    if first == len(xs):
+        return None
+
+    table = ratio_table(curve)
+    candidates = [_candidate(xs[i], ys[i]) for i in table.smallest(first, last, limit)]
+
+    # max_run a meio de um degrau: o fim do intervalo é também candidato.
+    # Se max_run é ele próprio um breakpoint já está entre os candidatos,
+    # com o desperdício da sua linha (e não o da linha seguinte).
+    tail = last + 1
+    if tail < len(xs) and max_run >= min_run and (last < 0 or xs[last] != max_run):
+        candidates.append(_candidate(max_run, ys[tail]))
+        candidates.sort(key=lambda c: (c["waste_ratio"], c["print_run"]))
+
+    # Uma tiragem aparece uma só vez (a primeira, a de menor razão)
+    unique = {}
+    for candidate in candidates:
+        unique.setdefault(candidate["print_run"], candidate)
+    candidates = list(unique.values())[:limit]
+
+    count = max(last - first + 1, 0)
+    return {
+        "best": candidates,
+        "breakpoints": [
+            {"run_length": xs[i], "waste_amount": ys[i]}
+            for i in range(first, first + min(count, max_breakpoints))
+        ],
+        "breakpoints_total": count,
+    }
@@ -0,0 +1,143 @@
+# app/services/quantiles.py
+"""
+Sketch de quantis (t-digest, variante "merging" com a função de escala k1)
+para os percentis do desperdício histórico.
+
+Um TDigest resume uma distribuição num número limitado de centróides
+(média, peso), mais finos nas caudas do que no centro, pelo que p90/p95
+ficam precisos com poucas dezenas de centróides. Dois digests juntam-se
+concatenando os centróides e comprimindo de novo (merge), o que permite
+atualizar os sketches bloco a bloco na importação e juntar partições (ex:
+faixas de tiragem ou bases diferentes). Com poucos valores cada centróide
+é um único valor e os quantis são exatos.
+
+Depois de comprimido, um quantil é uma busca binária sobre os centros
+acumulados e uma interpolação linear: tempo constante para a API, limitado
+pela compressão e não pelo número de trabalhos.
+"""
+import math
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_COMPRESSION = 100
+
+
+def _scale(q: float, compression: float) -> float:
+    return compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+
+def _scale_inverse(k: float, compression: float) -> float:
+    angle = k * 2 * math.pi / compression
+    if angle >= math.pi / 2:
+        return 1.0
+    return (math.sin(angle) + 1) / 2
+
+
+class TDigest:
+    __slots__ = ("compression", "means", "weights", "count", "min", "max", "_buffer", "_centers")
+
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[int] = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[Tuple[float, int]] = []
+        # Posição (peso acumulado) do centro de cada centróide, para quantile()
+        self._centers: Optional[List[float]] = None
+
+    @classmethod
+    def from_values(cls, values: Iterable[float], compression: float = DEFAULT_COMPRESSION) -> "TDigest":
+        digest = cls(compression)
+        for value in values:
+            digest.add(value)
+        digest.compress()
+        return digest
+
+    @classmethod
+    def from_centroids(
+        cls, centroids: Sequence[Sequence[float]], minimum: float, maximum: float,
+        compression: float = DEFAULT_COMPRESSION,
+    ) -> "TDigest":
+        """Digest a partir de centróides (média, peso) já comprimidos (ex: lidos da base de dados)."""
+        digest = cls(compression)
+        digest.means = [float(mean) for mean, _ in centroids]
+        digest.weights = [int(weight) for _, weight in centroids]
+        digest.count = sum(digest.weights)
+        digest.min, digest.max = float(minimum), float(maximum)
+        return digest
+
+    def add(self, value: float, weight: int = 1):
+        self._buffer.append((float(value), weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self._centers = None
+        if len(self._buffer) >= 10 * self.compression:
+            self.compress()
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Junta os valores de outro digest a este (a ordem dos merges não importa)."""
+        other.compress()
+        self._buffer.extend(zip(other.means, other.weights))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._centers = None
+        return self.compress()
+
+    def compress(self) -> "TDigest":
+        """Junta centróides vizinhos enquanto o peso acumulado o permitir (limite k1)."""
+        if not self._buffer:
+            return self
+        points = sorted([*zip(self.means, self.weights), *self._buffer])
+        self._buffer = []
+
+        total = self.count
+        means, weights = [points[0][0]], [points[0][1]]
+        done = 0  # peso dos centróides já fechados
+        limit = total * _scale_inverse(_scale(0.0, self.compression) + 1, self.compression)
+        for mean, weight in points[1:]:
+            current = weights[-1]
+            if done + current + weight <= limit:
+                merged = current + weight
+                means[-1] += (mean - means[-1]) * weight / merged
+                weights[-1] = merged
+            else:
+                done += current
+                limit = total * _scale_inverse(_scale(done / total, self.compression) + 1, self.compression)
+                means.append(mean)
+                weights.append(weight)
+        self.means, self.weights = means, weights
+        self._centers = None
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Valor no quantil q (0..1), ou None num digest vazio."""
+        if self._buffer:
+            self.compress()
+        if not self.weights:
+            return None
+        if self._centers is None:
+            centers, cumulative = [], 0
+            for weight in self.weights:
+                centers.append(cumulative + weight / 2)
+                cumulative += weight
+            self._centers = centers
+
+        centers, means = self._centers, self.means
+        target = min(max(q, 0.0), 1.0) * self.count
+        if target <= centers[0]:
+            # Antes do primeiro centro: entre o mínimo e o primeiro centróide
+            return self.min + (means[0] - self.min) * target / centers[0]
+        if target >= centers[-1]:
+            return means[-1] + (self.max - means[-1]) * (target - centers[-1]) / (self.count - centers[-1])
+        pos = bisect_left(centers, target)
+        left, right = pos - 1, pos
+        fraction = (target - centers[left]) / (centers[right] - centers[left])
+        return means[left] + (means[right] - means[left]) * fraction
+
+    def centroids(self) -> List[Tuple[float, int]]:
+        self.compress()
+        return list(zip(self.means, self.weights))
@@ -0,0 +1,54 @@
+# app/services/quantity_table.py
+"""
+Tabela de quantidades em formato colunar (GET /api/quantities/table).
+
+Os clientes descarregam a tabela uma vez por versão dos dados (validada
+pelo ETag) e calculam o desperdício localmente: para um tipo de impressão,
+a linha aplicável é a primeira do tipo com run_length >= tiragem, tal como
+em find_by_print_type_and_run.
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+def build_quantity_table(version: int, print_types: Sequence[str], rows: Iterable[Tuple]) -> dict:
+    """
+    Converte as linhas (print_type, run_length, waste_sheets, adjustment,
+    is_special_case) em colunas. Os códigos dos tipos seguem a ordem de
+    `print_types`; tipos que só existam nas linhas são acrescentados no fim.
+    """
+    names: List[str] = list(print_types)
+    codes: Dict[str, int] = {name: code for code, name in enumerate(names)}
+    adjustments: List[str] = []
+    adjustment_codes: Dict[str, int] = {}
+
+    rows = list(rows)
+    for row in rows:
+        if row[0] not in codes:
+            codes[row[0]] = len(names)
+            names.append(row[0])
+    # sort estável: em tiragens repetidas mantém-se a ordem de origem
+    rows.sort(key=lambda row: (codes[row[0]], row[1]))
+
+    table = {
+        "version": version,
+        "print_types": names,
+        "print_type": [],
+        "run_length": [],
+        "waste_sheets": [],
+        "adjustments": adjustments,
+        "adjustment": [],
+        "is_special_case": [],
+    }
+    for print_type, run_length, waste_sheets, adjustment, is_special_case in rows:
+        table["print_type"].append(codes[print_type])
+        table["run_length"].append(int(run_length))
+        table["waste_sheets"].append(int(waste_sheets))
+        if adjustment is None:
+            table["adjustment"].append(None)
+        else:
+            if adjustment not in adjustment_codes:
+                adjustment_codes[adjustment] = len(adjustments)
+                adjustments.append(adjustment)
+            table["adjustment"].append(adjustment_codes[adjustment])
+        table["is_special_case"].append(1 if is_special_case else 0)
+    return table
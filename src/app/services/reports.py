@@ -0,0 +1,111 @@
+# app/services/reports.py
+import sqlite3
+from datetime import date
+from typing import Dict, List, Optional
+
+from app.core.exceptions import NotFoundException, ValidationException
+from app.ingestion.rollups import ROLLUP_DIMENSIONS, ROLLUP_MEASURES
+from app.repositories.report_repository import ANOMALY_COLUMNS, WasteReportRepository
+
+REPORT_PERIODS = ("day", "month", "total")
+
+# Caracteres da data que formam a chave de cada período
+_PERIOD_LENGTH = {"day": 10, "month": 7, "total": 7}
+
+
+def _period_key(value: Optional[date], period: str) -> Optional[str]:
+    return value.isoformat()[:_PERIOD_LENGTH[period]] if value is not None else None
+
+
+class WasteReportService:
+    # Consultas sqlite3 síncronas: os handlers correm-nas no threadpool
+    blocking = True
+
+    def __init__(self, repository: WasteReportRepository):
+        self.repository = repository
+
+    def waste_report(
+        self,
+        period: str,
+        group_by: List[str],
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        filters: Optional[Dict[str, str]] = None,
+        limit: int = 1000,
+    ) -> dict:
+        """
+        Desperdício agregado por período e pelas dimensões de group_by
+        (client_code, machine, print_type), com as razões desperdício/tiragem
+        e desperdício por trabalho calculadas a partir dos totais.
+        """
+        if period not in REPORT_PERIODS:
+            raise ValidationException(detail=f"period deve ser um de: {', '.join(REPORT_PERIODS)}")
+        unknown = [dimension for dimension in group_by if dimension not in ROLLUP_DIMENSIONS]
+        if unknown:
+            raise ValidationException(
+                detail=f"Dimensões desconhecidas em group_by: {', '.join(unknown)} "
+                       f"(válidas: {', '.join(ROLLUP_DIMENSIONS)})"
+            )
+        if start is not None and end is not None and start > end:
+            raise ValidationException(detail="start não pode ser posterior a end")
+        if not self.repository.has_rollups():
+            raise NotFoundException(
+                detail="Agregados de relatório em falta: execute scripts/build_rollups.py sobre o histórico"
+            )
+
+        keys = [dimension for dimension in ROLLUP_DIMENSIONS if dimension in group_by]
+        rows = self.repository.find_waste_totals(
+            period, keys, _period_key(start, period), _period_key(end, period), filters, limit + 1
+        )
+        truncated = len(rows) > limit
+        items = []
+        for row in rows[:limit]:
+            item = {"period": row[0] or None}
+            item.update({dimension: value or None for dimension, value in zip(keys, row[1:])})
+            item.update(zip(ROLLUP_MEASURES, row[1 + len(keys):]))
+            item["waste_ratio"] = item["waste_sheets"] / item["run_length"] if item["run_length"] else None
+            item["waste_per_job"] = item["waste_sheets"] / item["jobs"]
+            items.append(item)
+        return {"period": period, "group_by": keys, "rows": items, "truncated": truncated}
+
+    def anomalies(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        filters: Optional[Dict[str, str]] = None,
+        min_score: Optional[float] = None,
+        limit: int = 100,
+    ) -> dict:
+        """Trabalhos assinalados na importação como desperdício fora do normal do seu grupo."""
+        if start is not None and end is not None and start > end:
+            raise ValidationException(detail="start não pode ser posterior a end")
+        if not self.repository.has_anomalies():
+            raise NotFoundException(
+                detail="Anomalias em falta: execute scripts/build_anomalies.py sobre o histórico"
+            )
+        rows = self.repository.find_anomalies(
+            _period_key(start, "day"), _period_key(end, "day"), filters, min_score, limit + 1
+        )
+        return {
+            "anomalies": [dict(zip(ANOMALY_COLUMNS, row)) for row in rows[:limit]],
+            "truncated": len(rows) > limit,
+        }
+
+
+# Provider para injeção de dependência
+def get_waste_report_service():
+    """
+    Serviço sobre uma ligação só de leitura ao histórico (history_database_url),
+    fechada no fim do pedido.
+    """
+    # Importado só quando usado (o módulo do histórico depende do numpy/pandas)
+    from app.repositories.job_history import history_path
+
+    path = history_path()
+    if path is None:
+        raise NotFoundException(detail="Histórico de trabalhos não encontrado")
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    try:
+        yield WasteReportService(WasteReportRepository(connection))
+    finally:
+        connection.close()
@@ -0,0 +1,130 @@
+# app/services/response_cache.py
+"""
+Cache de respostas pré-serializadas do cálculo de desperdício.
+
+Todas as tiragens entre duas linhas consecutivas de run_length de um tipo
+de impressão resolvem para a mesma linha da tabela de quantidades (o
+"bucket"). Para cada (print_type, bucket) guarda-se o JSON da resposta já
+serializado, partido em duas partes à volta do valor de print_run. Um
+pedido em cache é respondido com uma busca binária e uma concatenação de
+bytes, sem hidratar objetos ORM nem construir e validar modelos Pydantic.
+
+Guarda também a lista de tipos de impressão (caminho rápido, ver
+lean_responses_enabled) e a tabela colunar completa, já serializadas. O
+cache pertence a uma versão do conjunto de dados e é descartado por
+inteiro quando a versão muda.
+"""
+import json
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+from app.schemas.quantity import WasteCalculationResponse
+from app.services.interpolation import WasteCurve
+
+if TYPE_CHECKING:  # depende do numpy, importado só quando usado
+    from app.services.waste_matrix import WasteMatrixTable
+
+
+def _dumps(value) -> str:
+    # Mesma codificação do JSONResponse do FastAPI
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+class CachedResponse(NamedTuple):
+    """JSON da resposta de um bucket, sem o valor de print_run."""
+    prefix: bytes
+    suffix: bytes
+
+    def render(self, print_run: int) -> bytes:
+        return self.prefix + b"%d" % print_run + self.suffix
+
+
+def serialize_response(quantity) -> CachedResponse:
+    """
+    Serializa a resposta de uma linha da tabela uma única vez, validada pelo
+    WasteCalculationResponse e com os campos pela ordem do modelo.
+    """
+    data = WasteCalculationResponse(
+        print_type=quantity.print_type,
+        print_run=1,
+        waste_amount=quantity.waste_sheets,
+        adjustment=quantity.adjustment,
+        is_special_case=quantity.is_special_case,
+    ).model_dump(mode="json")
+
+    before: List[str] = []
+    after: List[str] = []
+    target = before
+    for key, value in data.items():
+        if key == "print_run":
+            target = after
+            continue
+        target.append(f"{_dumps(key)}:{_dumps(value)}")
+
+    prefix = "{" + "".join(f"{field}," for field in before) + '"print_run":'
+    suffix = "".join(f",{field}" for field in after) + "}"
+    return CachedResponse(prefix.encode(), suffix.encode())
+
+
+class PrintTypeBuckets:
+    """Tiragens ordenadas de um tipo de impressão e a resposta em cache de cada bucket."""
+    __slots__ = ("run_lengths", "responses")
+
+    def __init__(self, run_lengths: List[int]):
+        self.run_lengths = run_lengths
+        self.responses: List[Optional[CachedResponse]] = [None] * len(run_lengths)
+
+    def position(self, print_run: int) -> Optional[int]:
+        """Bucket da tiragem pedida, ou None se exceder a tabela."""
+        pos = bisect_left(self.run_lengths, print_run)
+        return pos if pos < len(self.run_lengths) else None
+
+    def store(self, pos: int, quantity) -> CachedResponse:
+        response = self.responses[pos] = serialize_response(quantity)
+        return response
+
+
+class ResponseCache:
+    """Buckets por tipo de impressão de uma versão do conjunto de dados."""
+    def __init__(self, version: int):
+        self.version = version
+        self._print_types: Dict[str, PrintTypeBuckets] = {}
+        # JSON de /api/print-types e /api/quantities/table, serializados no primeiro pedido
+        self.print_types_json: Optional[bytes] = None
+        self.table_json: Optional[bytes] = None
+        # Curvas dos modos interpolados por tipo de impressão
+        self.curves: Dict[str, WasteCurve] = {}
+        # Tabela em arrays numpy para /api/waste-matrix
+        self.matrix_table: Optional["WasteMatrixTable"] = None
+
+    def get(self, print_type: str) -> Optional[PrintTypeBuckets]:
+        return self._print_types.get(print_type)
+
+    def add(self, print_type: str, run_lengths: List[int]) -> PrintTypeBuckets:
+        """
+        Regista as tiragens de um tipo de impressão. Tipos sem linhas não
+        ficam em cache, para que pedidos com tipos inventados não o façam
+        crescer.
+        """
+        buckets = PrintTypeBuckets(list(run_lengths))
+        if run_lengths:
+            buckets = self._print_types.setdefault(print_type, buckets)
+        return buckets
+
+
+# Cache partilhado pelo processo (substituído quando a versão muda)
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache(version: int) -> ResponseCache:
+    """Devolve o cache da versão indicada, descartando o anterior se for de outra versão."""
+    global _cache
+    cache = _cache
+    if cache is None or cache.version != version:
+        cache = _cache = ResponseCache(version)
+    return cache
+
+
+def clear_response_cache():
+    global _cache
+    _cache = None
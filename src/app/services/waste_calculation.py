@@ -1,49 +1,403 @@
 # app/services/waste_calculation.py
-from fastapi import Depends, HTTPException, status
-from typing import List
-from sqlalchemy.orm import Session
+import inspect
+import math
+import time
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
 
-from app.repositories.quantity_repository import QuantityRepository
-from app.schemas.quantity import WasteCalculationRequest, WasteCalculationResponse
-from app.core.database import get_db
-from app.core.exceptions import NotFoundException
+from app.repositories.quantity_repository import QuantityRepository, AsyncQuantityRepository
+from app.schemas.quantity import (
+    WasteCalculationRequest, WasteCalculationResponse, WasteCalculationBatchItem, WasteLookupResponse,
+    WastePercentileResponse
+)
+from app.core.database import LazySession, ReadSessionLocal, get_async_sessionmaker
+from app.core.dataset import current_dataset_version, dataset_version_needs_check
+from app.config.settings import get_settings
+from app.core.exceptions import NotFoundException, ValidationException
+from app.core.metrics import observe_session, stage
+from app.core.responses import dump_json
+from app.services.interpolation import CalculationMode, WasteCurve
+from app.services.optimization import optimize
+from app.services.quantity_table import build_quantity_table
+from app.services.response_cache import get_response_cache
+
+
+def _to_response(quantity, request: WasteCalculationRequest) -> WasteCalculationResponse:
+    return WasteCalculationResponse(
+        print_type=quantity.print_type,
+        print_run=request.print_run,
+        waste_amount=quantity.waste_sheets,
+        adjustment=quantity.adjustment,
+        is_special_case=quantity.is_special_case
+    )
+
+
+def _curve_response(result, request: WasteCalculationRequest) -> WasteCalculationResponse:
+    """Resposta de um modo interpolado: desperdício calculado e dados da linha de referência."""
+    waste_amount, row = result
+    return WasteCalculationResponse(
+        print_type=row[0],
+        print_run=request.print_run,
+        waste_amount=waste_amount,
+        adjustment=row[3],
+        is_special_case=bool(row[4])
+    )
+
+
+def _history_lookup(history, request: WasteCalculationRequest, filters: Dict[str, object]) -> Optional[WasteLookupResponse]:
+    """Procura no histórico de trabalhos (None se não houver histórico ou amostras suficientes)."""
+    if history is None:
+        return None
+    settings = get_settings()
+    match = history.lookup(
+        request.print_type, request.print_run, filters,
+        settings.history_run_tolerance, settings.history_min_samples,
+    )
+    if match is None:
+        return None
+    return WasteLookupResponse(
+        print_type=request.print_type,
+        print_run=request.print_run,
+        waste_amount=match.waste_amount,
+        source="history",
+        level=list(match.level),
+        samples=match.samples,
+    )
+
+
+def _table_lookup(result: WasteCalculationResponse) -> WasteLookupResponse:
+    return WasteLookupResponse(source="table", **result.model_dump())
+
+
+def waste_percentile(sketches, request: WasteCalculationRequest, percentile: float) -> WastePercentileResponse:
+    """
+    Desperdício no percentil pedido dos trabalhos do histórico com o mesmo
+    tipo e faixa de tiragem (ver app/repositories/waste_sketches.py), sem
+    acesso à base de dados.
+    """
+    match = None
+    if sketches is not None:
+        match = sketches.percentile(
+            request.print_type, request.print_run, percentile, get_settings().history_min_samples
+        )
+    if match is None:
+        raise NotFoundException(detail=f"Sem histórico de desperdício para o tipo de impressão '{request.print_type}'")
+    return WastePercentileResponse(
+        print_type=request.print_type,
+        print_run=request.print_run,
+        percentile=percentile,
+        waste_amount=math.ceil(match.waste - 1e-9),
+        samples=match.samples,
+        run_band_min=match.band_low,
+        run_band_max=match.band_high,
+    )
+
+
+def _not_found_detail(request: WasteCalculationRequest) -> str:
+    return f"Nenhum cálculo encontrado para tipo {request.print_type} com tiragem {request.print_run}"
+
+
+def _group_by_print_type(requests: List[WasteCalculationRequest]) -> Dict[str, List[int]]:
+    """Agrupa as posições dos pedidos por tipo de impressão, validando o tamanho do lote."""
+    max_items = get_settings().batch_max_items
+    if len(requests) > max_items:
+        raise ValidationException(detail=f"O lote excede o máximo de {max_items} itens")
+
+    groups: Dict[str, List[int]] = {}
+    for i, request in enumerate(requests):
+        groups.setdefault(request.print_type, []).append(i)
+    return groups
+
+
+def _cached_waste_json(repository, request: WasteCalculationRequest) -> Optional[bytes]:
+    """
+    Resposta servida só a partir do cache, sem consultas ao repository.
+    None se o tipo de impressão ou o bucket ainda não estão em cache.
+    """
+    buckets = get_response_cache(repository.dataset_version()).get(request.print_type)
+    if buckets is None:
+        return None
+    pos = buckets.position(request.print_run)
+    if pos is None:
+        raise NotFoundException(detail=_not_found_detail(request))
+    response = buckets.responses[pos]
+    return response.render(request.print_run) if response is not None else None
+
+
+def _batch_item(i: int, request: WasteCalculationRequest, quantity) -> WasteCalculationBatchItem:
+    if quantity is None:
+        return WasteCalculationBatchItem(index=i, error=_not_found_detail(request))
+    return WasteCalculationBatchItem(index=i, result=_to_response(quantity, request))
+
+
+def _curve_batch_item(i: int, request: WasteCalculationRequest, curve: WasteCurve, mode: CalculationMode) -> WasteCalculationBatchItem:
+    result = curve.evaluate(request.print_run, mode)
+    if result is None:
+        return WasteCalculationBatchItem(index=i, error=_not_found_detail(request))
+    return WasteCalculationBatchItem(index=i, result=_curve_response(result, request))
+
+
+def _optimization(curve: WasteCurve, print_type: str, min_run: int, max_run: int, limit: int, max_breakpoints: int) -> dict:
+    if min_run > max_run:
+        raise ValidationException(detail="min_run não pode ser maior do que max_run")
+    result = optimize(curve, min_run, max_run, limit, max_breakpoints)
+    if result is None:
+        raise NotFoundException(
+            detail=f"Nenhum cálculo encontrado para tipo {print_type} com tiragens entre {min_run} e {max_run}"
+        )
+    return {"print_type": print_type, "min_run": min_run, "max_run": max_run, **result}
+
+
+def _matrix_json(cache, runs: List[int], print_types: Optional[List[str]], rank: bool) -> bytes:
+    from app.services.waste_matrix import build_waste_matrix
+    return dump_json(build_waste_matrix(cache.matrix_table, cache.version, runs, print_types, rank))
+
+
+def _cached_curve(repository, print_type: str) -> Optional[WasteCurve]:
+    return get_response_cache(repository.dataset_version()).curves.get(print_type)
+
+
+def _store_curve(repository, print_type: str, curve: WasteCurve) -> WasteCurve:
+    # Tipos sem linhas não ficam em cache (ver ResponseCache.add)
+    if curve.run_lengths:
+        get_response_cache(repository.dataset_version()).curves[print_type] = curve
+    return curve
 
 
 class WasteCalculationService:
-    def __init__(self, repository: QuantityRepository):
+    """
+    Cálculo do desperdício sobre qualquer um dos repositories: SQL síncrono
+    (QuantityRepository), SQL assíncrono (AsyncQuantityRepository) ou índice
+    em memória (IndexedQuantityRepository). Os métodos são corrotinas e cada
+    consulta passa por _query, que a despacha com run_service: corrotinas são
+    aguardadas, I/O síncrono corre no threadpool e o índice em memória é
+    consultado diretamente no event loop.
+    """
+    def __init__(self, repository):
         self.repository = repository
-    
-    def calculate_waste(self, request: WasteCalculationRequest) -> WasteCalculationResponse:
-        """Calcula o desperdício com base no tipo de impressão e quantidade."""
+
+    async def _query(self, method, *args):
+        with stage("query"):
+            return await run_service(method, *args)
+
+    async def calculate_waste(self, request: WasteCalculationRequest, mode: CalculationMode = "step") -> WasteCalculationResponse:
+        """
+        Calcula o desperdício com base no tipo de impressão e quantidade.
+        Nos modos linear e monotone a tiragem é interpolada entre as linhas
+        da tabela (ver app/services/interpolation.py).
+        """
+        if mode != "step":
+            result = (await self._curve(request.print_type)).evaluate(request.print_run, mode)
+            if result is None:
+                raise NotFoundException(detail=_not_found_detail(request))
+            return _curve_response(result, request)
+
         # Busca o registro correspondente
-        quantity = self.repository.find_by_print_type_and_run(
-            request.print_type, request.print_run
+        quantity = await self._query(
+            self.repository.find_by_print_type_and_run, request.print_type, request.print_run
         )
-        
+
         if not quantity:
-            raise NotFoundException(
-                detail=f"Nenhum cálculo encontrado para tipo {request.print_type} com tiragem {request.print_run}"
-            )
-        
+            raise NotFoundException(detail=_not_found_detail(request))
+
         # Retorna o resultado mapeado para o DTO de resposta
-        return WasteCalculationResponse(
-            print_type=quantity.print_type,
-            print_run=request.print_run,
-            waste_amount=quantity.waste_sheets,
-            adjustment=quantity.adjustment,
-            is_special_case=quantity.is_special_case
-        )
-    
-    def get_print_types(self) -> List[str]:
+        return _to_response(quantity, request)
+
+    async def calculate_waste_json(self, request: WasteCalculationRequest) -> bytes:
+        """
+        Igual a calculate_waste, mas devolve o JSON da resposta já
+        serializado, a partir do cache de respostas por (print_type, bucket).
+        Só há consultas ao repository na primeira vez que o tipo de impressão
+        ou o bucket são pedidos em cada versão do conjunto de dados.
+        """
+        cache = get_response_cache(self.repository.dataset_version())
+        buckets = cache.get(request.print_type)
+        if buckets is None:
+            run_lengths = await self._query(self.repository.find_run_lengths, request.print_type)
+            buckets = cache.add(request.print_type, run_lengths)
+
+        pos = buckets.position(request.print_run)
+        if pos is None:
+            raise NotFoundException(detail=_not_found_detail(request))
+
+        response = buckets.responses[pos]
+        if response is None:
+            quantity = await self._query(
+                self.repository.find_by_print_type_and_run, request.print_type, buckets.run_lengths[pos]
+            )
+            if not quantity:
+                raise NotFoundException(detail=_not_found_detail(request))
+            response = buckets.store(pos, quantity)
+        return response.render(request.print_run)
+
+    def cached_waste_json(self, request: WasteCalculationRequest) -> Optional[bytes]:
+        """Resposta em cache, sem I/O (ver _cached_waste_json)."""
+        return _cached_waste_json(self.repository, request)
+
+    def dataset_version(self) -> int:
+        """Versão dos dados servidos, sem consultas ao repository (ETag, cache de respostas)."""
+        return self.repository.dataset_version()
+
+    async def _curve(self, print_type: str) -> WasteCurve:
+        """Curva do tipo de impressão, guardada no cache por versão dos dados."""
+        curve = _cached_curve(self.repository, print_type)
+        if curve is None:
+            curve = _store_curve(self.repository, print_type, await self._query(self.repository.find_curve, print_type))
+        return curve
+
+    async def lookup_waste(self, request: WasteCalculationRequest, filters: Dict[str, object], history=None) -> WasteLookupResponse:
+        """
+        Desperdício por tipo, tiragem e dimensões do trabalho (machine,
+        paper_gsm, paper_format): média dos trabalhos semelhantes do histórico
+        no nível mais específico possível, ou a tabela de quantidades quando
+        o histórico não chega (ver app/repositories/job_history.py).
+        """
+        with stage("query"):
+            result = _history_lookup(history, request, filters)
+        if result is not None:
+            return result
+        return _table_lookup(await self.calculate_waste(request))
+
+    async def waste_matrix_json(self, runs: List[int], print_types: Optional[List[str]] = None, rank: bool = False) -> bytes:
+        """
+        Desperdício de todos os tipos (ou dos indicados) em cada tiragem da
+        grelha, numa única passagem vetorizada (ver app/services/waste_matrix.py).
+        """
+        cache = get_response_cache(self.repository.dataset_version())
+        if cache.matrix_table is None:
+            # Importado só quando usado (depende do numpy)
+            from app.services.waste_matrix import WasteMatrixTable
+            types = await self._query(self.repository.find_all_print_types)
+            rows = await self._query(self.repository.find_all_quantities)
+            cache.matrix_table = WasteMatrixTable(types, rows)
+        return _matrix_json(cache, runs, print_types, rank)
+
+    async def optimize_print_run(self, print_type: str, min_run: int, max_run: int, limit: int = 5, max_breakpoints: int = 100) -> dict:
+        """
+        Melhores tiragens em [min_run, max_run] por desperdício por folha útil
+        e degraus da tabela no intervalo (ver app/services/optimization.py).
+        """
+        curve = await self._curve(print_type)
+        return _optimization(curve, print_type, min_run, max_run, limit, max_breakpoints)
+
+    async def calculate_waste_batch(self, requests: List[WasteCalculationRequest], mode: CalculationMode = "step") -> List[WasteCalculationBatchItem]:
+        """
+        Calcula o desperdício para vários pedidos numa só passagem.
+        Os pedidos são agrupados por tipo de impressão e cada grupo é resolvido
+        com uma única consulta ao repository. Os resultados seguem a ordem de
+        entrada e um pedido sem correspondência gera um erro apenas no seu item.
+        """
+        items: List[WasteCalculationBatchItem] = [None] * len(requests)
+        for print_type, positions in _group_by_print_type(requests).items():
+            if mode != "step":
+                curve = await self._curve(print_type)
+                for i in positions:
+                    items[i] = _curve_batch_item(i, requests[i], curve, mode)
+                continue
+            quantities = await self._query(
+                self.repository.find_many_by_print_type_and_runs, print_type, [requests[i].print_run for i in positions]
+            )
+            for i, quantity in zip(positions, quantities):
+                items[i] = _batch_item(i, requests[i], quantity)
+
+        return items
+
+    async def get_print_types(self) -> List[str]:
         """Retorna todos os tipos de impressão disponíveis."""
-        return self.repository.find_all_print_types()
+        return await self._query(self.repository.find_all_print_types)
+
+    async def get_print_types_json(self) -> bytes:
+        """Tipos de impressão já serializados, guardados no cache de respostas."""
+        cache = get_response_cache(self.repository.dataset_version())
+        if cache.print_types_json is None:
+            cache.print_types_json = dump_json(await self.get_print_types())
+        return cache.print_types_json
+
+    def cached_print_types_json(self) -> Optional[bytes]:
+        return get_response_cache(self.repository.dataset_version()).print_types_json
+
+    async def get_quantity_table_json(self) -> bytes:
+        """Tabela completa em formato colunar, serializada uma vez por versão dos dados."""
+        version = self.repository.dataset_version()
+        cache = get_response_cache(version)
+        if cache.table_json is None:
+            print_types = await self._query(self.repository.find_all_print_types)
+            rows = await self._query(self.repository.find_all_quantities)
+            cache.table_json = dump_json(build_quantity_table(version, print_types, rows))
+        return cache.table_json
+
+    def cached_table_json(self) -> Optional[bytes]:
+        return get_response_cache(self.repository.dataset_version()).table_json
+
+
+async def run_service(method, *args):
+    """
+    Executa um método de um serviço ou repository a partir de código async sem
+    bloquear o event loop: corrotinas são aguardadas, chamadas com I/O
+    síncrono (`blocking`) correm no threadpool e consultas em memória correm
+    diretamente.
+    """
+    if inspect.iscoroutinefunction(method):
+        return await method(*args)
+    if method.__self__.blocking:
+        return await run_in_threadpool(method, *args)
+    return method(*args)
+
+
+async def _dataset_version() -> int:
+    """Versão atual dos dados; a releitura periódica corre no threadpool."""
+    if dataset_version_needs_check():
+        return await run_in_threadpool(current_dataset_version)
+    return current_dataset_version()
 
 
 # Provider para injeção de dependência
-def get_waste_calculation_service(db: Session = Depends(get_db)) -> WasteCalculationService:
+async def get_waste_calculation_service():
     """
-    Factory function para criar e injetar uma instância do WasteCalculationService.
+    Factory function para criar e injetar uma instância do serviço de cálculo.
     Esta função é usada pelo sistema de injeção de dependência do FastAPI.
+    Com o índice em memória ativo, as consultas não tocam na base de dados;
+    caso contrário usa-se o caminho assíncrono (async_database_enabled) ou,
+    como alternativa, a sessão síncrona executada no threadpool.
+    A criação do serviço é medida como etapa "dependency" do pedido.
+    No caminho rápido (lean_responses_enabled) a sessão só é aberta se o
+    pedido não puder ser servido a partir do cache de respostas.
     """
-    repository = QuantityRepository(db)
-    return WasteCalculationService(repository) 
\ No newline at end of file
+    settings = get_settings()
+    lean = settings.lean_responses_enabled
+    started = time.perf_counter()
+    if settings.lookup_index_enabled:
+        # Importado só quando ativo (o índice depende do numpy)
+        from app.repositories.quantity_index import (
+            IndexedQuantityRepository, get_quantity_index, quantity_index_needs_check
+        )
+        with stage("dependency"):
+            # A verificação da versão (e a reconstrução do índice) bloqueia: corre no threadpool
+            if quantity_index_needs_check():
+                index = await run_in_threadpool(get_quantity_index)
+            else:
+                index = get_quantity_index()
+            service = WasteCalculationService(IndexedQuantityRepository(index))
+        yield service
+    elif settings.async_database_enabled:
+        with stage("dependency"):
+            version = await _dataset_version()
+            db = LazySession(get_async_sessionmaker()) if lean else get_async_sessionmaker()()
+        try:
+            yield WasteCalculationService(AsyncQuantityRepository(db, version))
+        finally:
+            session = db.session if lean else db
+            if session is not None:
+                await session.close()
+                observe_session("async", started)
+    else:
+        with stage("dependency"):
+            version = await _dataset_version()
+            db = LazySession(ReadSessionLocal) if lean else ReadSessionLocal()
+        try:
+            yield WasteCalculationService(QuantityRepository(db, version))
+        finally:
+            session = db.session if lean else db
+            if session is not None:
+                await run_in_threadpool(session.close)
+                observe_session("read", started)
@@ -0,0 +1,96 @@
+# app/services/waste_matrix.py
+"""
+Matriz de desperdício: todos os tipos de impressão numa grelha de tiragens
+(GET /api/waste-matrix).
+
+A tabela de quantidades é guardada (uma vez por versão dos dados) como um
+único array ordenado de chaves (código do tipo << 32 | run_length) e o
+array paralelo de desperdícios. A matriz inteira resolve-se com uma única
+chamada a np.searchsorted sobre todas as combinações tipo × tiragem, com a
+mesma regra do modo step (primeira linha do tipo com run_length >= tiragem).
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_TYPE_SHIFT = 32
+
+# Maior tiragem representável na chave (tiragens maiores invadiriam os bits do tipo)
+MAX_MATRIX_RUN = (1 << _TYPE_SHIFT) - 1
+
+
+class WasteMatrixTable:
+    """Tabela de quantidades em arrays numpy, ordenada por (tipo, tiragem)."""
+    def __init__(self, print_types: Sequence[str], rows: Iterable[Tuple]):
+        rows = list(rows)
+        self.print_types: List[str] = list(print_types)
+        self.codes: Dict[str, int] = {name: code for code, name in enumerate(self.print_types)}
+        for row in rows:
+            if row[0] not in self.codes:
+                self.codes[row[0]] = len(self.print_types)
+                self.print_types.append(row[0])
+
+        keys = np.fromiter(
+            ((self.codes[row[0]] << _TYPE_SHIFT) | int(row[1]) for row in rows), dtype=np.int64, count=len(rows)
+        )
+        wastes = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+        # sort estável: em tiragens repetidas fica a primeira linha, como no modo step
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.wastes = wastes[order]
+
+    def compute(self, print_types: Sequence[str], runs: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Desperdício de cada tipo (linhas) em cada tiragem (colunas) e a
+        máscara das células com resultado (tipo existente e tiragem coberta).
+        """
+        codes = np.array([self.codes.get(name, -1) for name in print_types], dtype=np.int64)[:, None]
+        runs = np.asarray(runs, dtype=np.int64)[None, :]
+        shape = (codes.shape[0], runs.shape[1])
+        if len(self.keys) == 0:
+            return np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=bool)
+
+        # Tiragens fora da chave não têm resultado (nenhuma linha da tabela chega lá)
+        in_range = (runs >= 0) & (runs <= MAX_MATRIX_RUN)
+        queries = (np.maximum(codes, 0) << _TYPE_SHIFT) | np.where(in_range, runs, 0)
+        positions = np.searchsorted(self.keys, queries.ravel(), side="left").reshape(shape)
+        clipped = np.minimum(positions, len(self.keys) - 1)
+        valid = (codes >= 0) & in_range & (positions < len(self.keys)) \
+            & ((self.keys[clipped] >> _TYPE_SHIFT) == codes)
+        return np.where(valid, self.wastes[clipped], 0), valid
+
+
+def build_waste_matrix(
+    table: WasteMatrixTable,
+    version: int,
+    runs: Sequence[int],
+    print_types: Optional[Sequence[str]] = None,
+    rank: bool = False,
+) -> dict:
+    """
+    Resposta densa: listas de tipos e tiragens e a matriz de desperdícios
+    (null onde não há resultado). Com `rank` as linhas vêm ordenadas pelo
+    desperdício médio por tiragem (waste / print_run) nas células com
+    resultado, e esse valor é devolvido em waste_ratio_mean.
+    """
+    names = list(print_types) if print_types is not None else list(table.print_types)
+    waste, valid = table.compute(names, runs)
+
+    ratio_mean = None
+    if rank:
+        counts = valid.sum(axis=1)
+        ratios = np.where(valid, waste / np.asarray(runs, dtype=np.float64)[None, :], 0.0).sum(axis=1)
+        means = np.divide(ratios, counts, out=np.full(len(names), np.inf), where=counts > 0)
+        order = np.argsort(means, kind="stable")
+        names = [names[i] for i in order]
+        waste, valid, means = waste[order], valid[order], means[order]
+        ratio_mean = [float(m) if np.isfinite(m) else None for m in means]
+
+    rows = []
+    for values, mask in zip(waste.tolist(), valid.tolist()):
+        rows.append([value if ok else None for value, ok in zip(values, mask)])
+
+    result = {"version": version, "print_types": names, "runs": [int(run) for run in runs], "waste": rows}
+    if rank:
+        result["waste_ratio_mean"] = ratio_mean
+    return result
@@ -1,5 +1,4 @@
 import uvicorn
-from app import app
 
 if __name__ == "__main__":
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
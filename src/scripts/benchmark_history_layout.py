@@ -0,0 +1,194 @@
+# scripts/benchmark_history_layout.py
+"""
+Benchmark do layout do histórico de trabalhos: strings repetidas em cada
+linha (tabela quantities, layout antigo de waste_calculation_complete.db)
+face às dimensões codificadas por dicionário (tabela jobs, ver
+app/ingestion/history_schema.py).
+
+Os trabalhos do histórico atual (lidos de quantities, tabela ou vista) são
+copiados para duas bases temporárias, uma em cada layout, com os mesmos
+índices e sem rollups, sketches nem anomalias. Mede-se:
+  - tamanho do ficheiro;
+  - tempo de consultas de varrimento (mediana de --runs execuções):
+      scan_sum          SUM(waste_sheets) sobre todo o histórico
+      group_client      desperdício por cliente
+      group_machine     desperdício por máquina × tipo de impressão
+      filter_machine    trabalhos de uma máquina
+      history_load      colunas lidas pelo índice do histórico (no layout
+                        codificado os ids de jobs, traduzidos em memória)
+--scale repete os trabalhos para simular históricos maiores.
+
+Uso:
+    python scripts/benchmark_history_layout.py [caminho.db] [--scale 1] [--runs 5] [--json]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# Adiciona o diretório pai ao sys.path para permitir importações
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.ingestion.history_schema import (
+    HistoryEncoder, create_history_indexes, create_history_schema, has_encoded_history, insert_encoded_jobs
+)
+from app.ingestion.pipeline import JOB_COLUMNS, bulk_load_pragmas
+from app.repositories.job_history import history_path
+
+CHUNK_SIZE = 50_000
+
+# Layout antigo, como criado por create_database_from_excel.py antes da codificação
+TEXT_SCHEMA = (
+    "CREATE TABLE quantities (id INTEGER PRIMARY KEY AUTOINCREMENT, print_type VARCHAR(10) NOT NULL, "
+    "run_length INTEGER NOT NULL, waste_sheets INTEGER NOT NULL, date DATE, client_code VARCHAR(10), "
+    "job_number VARCHAR(20), paper_format VARCHAR(10), paper_gsm INTEGER, machine VARCHAR(30), "
+    "adjustment VARCHAR(20), is_special_case BOOLEAN DEFAULT 0)"
+)
+TEXT_INDEXES = (
+    "CREATE INDEX idx_print_type_run ON quantities (print_type, run_length)",
+    "CREATE INDEX idx_date ON quantities (date)",
+    "CREATE INDEX idx_client ON quantities (client_code)",
+)
+
+# Consulta -> (layout antigo, layout codificado); "?" é a máquina mais frequente
+QUERIES = {
+    "scan_sum": (
+        "SELECT SUM(waste_sheets) FROM quantities",
+        "SELECT SUM(waste_sheets) FROM jobs",
+    ),
+    "group_client": (
+        "SELECT client_code, SUM(waste_sheets), COUNT(*) FROM quantities GROUP BY client_code",
+        "SELECT c.code, g.waste, g.jobs FROM (SELECT client_id, SUM(waste_sheets) AS waste, COUNT(*) AS jobs "
+        "FROM jobs GROUP BY client_id) g LEFT JOIN clients c ON c.id = g.client_id",
+    ),
+    "group_machine": (
+        "SELECT machine, print_type, SUM(waste_sheets) FROM quantities GROUP BY machine, print_type",
+        "SELECT m.name, t.name, g.waste FROM (SELECT machine_id, print_type_id, SUM(waste_sheets) AS waste "
+        "FROM jobs GROUP BY machine_id, print_type_id) g "
+        "LEFT JOIN machines m ON m.id = g.machine_id JOIN print_types t ON t.id = g.print_type_id",
+    ),
+    "filter_machine": (
+        "SELECT COUNT(*), SUM(waste_sheets) FROM quantities WHERE machine = ?",
+        "SELECT COUNT(*), SUM(waste_sheets) FROM jobs WHERE machine_id = (SELECT id FROM machines WHERE name = ?)",
+    ),
+    "history_load": (
+        "SELECT print_type, run_length, waste_sheets, machine, paper_gsm, paper_format FROM quantities",
+        "SELECT print_type_id, run_length, waste_sheets, machine_id, paper_gsm, paper_format_id FROM jobs",
+    ),
+}
+
+
+def read_jobs(path):
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return connection.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM quantities ORDER BY id").fetchall()
+    finally:
+        connection.close()
+
+
+def build_text(path, jobs, scale):
+    connection = sqlite3.connect(path)
+    with bulk_load_pragmas(connection, exclusive=True):
+        connection.execute(TEXT_SCHEMA)
+        insert = f"INSERT INTO quantities ({', '.join(JOB_COLUMNS)}) VALUES ({', '.join('?' for _ in JOB_COLUMNS)})"
+        for _ in range(scale):
+            for start in range(0, len(jobs), CHUNK_SIZE):
+                connection.executemany(insert, jobs[start:start + CHUNK_SIZE])
+        for sql in TEXT_INDEXES:
+            connection.execute(sql)
+        connection.commit()
+    connection.close()
+
+
+def build_encoded(path, jobs, scale):
+    connection = sqlite3.connect(path)
+    with bulk_load_pragmas(connection, exclusive=True):
+        cursor = connection.cursor()
+        create_history_schema(cursor)
+        encoder = HistoryEncoder(cursor)
+        for _ in range(scale):
+            for start in range(0, len(jobs), CHUNK_SIZE):
+                insert_encoded_jobs(encoder, jobs[start:start + CHUNK_SIZE])
+        create_history_indexes(cursor)
+        connection.commit()
+    connection.close()
+
+
+def time_queries(path, machine, runs):
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    layout = 1 if has_encoded_history(connection.cursor()) else 0
+    timings = {}
+    try:
+        for name, sqls in QUERIES.items():
+            sql = sqls[layout]
+            params = (machine,) if "?" in sql else ()
+            connection.execute(sql, params).fetchall()  # aquecimento (cache de páginas)
+            samples = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                connection.execute(sql, params).fetchall()
+                samples.append(time.perf_counter() - started)
+            timings[name] = statistics.median(samples)
+    finally:
+        connection.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamanho e varrimento: layout de strings vs dicionário")
+    parser.add_argument("source", nargs="?", help="histórico de origem (por omissão history_database_url)")
+    parser.add_argument("--scale", type=int, default=1, help="repete os trabalhos N vezes")
+    parser.add_argument("--runs", type=int, default=5, help="execuções medidas por consulta")
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    source = args.source or history_path()
+    if source is None or not os.path.exists(source):
+        print("Histórico de trabalhos não encontrado (history_database_url).")
+        return 1
+
+    jobs = read_jobs(source)
+    if not jobs:
+        print("Histórico sem trabalhos.")
+        return 1
+    position = JOB_COLUMNS.index("machine")
+    machines = Counter(row[position] for row in jobs if row[position])
+    machine = machines.most_common(1)[0][0] if machines else ""
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for layout, build in (("strings", build_text), ("dictionary", build_encoded)):
+            path = os.path.join(directory, f"{layout}.db")
+            started = time.perf_counter()
+            build(path, jobs, args.scale)
+            results[layout] = {
+                "build_seconds": time.perf_counter() - started,
+                "bytes": os.path.getsize(path),
+                "seconds": time_queries(path, machine, args.runs),
+            }
+
+    rows = len(jobs) * args.scale
+    if args.json:
+        print(json.dumps({"source": source, "jobs": rows, "layouts": results}, indent=2))
+        return 0
+
+    strings, dictionary = results["strings"], results["dictionary"]
+    print(f"Histórico: {source} ({rows:,} trabalhos, escala {args.scale})")
+    print(f"{'':<18}{'strings':>14}{'dicionário':>14}{'razão':>10}")
+    print(f"{'tamanho':<18}{strings['bytes'] / 2**20:>11.2f}MiB{dictionary['bytes'] / 2**20:>11.2f}MiB"
+          f"{dictionary['bytes'] / strings['bytes']:>10.2f}")
+    print(f"{'carga':<18}{strings['build_seconds']:>13.2f}s{dictionary['build_seconds']:>13.2f}s"
+          f"{dictionary['build_seconds'] / strings['build_seconds']:>10.2f}")
+    for name in QUERIES:
+        before, after = strings["seconds"][name] * 1e3, dictionary["seconds"][name] * 1e3
+        print(f"{name:<18}{before:>12.2f}ms{after:>12.2f}ms{after / before:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# scripts/benchmark_lean_path.py
+"""
+Benchmark do caminho rápido (LEAN_RESPONSES_ENABLED) face ao caminho normal.
+
+Para cada configuração arranca um processo novo, aquece a aplicação e mede
+o tempo médio por pedido em:
+  - GET /api/waste-calculation (tipos e tiragens aleatórios, semente fixa);
+  - GET /api/print-types.
+Os pedidos são entregues diretamente à aplicação ASGI, um de cada vez e sem
+servidor HTTP, pelo que os tempos medem só o custo da própria aplicação
+(dependências, sessão, consulta e serialização).
+
+Uso:
+    python scripts/benchmark_lean_path.py [--mode index|sync|async] [--requests 5000] [--json]
+
+--mode escolhe o acesso aos dados: índice em memória (por omissão), sessão
+síncrona no threadpool ou caminho assíncrono (requer aiosqlite).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "index": {"LOOKUP_INDEX_ENABLED": "true"},
+    "sync": {"LOOKUP_INDEX_ENABLED": "false", "ASYNC_DATABASE_ENABLED": "false"},
+    "async": {"LOOKUP_INDEX_ENABLED": "false", "ASYNC_DATABASE_ENABLED": "true"},
+}
+
+CONFIGURATIONS = {
+    "normal": {"LEAN_RESPONSES_ENABLED": "false"},
+    "lean": {"LEAN_RESPONSES_ENABLED": "true"},
+}
+
+# Código executado em cada processo filho; imprime os tempos em JSON
+CHILD = r'''
+import asyncio, json, random, sys, time
+from urllib.parse import urlencode
+
+import app as package
+
+application = package.create_app()
+total = int(sys.argv[1])
+
+
+async def request(path, query=""):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [(b"host", b"benchmark")], "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80), "state": {},
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await application(scope, receive, send)
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+
+async def measure(path, queries):
+    started = time.perf_counter()
+    for query in queries:
+        status, _ = await request(path, query)
+        if status >= 500:
+            raise SystemExit(f"{path} respondeu {status}")
+    return (time.perf_counter() - started) / len(queries)
+
+
+async def main():
+    lifespan_in, lifespan_out = asyncio.Queue(), asyncio.Queue()
+    lifespan = asyncio.create_task(application(
+        {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, lifespan_in.get, lifespan_out.put
+    ))
+    await lifespan_in.put({"type": "lifespan.startup"})
+    message = await lifespan_out.get()
+    if message["type"] != "lifespan.startup.complete":
+        raise SystemExit(f"falha no arranque: {message}")
+
+    _, body = await request("/api/print-types")
+    print_types = json.loads(body)
+    random.seed(42)
+    waste_queries = [
+        urlencode({"print_type": random.choice(print_types), "print_run": random.randint(100, 10000)})
+        for _ in range(total)
+    ]
+    print_type_queries = [""] * total
+
+    # Aquecimento: a primeira passagem preenche caches, pools e o índice
+    await measure("/api/waste-calculation", waste_queries)
+    await measure("/api/print-types", print_type_queries[:100])
+
+    results = {
+        "/api/waste-calculation": await measure("/api/waste-calculation", waste_queries),
+        "/api/print-types": await measure("/api/print-types", print_type_queries),
+    }
+
+    await lifespan_in.put({"type": "lifespan.shutdown"})
+    await lifespan
+    return results
+
+
+print(json.dumps(asyncio.run(main())))
+'''
+
+
+def run_configuration(env, total):
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CHILD, str(total)],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo por pedido: caminho normal vs caminho rápido")
+    parser.add_argument("--mode", choices=sorted(MODES), default="index", help="acesso aos dados")
+    parser.add_argument("--requests", type=int, default=5000, help="pedidos medidos por rota")
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for name, overrides in CONFIGURATIONS.items():
+        env = dict(os.environ, **MODES[args.mode], **overrides)
+        results[name] = run_configuration(env, args.requests)
+
+    if args.json:
+        print(json.dumps({"mode": args.mode, "requests": args.requests, "seconds_per_request": results}, indent=2))
+        return
+
+    print(f"Custo por pedido (modo {args.mode}, {args.requests} pedidos por rota)")
+    print(f"{'rota':<26}{'normal':>12}{'rápido':>12}{'poupado':>12}")
+    for path in results["normal"]:
+        normal = results["normal"][path] * 1e6
+        lean = results["lean"][path] * 1e6
+        saved = normal - lean
+        print(f"{path:<26}{normal:>10.1f}µs{lean:>10.1f}µs{saved:>10.1f}µs ({saved / normal:.0%})")
+
+
+if __name__ == "__main__":
+    main()
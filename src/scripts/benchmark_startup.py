@@ -0,0 +1,139 @@
+# scripts/benchmark_startup.py
+"""
+Benchmark do tempo de arranque da aplicação.
+
+Cada execução corre num processo novo (arranque a frio) e mede:
+  - import:        importação do pacote `app`;
+  - create_app:    construção da aplicação (rotas, middleware);
+  - startup:       lifespan (esquema, índice em memória);
+  - first_request: primeiro pedido servido;
+  - total:         tempo de parede do processo, incluindo o interpretador.
+O pedido é entregue diretamente à aplicação ASGI, sem servidor HTTP.
+
+Uso:
+    python scripts/benchmark_startup.py [--runs 10] [--path /api/print-types] [--production] [--json]
+
+--production desliga a criação do esquema no arranque
+(CREATE_SCHEMA_ON_STARTUP=false), como num deploy com scripts/migrate.py.
+As restantes opções podem ser passadas por variáveis de ambiente.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PHASES = ("import", "create_app", "startup", "first_request", "total")
+
+# Código executado em cada processo filho; imprime os tempos em JSON
+CHILD = r'''
+import asyncio, json, sys, time
+
+t0 = time.perf_counter()
+import app as package
+t1 = time.perf_counter()
+application = package.create_app()
+t2 = time.perf_counter()
+
+
+async def main(path):
+    lifespan_in, lifespan_out = asyncio.Queue(), asyncio.Queue()
+    lifespan = asyncio.create_task(application(
+        {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, lifespan_in.get, lifespan_out.put
+    ))
+    await lifespan_in.put({"type": "lifespan.startup"})
+    message = await lifespan_out.get()
+    if message["type"] != "lifespan.startup.complete":
+        raise SystemExit(f"falha no arranque: {message}")
+    t3 = time.perf_counter()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"benchmark")], "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80), "state": {},
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await application(scope, receive, send)
+    t4 = time.perf_counter()
+
+    await lifespan_in.put({"type": "lifespan.shutdown"})
+    await lifespan
+    return t3, t4, sent[0]["status"]
+
+
+t3, t4, status = asyncio.run(main(sys.argv[1]))
+print(json.dumps({
+    "import": t1 - t0, "create_app": t2 - t1, "startup": t3 - t2,
+    "first_request": t4 - t3, "status": status,
+}))
+'''
+
+
+def run_once(path, env):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CHILD, path],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["total"] = elapsed
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de arranque a frio da aplicação")
+    parser.add_argument("--runs", type=int, default=10, help="número de arranques (processos novos)")
+    parser.add_argument("--path", default="/api/print-types", help="rota do primeiro pedido")
+    parser.add_argument("--production", action="store_true", help="sem criação do esquema no arranque")
+    parser.add_argument("--json", action="store_true", help="imprime o resumo em JSON")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.production:
+        env["CREATE_SCHEMA_ON_STARTUP"] = "false"
+
+    runs = []
+    for _ in range(args.runs):
+        timings = run_once(args.path, env)
+        if timings["status"] != 200:
+            print(f"Aviso: {args.path} respondeu {timings['status']}")
+        runs.append(timings)
+
+    summary = {
+        phase: {
+            "median_ms": statistics.median(r[phase] for r in runs) * 1000,
+            "min_ms": min(r[phase] for r in runs) * 1000,
+            "max_ms": max(r[phase] for r in runs) * 1000,
+        }
+        for phase in PHASES
+    }
+
+    if args.json:
+        print(json.dumps({"runs": args.runs, "production": args.production, "phases": summary}, indent=2))
+        return
+
+    mode = "produção" if args.production else "desenvolvimento"
+    print(f"Arranque a frio ({args.runs} execuções, modo {mode}, primeiro pedido {args.path})")
+    print(f"{'etapa':<15}{'mediana':>12}{'mín':>12}{'máx':>12}")
+    for phase in PHASES:
+        s = summary[phase]
+        print(f"{phase:<15}{s['median_ms']:>10.1f}ms{s['min_ms']:>10.1f}ms{s['max_ms']:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
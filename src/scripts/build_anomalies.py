@@ -0,0 +1,49 @@
+# scripts/build_anomalies.py
+"""
+Refaz as estatísticas por grupo e as anomalias de desperdício (ver
+app/ingestion/anomalies.py) percorrendo uma vez todo o histórico de
+trabalhos, pela ordem de importação. As bases criadas por
+create_database_from_excel.py já as mantêm na importação; este script serve
+para bases criadas antes da deteção de anomalias ou depois de alterar
+anomaly_z_threshold / anomaly_min_samples.
+
+Uso: python scripts/build_anomalies.py [caminho/para/waste_calculation_complete.db]
+"""
+import os
+import sqlite3
+import sys
+import time
+
+# Adiciona o diretório pai ao sys.path para permitir importações
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config.settings import get_settings
+from app.ingestion.anomalies import GROUP_STATS_TABLE, rebuild_anomalies
+from app.repositories.job_history import history_path
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else history_path()
+    if path is None or not os.path.exists(path):
+        print("Histórico de trabalhos não encontrado (history_database_url).")
+        return 1
+
+    settings = get_settings()
+    print(f"Recalculando anomalias em: {path} "
+          f"(z > {settings.anomaly_z_threshold}, grupos com {settings.anomaly_min_samples}+ trabalhos)")
+    started = time.perf_counter()
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            cursor = connection.cursor()
+            anomalies = rebuild_anomalies(cursor)
+            groups = cursor.execute(f"SELECT COUNT(*) FROM {GROUP_STATS_TABLE}").fetchone()[0]
+    finally:
+        connection.close()
+    print(f"  {groups:,} grupos (tipo × faixa de tiragem × máquina), {anomalies:,} anomalias")
+    print(f"Concluído em {time.perf_counter() - started:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+# scripts/build_rollups.py
+"""
+Recalcula as tabelas de agregados dos relatórios (ver app/ingestion/rollups.py)
+a partir de todo o histórico de trabalhos. As bases criadas por
+create_database_from_excel.py já mantêm os agregados na importação; este
+script serve para bases criadas antes dos rollups ou para os reconstruir.
+
+Uso: python scripts/build_rollups.py [caminho/para/waste_calculation_complete.db]
+"""
+import os
+import sqlite3
+import sys
+import time
+
+# Adiciona o diretório pai ao sys.path para permitir importações
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.ingestion.rollups import ROLLUP_GROUPINGS, ROLLUP_PERIODS, rebuild_rollups, rollup_table
+from app.repositories.job_history import history_path
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else history_path()
+    if path is None or not os.path.exists(path):
+        print("Histórico de trabalhos não encontrado (history_database_url).")
+        return 1
+
+    print(f"Recalculando agregados em: {path}")
+    started = time.perf_counter()
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            cursor = connection.cursor()
+            rebuild_rollups(cursor)
+            for period in ROLLUP_PERIODS:
+                for grouping in ROLLUP_GROUPINGS:
+                    table = rollup_table(period, grouping)
+                    count = cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    print(f"  {table}: {count:,} linhas")
+    finally:
+        connection.close()
+    print(f"Concluído em {time.perf_counter() - started:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
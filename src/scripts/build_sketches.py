@@ -0,0 +1,44 @@
+# scripts/build_sketches.py
+"""
+Recalcula os sketches de percentis do desperdício (ver app/ingestion/sketches.py)
+a partir de todo o histórico de trabalhos. As bases criadas por
+create_database_from_excel.py já os mantêm na importação; este script serve
+para bases criadas antes dos sketches ou para os reconstruir.
+
+Uso: python scripts/build_sketches.py [caminho/para/waste_calculation_complete.db]
+"""
+import os
+import sqlite3
+import sys
+import time
+
+# Adiciona o diretório pai ao sys.path para permitir importações
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.ingestion.sketches import SKETCH_TABLE, rebuild_sketches
+from app.repositories.job_history import history_path
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else history_path()
+    if path is None or not os.path.exists(path):
+        print("Histórico de trabalhos não encontrado (history_database_url).")
+        return 1
+
+    print(f"Recalculando sketches em: {path}")
+    started = time.perf_counter()
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            cursor = connection.cursor()
+            rebuild_sketches(cursor)
+            sketches, jobs = cursor.execute(f"SELECT COUNT(*), SUM(count) FROM {SKETCH_TABLE}").fetchone()
+    finally:
+        connection.close()
+    print(f"  {sketches:,} sketches (tipo × faixa de tiragem), {jobs or 0:,} trabalhos")
+    print(f"Concluído em {time.perf_counter() - started:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
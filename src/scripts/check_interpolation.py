@@ -0,0 +1,148 @@
+# scripts/check_interpolation.py
+"""
+Verifica os modos de cálculo (step, linear, monotone) com os dados da base:
+  - nos pontos da tabela (cada run_length) os modos linear e monotone dão
+    exatamente o resultado do modo step, no cálculo simples e em lote;
+  - entre pontos o valor interpolado fica entre os desperdícios das linhas
+    vizinhas (arredondado para cima), sem oscilações no modo monotone;
+  - a otimização da tiragem, com max_run num breakpoint e a meio de um
+    degrau, devolve os fins de degrau do intervalo sem tiragens repetidas e
+    o mesmo mínimo que uma procura exaustiva.
+Corre com o repository SQL e com o índice em memória. Termina com código 1
+se alguma verificação falhar.
+
+Uso: python scripts/check_interpolation.py
+"""
+import asyncio
+import math
+import os
+import sys
+
+# Adiciona o diretório pai ao sys.path para permitir importações
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config.settings import get_settings
+from app.core.database import ReadSessionLocal
+from app.core.schema import migrate
+from app.repositories.quantity_index import IndexedQuantityRepository, QuantityIndex
+from app.repositories.quantity_repository import QuantityRepository
+from app.schemas.quantity import WasteCalculationRequest
+from app.services.interpolation import CALCULATION_MODES
+from app.services.optimization import optimize
+from app.services.waste_calculation import WasteCalculationService
+
+# Candidatos pedidos à otimização e largura máxima dos intervalos verificados
+OPTIMIZATION_LIMIT = 5
+OPTIMIZATION_MAX_WIDTH = 20_000
+
+
+async def check_table_points(service, print_type, run_lengths):
+    """Problemas nos pontos da tabela: modos interpolados diferentes do modo step."""
+    problems = []
+    requests = [WasteCalculationRequest(print_type=print_type, print_run=run) for run in run_lengths]
+    step = [await service.calculate_waste(request) for request in requests]
+    size = get_settings().batch_max_items
+    for mode in CALCULATION_MODES:
+        single = [await service.calculate_waste(request, mode) for request in requests]
+        batch = [
+            item.result
+            for start in range(0, len(requests), size)
+            for item in await service.calculate_waste_batch(requests[start:start + size], mode)
+        ]
+        for expected, got, got_batch in zip(step, single, batch):
+            if got != expected or got_batch != expected:
+                problems.append(f"{print_type} {mode} em {expected.print_run}: {got} / {got_batch} != {expected}")
+    return problems
+
+
+async def check_between_points(service, print_type):
+    """Problemas entre pontos: valores fora do intervalo das linhas vizinhas."""
+    problems = []
+    curve = await service._curve(print_type)
+    xs, ys = curve.run_lengths, curve.wastes
+    for k in range(len(xs) - 1):
+        if xs[k + 1] - xs[k] < 2:
+            continue
+        low, high = min(ys[k], ys[k + 1]), max(ys[k], ys[k + 1])
+        for mode in ("linear", "monotone"):
+            previous = None
+            for run in (xs[k] + (xs[k + 1] - xs[k]) * f // 4 for f in (1, 2, 3)):
+                value = curve.evaluate(run, mode)[0]
+                if not low <= value <= math.ceil(high):
+                    problems.append(f"{print_type} {mode} em {run}: {value} fora de [{low}, {high}]")
+                if previous is not None and (value - previous) * (ys[k + 1] - ys[k]) < 0:
+                    problems.append(f"{print_type} {mode} em {run}: não monótono ({previous} -> {value})")
+                previous = value
+    return problems
+
+
+def check_optimization(curve, print_type):
+    """
+    Problemas na otimização, em intervalos que terminam num breakpoint e a
+    meio do degrau seguinte: os candidatos devem ser os fins de degrau do
+    intervalo (e max_run), sem repetições, com o desperdício do modo step, e
+    o primeiro deve ser o mínimo de todas as tiragens do intervalo.
+    """
+    problems = []
+    xs = curve.run_lengths
+    for k in range(1, len(xs), max(len(xs) // 20, 1)):
+        min_run = xs[k - 1] // 2 + 1
+        for max_run in (xs[k], xs[k] + 1):
+            if max_run - min_run > OPTIMIZATION_MAX_WIDTH or curve.evaluate(max_run) is None:
+                continue
+            label = f"{print_type} [{min_run}, {max_run}]"
+            best = optimize(curve, min_run, max_run, OPTIMIZATION_LIMIT, 0)["best"]
+            runs = [c["print_run"] for c in best]
+            if len(set(runs)) != len(runs):
+                problems.append(f"{label}: tiragens repetidas {runs}")
+            for c in best:
+                if c["waste_amount"] != curve.evaluate(c["print_run"])[0]:
+                    problems.append(f"{label}: {c} difere do modo step")
+
+            ends = {run for run in xs if min_run <= run <= max_run} | {max_run}
+            expected = sorted((curve.evaluate(run)[0] / run, run) for run in ends)[:OPTIMIZATION_LIMIT]
+            if [(c["waste_ratio"], c["print_run"]) for c in best] != expected:
+                problems.append(f"{label}: {runs} != {[run for _, run in expected]}")
+            lowest = min(curve.evaluate(run)[0] / run for run in range(min_run, max_run + 1))
+            if best and not math.isclose(best[0]["waste_ratio"], lowest):
+                problems.append(f"{label}: melhor razão {best[0]['waste_ratio']} != {lowest}")
+    return problems
+
+
+async def main():
+    migrate()
+    db = ReadSessionLocal()
+    try:
+        repositories = {
+            "sql": QuantityRepository(db),
+            "índice": IndexedQuantityRepository(QuantityIndex.from_session(db)),
+        }
+        print_types = repositories["sql"].find_all_print_types()
+        if not print_types:
+            print("Base de dados sem tipos de impressão: importe dados antes de verificar.")
+            return 1
+
+        failures = 0
+        for name, repository in repositories.items():
+            service = WasteCalculationService(repository)
+            problems = []
+            points = 0
+            for print_type in print_types:
+                run_lengths = sorted(set(repository.find_run_lengths(print_type)))
+                points += len(run_lengths)
+                problems += await check_table_points(service, print_type, run_lengths)
+                problems += await check_between_points(service, print_type)
+                problems += check_optimization(await service._curve(print_type), print_type)
+            status = "OK " if not problems else "ERRO"
+            print(f"[{status}] {name}: {len(print_types)} tipos, {points} pontos da tabela")
+            for problem in problems[:20]:
+                print(f"       {problem}")
+            failures += bool(problems)
+    finally:
+        db.close()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,92 @@
+# scripts/check_query_plans.py
+"""
+Verifica com EXPLAIN QUERY PLAN que as consultas do QuantityRepository são
+respondidas só a partir do índice de cobertura (ix_quantities_lookup), sem
+percorrer a tabela nem ordenar numa B-tree temporária.
+
+As instruções verificadas são as que o próprio repository executa (são
+capturadas no engine), pelo que a verificação acompanha alterações ao código.
+Termina com código 1 se algum plano não usar o índice.
+
+Uso: python scripts/check_query_plans.py
+"""
+import os
+import sys
+
+# Adiciona o diretório pai ao sys.path para permitir importações
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import event
+
+from app.core.database import ReadSessionLocal, reader_engine
+from app.core.schema import LOOKUP_INDEX, migrate
+from app.repositories.quantity_repository import QuantityRepository
+
+
+def explain(connection, statement, parameters):
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def plan_problems(plan):
+    """Problemas de um plano que toque na tabela quantities (lista vazia se estiver bem)."""
+    problems = []
+    for step in plan:
+        if "quantities" not in step.split():
+            continue
+        if f"USING COVERING INDEX {LOOKUP_INDEX}" not in step:
+            problems.append(f"não usa apenas o índice {LOOKUP_INDEX}: {step}")
+    if any("TEMP B-TREE" in step for step in plan):
+        problems.append("ordenação numa B-tree temporária")
+    return problems
+
+
+def main():
+    migrate()
+    captured = []
+
+    @event.listens_for(reader_engine, "before_cursor_execute")
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((conn, statement, parameters))
+
+    db = ReadSessionLocal()
+    try:
+        repository = QuantityRepository(db)
+        print_types = repository.find_all_print_types()
+        if not print_types:
+            print("Base de dados sem tipos de impressão: importe dados antes de verificar.")
+            return 1
+        print_type = print_types[0]
+
+        checks = [
+            ("find_by_print_type_and_run", lambda: repository.find_by_print_type_and_run(print_type, 1000)),
+            ("find_many_by_print_type_and_runs", lambda: repository.find_many_by_print_type_and_runs(print_type, [500, 1000])),
+            ("find_run_lengths", lambda: repository.find_run_lengths(print_type)),
+            ("find_curve", lambda: repository.find_curve(print_type)),
+            ("find_all_quantities", lambda: repository.find_all_quantities()),
+        ]
+
+        failures = 0
+        for name, call in checks:
+            captured.clear()
+            call()
+            for conn, statement, parameters in list(captured):
+                plan = explain(conn, statement, parameters)
+                problems = plan_problems(plan)
+                status = "OK " if not problems else "ERRO"
+                print(f"[{status}] {name}: {'; '.join(plan)}")
+                for problem in problems:
+                    print(f"       {problem}")
+                failures += bool(problems)
+    finally:
+        db.close()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.config.settings import get_settings
+from app.ingestion.workbook import WorkbookReader
 
 def main():
     # Obter o caminho do arquivo de banco de dados
@@ -46,17 +47,20 @@ def main():
     
     print(f"Carregando dados do Excel: {excel_path}")
     try:
-        # Ler o arquivo Excel - assumindo que está na primeira aba
-        excel_df = pd.read_excel(excel_path)
+        # Ler o arquivo Excel em streaming - assumindo que está na primeira aba.
+        # Só as colunas comparadas são mantidas em memória.
+        required_columns = ['print_type', 'run_length', 'waste_sheets']
+        with WorkbookReader(excel_path) as reader:
+            excel_columns = reader.columns(0)
+            excel_df = reader.read_sheet(0, usecols=required_columns)
         print(f"Total de registros do Excel: {len(excel_df)}")
         
         # Verificar colunas
         print(f"Colunas do banco de dados: {list(db_df.columns)}")
-        print(f"Colunas do Excel: {list(excel_df.columns)}")
+        print(f"Colunas do Excel: {excel_columns}")
         
         # Verificar se as colunas existem no Excel
-        required_columns = ['print_type', 'run_length', 'waste_sheets']
-        if all(col in excel_df.columns for col in required_columns):
+        if all(col in excel_columns for col in required_columns):
             print("✅ Todas as colunas necessárias estão presentes no Excel.")
             
             # Ordenar DataFrames para facilitar a comparação
@@ -119,7 +123,7 @@ def main():
                     only_in_excel_df = pd.DataFrame([list(row) for row in only_in_excel], columns=required_columns)
                     print(only_in_excel_df.head(10))  # Mostrar apenas os primeiros 10
         else:
-            missing_cols = [col for col in required_columns if col not in excel_df.columns]
+            missing_cols = [col for col in required_columns if col not in excel_columns]
             print(f"❌ Colunas ausentes no Excel: {missing_cols}")
     except Exception as e:
         print(f"Erro ao processar o arquivo Excel: {str(e)}")
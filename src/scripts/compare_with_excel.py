@@ -16,6 +16,7 @@ import glob
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.config.settings import get_settings
+from app.ingestion.workbook import WorkbookReader
 
 def main():
     # Obter o caminho do arquivo de banco de dados
@@ -56,9 +57,10 @@ def main():
     print(f"Carregando dados do Excel: {excel_path}")
     
     # Tentar carregar dados do Excel
+    xl = None
     try:
         # Primeiro tentar encontrar a aba correta
-        xl = pd.ExcelFile(excel_path)
+        xl = WorkbookReader(excel_path)
         sheets = xl.sheet_names
         
         print("Abas disponíveis no Excel:")
@@ -73,11 +75,12 @@ def main():
             sheet_name = sheets[selection-1]
         
         print(f"Carregando aba '{sheet_name}'...")
-        excel_df = pd.read_excel(excel_path, sheet_name=sheet_name)
+        # Só o primeiro bloco é lido para mostrar a estrutura
+        excel_head = next(xl.iter_chunks(sheet_name, chunk_size=5), pd.DataFrame(columns=xl.columns(sheet_name)))
         
         # Mostrar as primeiras linhas para verificar a estrutura
         print("\nPrimeiras linhas do Excel:")
-        print(excel_df.head())
+        print(excel_head)
         
         # Pedir as colunas para mapeamento
         print("\nInforme os nomes das colunas do Excel que correspondem às colunas do banco de dados:")
@@ -87,7 +90,7 @@ def main():
         
         for col in db_columns:
             print(f"Coluna do banco de dados: {col}")
-            print("Colunas disponíveis no Excel:", ", ".join(excel_df.columns))
+            print("Colunas disponíveis no Excel:", ", ".join(excel_head.columns))
             excel_col = input(f"Informe o nome da coluna correspondente no Excel (ou deixe vazio para pular): ")
             if excel_col:
                 columns_mapping[col] = excel_col
@@ -97,7 +100,8 @@ def main():
         
         # Verificar se todas as colunas necessárias foram mapeadas
         if set(db_columns).issubset(set(columns_mapping.keys())):
-            # Mapear colunas do Excel para o formato do banco de dados
+            # Ler em streaming apenas as colunas mapeadas e convertê-las para o formato do banco de dados
+            excel_df = xl.read_sheet(sheet_name, usecols=[columns_mapping[col] for col in db_columns])
             excel_mapped = excel_df.rename(columns={v: k for k, v in columns_mapping.items()})
             
             # Selecionar apenas as colunas relevantes
@@ -163,6 +167,9 @@ def main():
     
     except Exception as e:
         print(f"Erro ao processar o arquivo Excel: {str(e)}")
+    finally:
+        if xl is not None:
+            xl.close()
     
     # Fechar a conexão
     conn.close()
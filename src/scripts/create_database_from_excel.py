@@ -6,10 +6,42 @@ Script para criar um banco de dados com os dados completos do Excel
 """
 
 import os
+import sys
 import sqlite3
 import pandas as pd
 from pathlib import Path
 
+# Ajustar o caminho de importação para poder importar módulos da aplicação
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ingestion.pipeline import (
+    DEFAULT_CHUNK_SIZE, IngestionStats, bulk_load_pragmas, iter_frames, normalize_jobs
+)
+from app.ingestion.rollups import create_rollup_tables, insert_jobs
+from app.ingestion.anomalies import create_anomaly_tables
+from app.ingestion.history_schema import HistoryEncoder, create_history_indexes, create_history_schema
+from app.ingestion.sketches import create_sketch_tables
+
+
+def describe_print_type(pt):
+    """Descrição legível de um tipo de impressão (ex: 4/1 -> "4 cores + 1 cor no verso")."""
+    parts = pt.split('/')
+    front = int(parts[0])
+    back = int(parts[1])
+    
+    description = f"{front} cor"
+    if front > 1:
+        description += "es"
+    if back > 0:
+        description += f" + {back} cor"
+        if back > 1:
+            description += "es"
+        description += " no verso"
+    else:
+        description += " somente frente"
+    
+    return (pt, description, front, back)
+
 def main():
     # Caminho para o arquivo Excel
     excel_path = os.path.join('dados', 'quantidades_detalhado.xlsx')
@@ -38,114 +70,51 @@ def main():
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
-    # Criar tabela para os dados completos
-    cursor.execute('''
-    CREATE TABLE quantities (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        print_type VARCHAR(10) NOT NULL,
-        run_length INTEGER NOT NULL,
-        waste_sheets INTEGER NOT NULL,
-        date DATE,
-        client_code VARCHAR(10),
-        job_number VARCHAR(20),
-        paper_format VARCHAR(10),
-        paper_gsm INTEGER,
-        machine VARCHAR(30),
-        adjustment VARCHAR(20),
-        is_special_case BOOLEAN DEFAULT 0
-    )
-    ''')
-    
-    # Também criar a tabela de tipos de impressão
-    cursor.execute('''
-    CREATE TABLE print_types (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name VARCHAR(10) NOT NULL UNIQUE,
-        description VARCHAR(100),
-        front_colors INTEGER,
-        back_colors INTEGER
-    )
-    ''')
-    
-    # Ler o arquivo Excel - usar a planilha de dados completos
-    df = pd.read_excel(excel_path, sheet_name='Dados Completos')
-    
-    print(f"Total de registros a serem importados: {len(df)}")
-    
-    # Inserir dados na tabela
-    # Para inserções em massa, é mais eficiente usar pandas
-    # Mas vamos usar o sqlite diretamente para mais controle
-    
-    # Preparar os tipos de impressão para a tabela de tipos
-    print_types = []
-    for pt in df['print_type'].unique():
-        parts = pt.split('/')
-        front = int(parts[0])
-        back = int(parts[1])
+    with bulk_load_pragmas(conn, exclusive=True):
+        # Trabalhos com as dimensões codificadas por dicionário (tabela jobs,
+        # print_types, clients, machines, paper_formats) e a vista quantities
+        # com o layout antigo
+        create_history_schema(cursor)
+        encoder = HistoryEncoder(cursor)
         
-        description = f"{front} cor"
-        if front > 1:
-            description += "es"
-        if back > 0:
-            description += f" + {back} cor"
-            if back > 1:
-                description += "es"
-            description += " no verso"
-        else:
-            description += " somente frente"
+        # Agregados por dia/mês × cliente × máquina × tipo para os relatórios
+        create_rollup_tables(cursor)
+        # Sketches dos percentis de desperdício por tipo e faixa de tiragem
+        create_sketch_tables(cursor)
+        # Estatísticas por grupo e trabalhos com desperdício fora do normal
+        create_anomaly_tables(cursor)
         
-        print_types.append((pt, description, front, back))
-    
-    cursor.executemany(
-        "INSERT INTO print_types (name, description, front_colors, back_colors) VALUES (?, ?, ?, ?)",
-        print_types
-    )
-    
-    # Inserir registros na tabela principal
-    # Dividir em lotes para performance
-    batch_size = 1000
-    for i in range(0, len(df), batch_size):
-        batch = df.iloc[i:i+batch_size]
-        
-        # Preparar os valores a serem inseridos
-        values = []
-        for _, row in batch.iterrows():
-            values.append((
-                row['print_type'], 
-                row['run_length'], 
-                row['waste_sheets'],
-                row['date'],
-                row['client_code'],
-                row['job_number'],
-                row['paper_format'],
-                row['paper_gsm'],
-                row['machine'],
-                None,  # adjustment
-                False  # is_special_case
-            ))
+        # Ler e inserir a planilha de dados completos em blocos:
+        # cada bloco é convertido de forma vetorizada, codificado, inserido com
+        # executemany e somado aos agregados, aos sketches e às estatísticas
+        # de anomalias
+        stats = IngestionStats()
+        anomalies = 0
+        for frame in iter_frames(excel_path, sheet_name='Dados Completos', chunk_size=DEFAULT_CHUNK_SIZE):
+            anomalies += insert_jobs(cursor, normalize_jobs(frame, stats), encoder)
+            print(f"Inseridos {stats.rows:,} registros...")
         
+        # Descrição dos tipos de impressão (criados pela codificação)
+        cursor.execute("SELECT name FROM print_types")
+        print_types = [describe_print_type(pt) for (pt,) in cursor.fetchall()]
         cursor.executemany(
-            '''INSERT INTO quantities 
-               (print_type, run_length, waste_sheets, date, client_code, job_number, 
-               paper_format, paper_gsm, machine, adjustment, is_special_case) 
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', 
-            values
+            "UPDATE print_types SET description = ?, front_colors = ?, back_colors = ? WHERE name = ?",
+            [(description, front, back, name) for name, description, front, back in print_types]
         )
         
-        print(f"Inseridos {min(i+batch_size, len(df))} de {len(df)} registros...")
-    
-    # Criar índices para melhorar performance de consultas
-    cursor.execute('CREATE INDEX idx_print_type_run ON quantities (print_type, run_length)')
-    cursor.execute('CREATE INDEX idx_date ON quantities (date)')
-    cursor.execute('CREATE INDEX idx_client ON quantities (client_code)')
+        # Criar índices só depois da carga (mais rápido do que mantê-los durante os inserts)
+        create_history_indexes(cursor)
+        
+        # Commit
+        conn.commit()
     
-    # Commit e encerrar
-    conn.commit()
     conn.close()
+    stats.finish()
     
     print(f"Banco de dados criado com sucesso: {db_path}")
     print(f"Total de tipos de impressão inseridos: {len(print_types)}")
-    print(f"Total de registros inseridos: {len(df)}")
+    print(f"Total de registros inseridos: {stats}")
+    print(f"Trabalhos assinalados como anomalias: {anomalies:,}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
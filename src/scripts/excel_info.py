@@ -6,8 +6,61 @@ Script para mostrar informações do arquivo Excel de quantidades
 """
 
 import os
+import sys
+from collections import Counter
+
 import pandas as pd
 
+# Adicionar diretório raiz ao path para importar os módulos corretamente
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ingestion.workbook import WorkbookReader
+
+EXPECTED_COLUMNS = ['print_type', 'run_length', 'waste_sheets']
+
+class SheetSummary:
+    """
+    Estatísticas de uma planilha acumuladas bloco a bloco, para que a
+    memória usada não dependa do número de linhas.
+    """
+    def __init__(self):
+        self.rows = 0
+        self.columns = []
+        self.head = None
+        self.non_null = Counter()
+        self.samples = {}
+        self.numeric = {}
+        self.print_types = Counter()
+        self.run_lengths = set()
+
+    def add(self, chunk):
+        if self.head is None:
+            self.columns = list(chunk.columns)
+            self.head = chunk.head()
+            self.dtypes = chunk.dtypes
+            # Valores de exemplo (max 5) retirados do primeiro bloco
+            for col in chunk.columns:
+                self.samples[col] = chunk[col].dropna().unique()[:5]
+        self.rows += len(chunk)
+        self.non_null.update(chunk.notna().sum().to_dict())
+
+        if all(col in chunk.columns for col in EXPECTED_COLUMNS):
+            for col in ('run_length', 'waste_sheets'):
+                values = pd.to_numeric(chunk[col], errors='coerce').dropna()
+                if values.empty:
+                    continue
+                count, total, low, high = self.numeric.get(col, (0, 0.0, values.min(), values.max()))
+                self.numeric[col] = (count + len(values), total + values.sum(),
+                                     min(low, values.min()), max(high, values.max()))
+            self.print_types.update(chunk['print_type'].dropna().tolist())
+            self.run_lengths.update(chunk['run_length'].dropna().unique().tolist())
+
+    def describe(self):
+        return pd.DataFrame(
+            {col: {'count': count, 'mean': total / count, 'min': low, 'max': high}
+             for col, (count, total, low, high) in self.numeric.items()}
+        )
+
 def main():
     # Caminho para o arquivo Excel
     excel_path = os.path.join('dados', 'quantidades_exemplo.xlsx')
@@ -25,63 +78,63 @@ def main():
     print(f"Carregando dados do Excel: {excel_path}")
     
     try:
-        # Ler o arquivo Excel
-        # Verificar se há várias planilhas
-        excel = pd.ExcelFile(excel_path)
-        print(f"Planilhas disponíveis: {excel.sheet_names}")
-        
-        total_rows = 0
-        
-        # Ler cada planilha e mostrar informações
-        for sheet_name in excel.sheet_names:
-            print(f"\n{'=' * 50}")
-            print(f"Planilha: {sheet_name}")
-            print(f"{'=' * 50}")
-            
-            df = pd.read_excel(excel_path, sheet_name=sheet_name)
-            total_rows += len(df)
-            
-            print(f"Total de linhas: {len(df)}")
-            print(f"Colunas: {list(df.columns)}")
-            print("\nPrimeiras 5 linhas:")
-            print(df.head())
+        # Abrir o arquivo uma única vez e ler cada planilha em blocos
+        with WorkbookReader(excel_path) as excel:
+            print(f"Planilhas disponíveis: {excel.sheet_names}")
             
-            print("\nInformações sobre os dados:")
-            print(df.info())
+            total_rows = 0
             
-            # Verificar se existem as colunas que estamos procurando
-            expected_columns = ['print_type', 'run_length', 'waste_sheets']
-            missing_columns = [col for col in expected_columns if col not in df.columns]
-            
-            if missing_columns:
-                print(f"\nColunas esperadas que não estão presentes: {missing_columns}")
+            # Ler cada planilha e mostrar informações
+            for sheet_name in excel.sheet_names:
+                print(f"\n{'=' * 50}")
+                print(f"Planilha: {sheet_name}")
+                print(f"{'=' * 50}")
                 
-                # Se não temos as colunas esperadas, vamos tentar identificar colunas similares
-                print("\nColunas disponíveis que podem ser relevantes:")
-                for col in df.columns:
-                    print(f"  - {col}")
-                    # Mostrar os primeiros valores únicos para cada coluna para ajudar na identificação
-                    try:
-                        unique_values = df[col].dropna().unique()[:5]
-                        print(f"    Valores únicos (max 5): {unique_values}")
-                    except:
-                        print("    Não foi possível mostrar valores únicos")
-            else:
-                print("\nTodas as colunas esperadas estão presentes na planilha.")
+                summary = SheetSummary()
+                for chunk in excel.iter_chunks(sheet_name):
+                    summary.add(chunk)
+                total_rows += summary.rows
                 
-                # Se as colunas esperadas estão presentes, mostrar estatísticas básicas
-                print("\nEstatísticas básicas:")
-                print(df[expected_columns].describe())
+                print(f"Total de linhas: {summary.rows}")
+                print(f"Colunas: {summary.columns}")
+                if summary.head is None:
+                    continue
+                print("\nPrimeiras 5 linhas:")
+                print(summary.head)
                 
-                # Mostrar quantos tipos de impressão diferentes existem
-                print(f"\nTipos de impressão únicos ({len(df['print_type'].unique())}):")
-                print(df['print_type'].value_counts().head(10))
+                print("\nInformações sobre os dados:")
+                for col in summary.columns:
+                    print(f"  {col}: {summary.non_null[col]} não nulos ({summary.dtypes[col]})")
                 
-                # Mostrar as tiragens disponíveis
-                print(f"\nTiragens disponíveis ({len(df['run_length'].unique())}):")
-                print(sorted(df['run_length'].unique()))
-        
-        print(f"\nTotal de linhas em todas as planilhas: {total_rows}")
+                # Verificar se existem as colunas que estamos procurando
+                missing_columns = [col for col in EXPECTED_COLUMNS if col not in summary.columns]
+                
+                if missing_columns:
+                    print(f"\nColunas esperadas que não estão presentes: {missing_columns}")
+                    
+                    # Se não temos as colunas esperadas, vamos tentar identificar colunas similares
+                    print("\nColunas disponíveis que podem ser relevantes:")
+                    for col in summary.columns:
+                        print(f"  - {col}")
+                        # Mostrar os primeiros valores únicos para cada coluna para ajudar na identificação
+                        print(f"    Valores únicos (max 5): {summary.samples[col]}")
+                else:
+                    print("\nTodas as colunas esperadas estão presentes na planilha.")
+                    
+                    # Se as colunas esperadas estão presentes, mostrar estatísticas básicas
+                    print("\nEstatísticas básicas:")
+                    print(summary.describe())
+                    
+                    # Mostrar quantos tipos de impressão diferentes existem
+                    print(f"\nTipos de impressão únicos ({len(summary.print_types)}):")
+                    for print_type, count in summary.print_types.most_common(10):
+                        print(f"  {print_type}: {count}")
+                    
+                    # Mostrar as tiragens disponíveis
+                    print(f"\nTiragens disponíveis ({len(summary.run_lengths)}):")
+                    print(sorted(summary.run_lengths))
+            
+            print(f"\nTotal de linhas em todas as planilhas: {total_rows}")
         
     except Exception as e:
         print(f"Erro ao processar o arquivo Excel: {str(e)}")
@@ -1,105 +1,108 @@
 import os
 import sys
-import pandas as pd
-from sqlalchemy.orm import Session
+from itertools import chain
 
 # Adicionar diretório raiz ao path para importar os módulos corretamente
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.core.database import SessionLocal, Base, engine
-from app.models.quantities import Quantity, PrintType
+from app.core.dataset import apply_dataset_delta, replace_dataset_in_place, swap_in_dataset
+from app.ingestion.pipeline import (
+    DEFAULT_CHUNK_SIZE, IngestionStats, iter_frames, iter_rows, missing_columns, normalize_quantities
+)
+from app.ingestion.eigal_sheet import is_eigal_sheet, iter_eigal_frames
 
-def import_from_excel(excel_path):
+def import_from_excel(excel_path, in_place=False, delta=False, chunk_size=DEFAULT_CHUNK_SIZE):
     """
-    Importa dados de uma planilha Excel para o banco de dados.
-    
+    Importa dados de uma planilha Excel (ou CSV) para o banco de dados.
+
     A planilha deve ter as seguintes colunas:
     - print_type: Tipo de impressão (ex: 4/0, 4/4)
     - run_length: Comprimento da tiragem
     - waste_sheets: Quantidade de folhas desperdiçadas
+
+    Também aceita a exportação CSV em bruto da folha QUANTIDADES
+    (ex: docs/quantidades.csv), convertida diretamente para este formato.
+
+    Os dados são lidos e convertidos em blocos e inseridos em massa.
+    Por omissão são carregados em tabelas-sombra e trocados de forma
+    atómica (a API nunca vê a tabela vazia). Com in_place=True os registros
+    são apagados e reinseridos diretamente nas tabelas ativas.
+
+    Com delta=True a importação é incremental: as linhas são comparadas com
+    as ativas pela chave (print_type, run_length) e por um hash do conteúdo,
+    e só as diferenças são inseridas, atualizadas ou removidas.
     """
     try:
         # Verificar se o arquivo existe
         if not os.path.exists(excel_path):
             print(f"Erro: Arquivo '{excel_path}' não encontrado.")
             return False
-        
-        # Ler a planilha Excel
+
+        # Ler a planilha em blocos
         print(f"Lendo dados do arquivo: {excel_path}")
-        df = pd.read_excel(excel_path)
-        
+        if is_eigal_sheet(excel_path):
+            print("Formato detetado: folha QUANTIDADES em bruto")
+            frames = iter_eigal_frames(excel_path, chunk_size=chunk_size)
+        else:
+            frames = iter_frames(excel_path, chunk_size=chunk_size)
+        first = next(frames, None)
+        if first is None:
+            print("Erro: A planilha está vazia.")
+            return False
+
         # Verificar colunas necessárias
-        required_columns = ['print_type', 'run_length', 'waste_sheets']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            print(f"Erro: Colunas obrigatórias não encontradas: {', '.join(missing_columns)}")
-            print(f"Colunas disponíveis: {', '.join(df.columns)}")
+        missing = missing_columns(first)
+        if missing:
+            print(f"Erro: Colunas obrigatórias não encontradas: {', '.join(missing)}")
+            print(f"Colunas disponíveis: {', '.join(map(str, first.columns))}")
             return False
-        
-        # Abrir sessão do banco de dados
-        db = SessionLocal()
-        
+
+        stats = IngestionStats()
+        rows = iter_rows(chain([first], frames), normalize_quantities, stats)
+        source = os.path.basename(excel_path)
+
         try:
-            # Apagar registros existentes (opcional)
-            print("Limpando registros existentes...")
-            db.query(Quantity).delete()
-            db.query(PrintType).delete()
-            
-            # Conjunto para armazenar tipos de impressão únicos
-            print_types = set()
-            
-            # Processar cada linha da planilha
-            print("Importando dados para o banco...")
-            for _, row in df.iterrows():
-                print_type = str(row['print_type']).strip()
-                run_length = int(row['run_length'])
-                waste_sheets = int(row['waste_sheets'])
-                
-                # Adicionar tipo de impressão único
-                print_types.add(print_type)
-                
-                # Criar registro de quantidade
-                quantity = Quantity(
-                    print_type=print_type,
-                    run_length=run_length,
-                    waste_sheets=waste_sheets
-                )
-                db.add(quantity)
-            
-            # Criar registros de tipos de impressão únicos
-            for pt in print_types:
-                print_type = PrintType(name=pt)
-                db.add(print_type)
-            
-            # Confirmar transação
-            db.commit()
-            print(f"Importação concluída! {len(df)} registros de quantidades e {len(print_types)} tipos de impressão importados.")
-            return True
-        
+            if delta:
+                print("Comparando com os registros ativos (importação incremental)...")
+                summary = apply_dataset_delta(rows, source=source)
+                stats.finish()
+                if summary.version is None:
+                    print(f"Sem alterações: {summary}. {stats}.")
+                else:
+                    print(f"Importação incremental concluída! {summary} (versão {summary.version}). {stats}.")
+                return True
+            if in_place:
+                print("Substituindo registros nas tabelas ativas...")
+                version = replace_dataset_in_place(rows, source=source)
+            else:
+                print("Importando dados para tabelas-sombra...")
+                version = swap_in_dataset(rows, source=source)
         except Exception as e:
-            db.rollback()
             print(f"Erro durante a importação: {str(e)}")
             return False
-        
-        finally:
-            db.close()
-    
+
+        stats.finish()
+        print(f"Importação concluída! {stats} (versão {version}).")
+        return True
+
     except Exception as e:
         print(f"Erro ao processar o arquivo Excel: {str(e)}")
         return False
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Uso: python import_excel.py <caminho_para_excel>")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(args) < 1:
+        print("Uso: python import_excel.py <caminho_para_excel> [--in-place | --delta]")
         print("Exemplo: python import_excel.py ../dados/quantidades.xlsx")
+        print("  --in-place  apaga e reinsere nas tabelas ativas (sem troca atómica)")
+        print("  --delta     aplica apenas as diferenças (inserções, atualizações e remoções)")
         sys.exit(1)
-    
-    excel_path = sys.argv[1]
-    success = import_from_excel(excel_path)
-    
+
+    excel_path = args[0]
+    success = import_from_excel(excel_path, in_place="--in-place" in sys.argv, delta="--delta" in sys.argv)
+
     if success:
         print("Importação concluída com sucesso!")
     else:
         print("Importação falhou. Verifique os erros acima.")
-        sys.exit(1) 
\ No newline at end of file
+        sys.exit(1)
@@ -5,13 +5,15 @@ import os
 # Adiciona o diretório pai ao sys.path para permitir importações
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from app.core.database import SessionLocal, Base, engine
+from app.core.database import SessionLocal
+from app.core.schema import migrate
 from app.models.quantities import Quantity, PrintType
+from app.core.dataset import bump_dataset_version
 
 
 def init_database():
-    # Cria as tabelas
-    Base.metadata.create_all(bind=engine)
+    # Cria/atualiza as tabelas (migrações versionadas)
+    migrate()
     
     # Cria uma sessão
     db = SessionLocal()
@@ -54,6 +56,7 @@ def init_database():
         
         # Adiciona todos os registros
         db.add_all(example_quantities)
+        bump_dataset_version(db, source="init_db", row_count=len(example_quantities))
         db.commit()
         
         print(f"Banco de dados inicializado com {len(example_quantities)} registros.")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Teste de carga da API de cálculo de desperdício.
+
+Dispara pedidos concorrentes contra um servidor em execução e mostra como o
+débito (pedidos/s) e a latência evoluem com o nível de concorrência.
+Para comparar os caminhos de acesso à base de dados, arrancar o servidor em
+cada modo e correr o script contra cada um:
+
+    # caminho síncrono (sessão no threadpool)
+    LOOKUP_INDEX_ENABLED=false ASYNC_DATABASE_ENABLED=false uvicorn app:app
+    # caminho assíncrono (aiosqlite)
+    LOOKUP_INDEX_ENABLED=false ASYNC_DATABASE_ENABLED=true uvicorn app:app
+    # índice em memória
+    uvicorn app:app
+
+    python scripts/load_test.py --url http://localhost:8000 --requests 2000
+
+Requer o pacote httpx.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+
+async def run_level(client, url, print_types, concurrency, total):
+    """Executa `total` pedidos com `concurrency` pedidos em paralelo."""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            params = {
+                "print_type": random.choice(print_types),
+                "print_run": random.randint(100, 10000),
+            }
+            start = time.perf_counter()
+            response = await client.get(f"{url}/api/waste-calculation", params=params)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "throughput": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+async def main(url, levels, total):
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        print_types = (await client.get(f"{url}/api/print-types")).json()
+        if not print_types:
+            print("A API não devolveu tipos de impressão. Importe dados antes de correr o teste.")
+            return
+
+        # Aquecimento
+        await run_level(client, url, print_types, 4, 100)
+
+        print(f"{'Concorrência':>12} {'Pedidos/s':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Erros':>6}")
+        for concurrency in levels:
+            r = await run_level(client, url, print_types, concurrency, total)
+            print(f"{r['concurrency']:>12} {r['throughput']:>10.0f} {r['p50_ms']:>9.2f} "
+                  f"{r['p99_ms']:>9.2f} {r['errors']:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da API de desperdício")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=2000, help="pedidos por nível de concorrência")
+    parser.add_argument("--levels", default="1,4,16,64", help="níveis de concorrência separados por vírgula")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, [int(n) for n in args.levels.split(",")], args.requests))
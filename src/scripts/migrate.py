@@ -0,0 +1,23 @@
+# scripts/migrate.py
+"""
+Passo explícito de migração: aplica as migrações pendentes do esquema
+(ver app/core/schema.py). Em produção (CREATE_SCHEMA_ON_STARTUP=false) deve
+correr antes de arrancar a aplicação, uma única vez, e não em cada worker.
+
+Uso: python scripts/migrate.py
+"""
+import os
+import sys
+
+# Adiciona o diretório pai ao sys.path para permitir importações
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config.settings import get_settings
+from app.core.schema import get_schema_version, migrate
+
+
+if __name__ == "__main__":
+    print(f"Aplicando migrações em: {get_settings().database_url}")
+    for migration in migrate():
+        print(f"  {migration.version:>3}  {migration.description}")
+    print(f"Esquema na versão {get_schema_version()}.")
@@ -5,9 +5,16 @@
 Script simples para ler e exibir o arquivo Excel de quantidades
 """
 
-import pandas as pd
 import os
-from pathlib import Path
+import sys
+
+# Adicionar diretório raiz ao path para importar os módulos corretamente
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ingestion.workbook import WorkbookReader
+
+# Acima deste número de valores distintos deixa de se contar (memória limitada)
+MAX_TRACKED_UNIQUES = 10_000
 
 def main():
     # Caminho para o arquivo Excel
@@ -27,31 +34,52 @@ def main():
     
     # Ler o arquivo Excel
     try:
-        # Ler todas as abas do arquivo Excel
-        xl = pd.ExcelFile(excel_path)
-        print(f"Abas disponíveis no arquivo: {xl.sheet_names}")
-        
-        # Ler cada aba
-        for sheet_name in xl.sheet_names:
-            print(f"\n=== Conteúdo da aba '{sheet_name}' ===")
-            df = pd.read_excel(excel_path, sheet_name=sheet_name)
-            
-            # Exibir informações sobre o DataFrame
-            print(f"Forma: {df.shape} (linhas, colunas)")
-            print(f"Colunas: {list(df.columns)}")
-            
-            # Exibir as primeiras linhas
-            print("\nPrimeiras 5 linhas:")
-            print(df.head())
+        # Abrir o arquivo uma única vez e ler as abas em blocos
+        with WorkbookReader(excel_path) as xl:
+            print(f"Abas disponíveis no arquivo: {xl.sheet_names}")
             
-            # Verificar valores únicos para cada coluna
-            print("\nValores únicos por coluna:")
-            for col in df.columns:
-                unique_values = df[col].unique()
-                if len(unique_values) <= 10:  # Mostrar somente se houver poucos valores únicos
-                    print(f"  {col}: {sorted(unique_values)}")
-                else:
-                    print(f"  {col}: {len(unique_values)} valores únicos")
+            # Ler cada aba
+            for sheet_name in xl.sheet_names:
+                print(f"\n=== Conteúdo da aba '{sheet_name}' ===")
+                
+                rows = 0
+                head = None
+                uniques = {}
+                for chunk in xl.iter_chunks(sheet_name):
+                    if head is None:
+                        head = chunk.head()
+                        uniques = {col: set() for col in chunk.columns}
+                    rows += len(chunk)
+                    for col, values in uniques.items():
+                        if values is not None:
+                            values.update(chunk[col].unique().tolist())
+                            if len(values) > MAX_TRACKED_UNIQUES:
+                                uniques[col] = None
+                
+                columns = list(head.columns) if head is not None else xl.columns(sheet_name)
+                
+                # Exibir informações sobre a aba
+                print(f"Forma: {(rows, len(columns))} (linhas, colunas)")
+                print(f"Colunas: {columns}")
+                if head is None:
+                    continue
+                
+                # Exibir as primeiras linhas
+                print("\nPrimeiras 5 linhas:")
+                print(head)
+                
+                # Verificar valores únicos para cada coluna
+                print("\nValores únicos por coluna:")
+                for col, unique_values in uniques.items():
+                    if unique_values is None:
+                        print(f"  {col}: mais de {MAX_TRACKED_UNIQUES} valores únicos")
+                    elif len(unique_values) <= 10:  # Mostrar somente se houver poucos valores únicos
+                        try:
+                            print(f"  {col}: {sorted(unique_values)}")
+                        except TypeError:  # tipos misturados (ex: texto e None)
+                            print(f"  {col}: {sorted(unique_values, key=str)}")
+                    else:
+                        print(f"  {col}: {len(unique_values)} valores únicos")
     
     except Exception as e:
         print(f"Erro ao ler o arquivo Excel: {str(e)}")
@@ -33,9 +33,13 @@ document.addEventListener('DOMContentLoaded', function () {
         is_special_case: false
     };
 
+    // Tabela de quantidades para cálculo local (por tipo: tiragens e índices das linhas)
+    let quantityTable = null;
+
     // Inicialização
     initTooltips();
     loadPrintTypes();
+    loadQuantityTable();
     loadHistoryFromStorage();
     setupEventListeners();
 
@@ -135,6 +139,80 @@ document.addEventListener('DOMContentLoaded', function () {
             });
     }
 
+    /**
+     * Carrega a tabela de quantidades em formato colunar. O browser guarda-a
+     * e revalida-a pelo ETag; enquanto não estiver disponível os cálculos
+     * são feitos pela API.
+     */
+    function loadQuantityTable() {
+        fetch('/api/quantities/table')
+            .then(handleResponse)
+            .then(table => {
+                const groups = {};
+                table.print_type.forEach((code, i) => {
+                    const name = table.print_types[code];
+                    const group = groups[name] || (groups[name] = { runLengths: [], rows: [] });
+                    group.runLengths.push(table.run_length[i]);
+                    group.rows.push(i);
+                });
+                quantityTable = { table, groups };
+            })
+            .catch(error => {
+                console.error('Erro ao carregar a tabela de quantidades:', error);
+            });
+    }
+
+    /**
+     * Calcula o desperdício localmente: primeira linha do tipo com tiragem
+     * maior ou igual à pedida (a mesma regra da API)
+     */
+    function calculateLocally(printType, printRun) {
+        const { table, groups } = quantityTable;
+        const group = groups[printType];
+        if (!group) {
+            throw new Error('Tipo de impressão desconhecido');
+        }
+
+        let low = 0;
+        let high = group.runLengths.length;
+        while (low < high) {
+            const mid = (low + high) >> 1;
+            if (group.runLengths[mid] < printRun) {
+                low = mid + 1;
+            } else {
+                high = mid;
+            }
+        }
+        if (low === group.runLengths.length) {
+            throw new Error('Tiragem acima da tabela');
+        }
+
+        const row = group.rows[low];
+        const adjustment = table.adjustment[row];
+        return {
+            print_type: printType,
+            print_run: printRun,
+            waste_amount: table.waste_sheets[row],
+            adjustment: adjustment === null ? null : table.adjustments[adjustment],
+            is_special_case: table.is_special_case[row] === 1
+        };
+    }
+
+    /**
+     * Obtém o cálculo localmente, se a tabela já estiver carregada, ou da API
+     */
+    function fetchWaste(printType, printRun) {
+        if (quantityTable) {
+            try {
+                return Promise.resolve(calculateLocally(printType, printRun));
+            } catch (error) {
+                return Promise.reject(error);
+            }
+        }
+        const url = `/api/waste-calculation?print_type=${encodeURIComponent(printType)}&print_run=${printRun}`;
+        return fetch(url).then(handleResponse);
+    }
+
     /**
      * Processa a resposta da API
      */
@@ -167,13 +245,10 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 
     /**
-     * Calcula o desperdício chamando a API
+     * Calcula o desperdício (localmente ou chamando a API)
      */
     function calculateWaste(printType, printRun) {
-        const url = `/api/waste-calculation?print_type=${encodeURIComponent(printType)}&print_run=${printRun}`;
-
-        fetch(url)
-            .then(handleResponse)
+        fetchWaste(printType, printRun)
             .then(data => {
                 // Ocultar spinner
                 submitSpinner.style.display = 'none';
@@ -257,8 +332,7 @@ document.addEventListener('DOMContentLoaded', function () {
             const nextTier = 1000;
             
             // Simular cálculo para próximo tier
-            fetch(`/api/waste-calculation?print_type=${encodeURIComponent(data.print_type)}&print_run=${nextTier}`)
-                .then(handleResponse)
+            fetchWaste(data.print_type, nextTier)
                 .then(optimizedData => {
                     const currentWastePerUnit = data.waste_amount / data.print_run;
                     const optimizedWastePerUnit = optimizedData.waste_amount / optimizedData.print_run;